@@ -4,7 +4,14 @@ from .routes.document_routes import document_bp  # ✅ relative import
 from .routes.dubai_categories import categories_bp
 
 
-def create_app():
+def create_app(preload=False, warm=True):
+    """
+    Builds the Flask app. With `preload` (the production server) the Dubai
+    section index, subcategory table and every codebook are warmed before this
+    returns, so forked workers start warm. Otherwise the Dubai index and table
+    are built in a background thread and /api/ready answers 503 until they are;
+    `warm=False` skips warm-up (the reloader's watcher process). See services/warmup.
+    """
     app = Flask(__name__)
 
     # Configuration
@@ -19,4 +26,19 @@ def create_app():
     app.register_blueprint(match_bp, url_prefix='/api')
     from .routes.dubai_categories import categories_bp
     app.register_blueprint(categories_bp, url_prefix='/api')
+    from .routes.cache_routes import cache_bp
+    app.register_blueprint(cache_bp, url_prefix='/api')
+    from .routes.job_routes import job_bp
+    app.register_blueprint(job_bp, url_prefix='/api')
+    from .routes.stream_routes import stream_bp
+    app.register_blueprint(stream_bp, url_prefix='/api')
+    from .routes.health_routes import health_bp
+    app.register_blueprint(health_bp, url_prefix='/api')
+
+    # Build indexes up front so the first request doesn't pay for them; /api/ready reports when done
+    from .services import warmup
+    if preload:
+        warmup.warm_up(codebooks=True)
+    elif warm:
+        warmup.start_background()
     return app
@@ -1,108 +1,36 @@
 import os
-import openai
-import re
 import json
-from PyPDF2 import PdfReader
 from typing import List, Dict, Any
-
-def extract_pdf_text(pdf_path: str) -> str:
-    text = []
-    try:
-        reader = PdfReader(pdf_path)
-        for page in reader.pages:
-            text.append(page.extract_text() or "")
-    except Exception as e:
-        print(f"[extract_pdf_text] Error reading {pdf_path}: {e}")
-    return "\n".join(text)
-
-
-def _extract_json_array_from_text(text: str) -> Any:
+from .services import codebook_cache
+from .services import clause_store
+from .services import fanout
+from .services.batch_planner import run_batched, PartialBatch
+from .services.llm_cache import cached_chat_completion_stream, CompletionTruncated
+from .services.json_stream import iter_json_array
+from .services.bm25_index import retrieve_context
+from .services.prompt_budget import PromptBudget
+from .services.codebook_cache import extract_pdf_text  # re-exported; the one PyPDF2 extractor lives in codebook_cache
+
+CODEBOOK_MODEL = 'gpt-4o'  # or 'gpt-4-turbo' depending on your account; change if needed
+CODEBOOK_OUTPUT_TOKENS = 3500
+CODEBOOK_SYSTEM_PROMPT = "You are an expert in construction specifications and building codes. Produce only JSON as specified."
+
+def _match_codebook_openai(codebook_id: str,
+                           codebook_text: str,
+                           batch_sections: List[Dict[str, Any]],
+                           region: str,
+                           cache_mode: str = "use",
+                           clauses=None) -> List[Dict[str, Any]]:
     """
-    Try several robust ways to extract a JSON array from model output text.
-    Returns Python object (usually a list) or raises ValueError if extraction fails.
+    Runs one codebook's prompt and returns its parsed result items.
+    Raises on API or parsing failures so the caller can report them per codebook.
     """
-    text = text.strip()
-    # 1) Try direct load (ideal case)
-    try:
-        return json.loads(text)
-    except Exception:
-        pass
-
-    # 2) Find first '[' and last ']' and try to load that substring
-    array_start = text.find('[')
-    array_end = text.rfind(']')
-    if array_start != -1 and array_end != -1 and array_end > array_start:
-        candidate = text[array_start:array_end + 1]
-        try:
-            return json.loads(candidate)
-        except Exception:
-            pass
-
-    # 3) Regex to find JSON-like arrays of objects (non-greedy)
-    arrays = re.findall(r'\[[\s\S]*?\]\s*(?=$|\n)', text)
-    for a in arrays:
-        try:
-            return json.loads(a)
-        except Exception:
-            continue
-
-    # 4) Try single-quote -> double-quote fallback (risky, last resort)
-    candidate = text.replace("'", '"')
-    try:
-        return json.loads(candidate)
-    except Exception:
-        pass
-
-    # If all fail, raise informative error
-    raise ValueError("Unable to reliably extract JSON array from model output.")
-
-
-def match_sections_with_codebooks_openai(sections: List[Dict[str, Any]],
-                                         codebook_ids: List[str],
-                                         region: str) -> Dict[str, Any]:
-    """
-    Matches `sections` with codebooks (by codebook_ids). Returns aggregated matches and checklist entries.
-    """
-
-    # Ensure API key is available
-    openai.api_key = os.getenv('OPENAI_API_KEY')
-    if not openai.api_key:
-        raise RuntimeError("OPENAI_API_KEY environment variable is not set")
-
-    # Build codebook_texts map first (do not call API inside file loop)
-    codebook_texts: Dict[str, str] = {}
-    codebook_dir = os.path.join(os.getcwd(), 'shared', 'codebooks')
-    if not os.path.isdir(codebook_dir):
-        print(f"[match] Warning: codebook directory not found: {codebook_dir}")
-
-    for codebook_id in codebook_ids:
-        found = False
-        if os.path.isdir(codebook_dir):
-            for fname in os.listdir(codebook_dir):
-                # allow both "SBC-501.pdf" or "501-SBC.pdf" style heuristics if needed
-                if fname.startswith(codebook_id) and fname.lower().endswith('.pdf'):
-                    codebook_path = os.path.join(codebook_dir, fname)
-                    codebook_texts[codebook_id] = extract_pdf_text(codebook_path)
-                    found = True
-                    break
-        if not found:
-            # if not found, still set an empty string so caller knows it's missing
-            codebook_texts[codebook_id] = ""
-            print(f"[match] Warning: codebook {codebook_id} not found in {codebook_dir}.")
-
-    # Limit sections to a reasonable number for a single prompt to control tokens
-    processable_sections = sections[:10] if len(sections) > 10 else sections
-
-    all_results: List[Dict[str, Any]] = []
-
-    # Iterate over codebooks (now fully built) and call the model per codebook
-    for codebook_id, codebook_text in codebook_texts.items():
-        codebook_label = codebook_id
-        if region and region.lower() == 'saudi':
-            # strip common prefix if present
-            codebook_label = codebook_id.replace('SBC-', '')
+    codebook_label = codebook_id
+    if region and region.lower() == 'saudi':
+        # strip common prefix if present
+        codebook_label = codebook_id.replace('SBC-', '')
 
-        prompt = f"""
+    prompt_head = f"""
 You are an expert in Saudi Building Code ({codebook_label}) compliance analysis.
 
 TASK:
@@ -148,58 +76,119 @@ RULES:
 
 DATA:
 Document Sections (JSON):
-{json.dumps(processable_sections, indent=2)}
+{json.dumps(batch_sections, indent=2)}
 
 Relevant Codebook Text:
-{codebook_text[:12000]}
 """
-
-        # Call OpenAI (ChatCompletion) - robustly handle exceptions
-        try:
-            response = openai.ChatCompletion.create(
-                model='gpt-4o',  # or 'gpt-4-turbo' depending on your account; change if needed
-                messages=[
-                    {"role": "system", "content": "You are an expert in construction specifications and building codes. Produce only JSON as specified."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.0,  # deterministic
-                max_tokens=3500
-            )
-        except Exception as e:
-            print(f"[match] OpenAI API error for codebook {codebook_id}: {e}")
+    # Send the clauses most relevant to these sections rather than the front matter,
+    # as many as fit the model's input budget next to the instructions
+    budget = PromptBudget(CODEBOOK_MODEL, output_tokens=CODEBOOK_OUTPUT_TOKENS)
+    context_tokens = budget.take(CODEBOOK_SYSTEM_PROMPT, prompt_head)
+    codebook_context = retrieve_context(batch_sections, codebook_text, max_tokens=context_tokens,
+                                        model=CODEBOOK_MODEL, clauses=clauses)
+    prompt = f"{prompt_head}{codebook_context}\n"
+
+    from .services.openai_matcher import get_client
+
+    # Call OpenAI (chat completions), streamed: result items are parsed as soon as each one is complete
+    chunks = cached_chat_completion_stream(
+        get_client().chat.completions.create,
+        model=CODEBOOK_MODEL,
+        messages=[
+            {"role": "system", "content": CODEBOOK_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        cache_mode=cache_mode,
+        temperature=0.0,  # deterministic
+        max_tokens=budget.output_tokens
+    )
+    codebook_results: List[Any] = []
+    truncated = None
+    try:
+        for item in iter_json_array(chunks):
+            codebook_results.append(item)
+    except CompletionTruncated as e:
+        # Keep the complete items; coverage reports the batch as partial
+        truncated = e
+    except ValueError as e:
+        print(f"[match] Failed to parse JSON from model for codebook {codebook_id}: {e}")
+        raise
+    except Exception as e:
+        print(f"[match] OpenAI API error for codebook {codebook_id}: {e}")
+        raise
+
+    results: List[Dict[str, Any]] = []
+    # Optionally: validate each object's shape (lightweight)
+    for item in codebook_results:
+        if not isinstance(item, dict):
+            print(f"[match] Skipping non-dict item in results for {codebook_id}: {type(item)}")
             continue
+        # Add the codebook id/label to matched_clause if missing or inconsistent
+        matched_clause = item.get('matched_clause') or {}
+        if isinstance(matched_clause, dict):
+            matched_clause.setdefault('codebook', codebook_label)
+            item['matched_clause'] = matched_clause
+        results.append(item)
+    if truncated is not None:
+        raise PartialBatch(results, str(truncated))
+    return results
 
-        content = response['choices'][0]['message']['content']
-        # Attempt to extract JSON reliably
-        try:
-            codebook_results = _extract_json_array_from_text(content)
-        except ValueError as e:
-            print(f"[match] Failed to parse JSON from model for codebook {codebook_id}: {e}")
-            print(f"[match] Model raw output (truncated): {content[:1000]}")
-            continue
 
-        # Validate type
-        if not isinstance(codebook_results, list):
-            print(f"[match] Unexpected parsed result type for {codebook_id}: {type(codebook_results)}")
-            continue
+def match_sections_with_codebooks_openai(sections: List[Dict[str, Any]],
+                                         codebook_ids: List[str],
+                                         region: str,
+                                         max_concurrency: int = None,
+                                         cache_mode: str = "use") -> Dict[str, Any]:
+    """
+    Matches `sections` with codebooks (by codebook_ids). Returns aggregated matches and checklist entries.
+    Codebooks are extracted and matched concurrently; `max_concurrency` caps the LLM calls
+    in flight across all codebooks and batches;
+    a failing codebook is reported in "errors" instead of aborting the others.
+    Every section is evaluated in token-budgeted batches; "coverage" reports how many per codebook.
+    `cache_mode` ("use" / "refresh" / "bypass") controls the LLM response cache.
+    """
 
-        # Optionally: validate each object's shape (lightweight)
-        for item in codebook_results:
-            if not isinstance(item, dict):
-                print(f"[match] Skipping non-dict item in results for {codebook_id}: {type(item)}")
-                continue
-            # Add the codebook id/label to matched_clause if missing or inconsistent
-            matched_clause = item.get('matched_clause') or {}
-            if isinstance(matched_clause, dict):
-                matched_clause.setdefault('codebook', codebook_label)
-                item['matched_clause'] = matched_clause
-            all_results.append(item)
-
-    # Sort aggregated results by similarity_score desc
+    # Ensure API key is available; the shared client (openai_matcher.get_client) also honours OPENAI_BASE_URL
+    if not os.getenv('OPENAI_API_KEY'):
+        raise RuntimeError("OPENAI_API_KEY environment variable is not set")
+
+    codebook_dir = codebook_cache.CODEBOOK_DIR
+    if not os.path.isdir(codebook_dir):
+        print(f"[match] Warning: codebook directory not found: {codebook_dir}")
+
+    def match_one(codebook_id: str):
+        # Pre-split clauses come from the ingested clause store; otherwise the extracted
+        # text is served from the shared codebook cache (hash/mtime keyed)
+        codebook_text, clauses = clause_store.get_codebook_clauses(codebook_id)
+        if codebook_text is None:
+            print(f"[match] Warning: codebook {codebook_id} not found in {codebook_dir}.")
+            raise FileNotFoundError(f"Codebook {codebook_id} not found")
+        # All sections are evaluated, packed into token-budgeted batches
+        return run_batched(
+            sections,
+            lambda batch: _match_codebook_openai(codebook_id, codebook_text, batch, region, cache_mode, clauses),
+            max_concurrency=max_concurrency
+        )
+
+    all_results: List[Dict[str, Any]] = []
+    errors: List[Dict[str, str]] = []
+    coverage: Dict[str, Dict[str, Any]] = {}
+    with fanout.bounded_calls(max_concurrency):
+        outcomes = fanout.run_bounded(codebook_ids, match_one, max_concurrency)
+    for outcome in outcomes:
+        if outcome["error"]:
+            errors.append({"codebook_id": outcome["item"], "message": outcome["error"]})
+        else:
+            codebook_results, coverage[outcome["item"]] = outcome["result"]
+            all_results.extend(codebook_results)
+
+    # Sort aggregated results by similarity_score desc (stable, so ties keep codebook order)
     all_results.sort(key=lambda x: x.get('similarity_score', 0), reverse=True)
 
     # Build final return structure
     return {
         "matched_clauses": all_results,
-        "checklist": [r for r in all_results if r.get('checklist')]
+        "checklist": [r for r in all_results if r.get('checklist')],
+        "errors": errors,
+        "coverage": coverage
     }
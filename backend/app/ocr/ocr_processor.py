@@ -1,62 +1,22 @@
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import Image
-import cv2
-import numpy as np
 import os
-import pandas as pd
-import docx
-# Removed textract as it's causing installation issues
-import docx2txt
-import fitz
-from collections import Counter
 import re
-from docx import Document
-from ..services.section_splitter import chunk_text
-from ..services.section_splitter import clean_chunk_formatting
-from ..services.section_splitter import merge_broken_numbered_lines
-from ..services.section_splitter import convert_chunks_to_json
+from .text_pipeline import document_sections
+from .pdf_ocr import ocr_pdf_pages
 
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+# OCR, PDF and Word backends (pytesseract, cv2, fitz, python-docx) are imported
+# where a file type or stage first needs them, so starting the app loads none.
+tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 poppler_path = r'C:\poppler-24.08.0\Library\bin'
 
-def preprocess_image(pil_image):
-    cv_img = np.array(pil_image)
-    gray = cv2.cvtColor(cv_img, cv2.COLOR_RGB2GRAY)
-    denoised = cv2.medianBlur(gray, 3)
-    _, thresh = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-    coords = np.column_stack(np.where(thresh > 0))
-    angle = cv2.minAreaRect(coords)[-1]
-    if angle < -45:
-        angle = -(90 + angle)
-    else:
-        angle = -angle
-
-    (h, w) = thresh.shape
-    center = (w // 2, h // 2)
-    M = cv2.getRotationMatrix2D(center, angle, 1.0)
-    deskewed = cv2.warpAffine(thresh, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-
-    return Image.fromarray(deskewed)
-
-def clean_ocr_text(text: str) -> str:
-    # Fix cases like "1.\n7.3" → "1.7.3"
-    text = re.sub(r'(?<=\b\d)\.\s*\n\s*(\d+\.\d+)', r'.\1', text)
-
-    # Fix cases like "1.\n7" → "1.7"
-    text = re.sub(r'(?<=\b\d)\.\s*\n\s*(\d+)', r'.\1', text)
-
-    # Fix multiple broken line number cases like "1.\n7.\n3" → "1.7.3"
-    text = re.sub(r'(?<=\b\d)\.\s*\n\s*(\d+)\.\s*\n\s*(\d+)', r'.\1.\2', text)
-
-    # Remove multiple newlines and normalize spacing
-    text = re.sub(r'\n{2,}', '\n', text)
-
-    return text
-
-
+def load_pytesseract():
+    import pytesseract
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    return pytesseract
 
+def preprocess_image(pil_image):
+    # Downscaled skew estimation, rotation only above tolerance, reused buffers (see preprocess.py)
+    from .preprocess import get_preprocessor
+    return get_preprocessor().process(pil_image)
 
 def extract_project_name(text, max_lines=20):
     
@@ -93,98 +53,137 @@ def extract_project_name(text, max_lines=20):
 
 
 
-def remove_headers_footers(text: str, max_line_len=80):
-    """
-    Removes common page headers and footers by detecting repeating patterns
-    and page markers (like 'Page 1 of X').
-    """
-    lines = text.splitlines()
-    cleaned_lines = []
-
-    page_header_candidates = []
-    page_footer_candidates = []
-
-    # Heuristic: headers are usually in top 5 lines of a page
-    # footers are usually in last 5 lines before a page break
-    page_breaks = [i for i, l in enumerate(lines) if re.match(r'^\f$', l.strip())]  # '\f' = page break
-
-    page_start = 0
-    for pb in page_breaks + [len(lines)]:
-        page = lines[page_start:pb]
-        if len(page) >= 5:
-            page_header_candidates.append(page[:5])
-            page_footer_candidates.append(page[-5:])
-        page_start = pb + 1
+MIN_TEXT_LAYER_CHARS = 40      # fewer characters than this is not a usable text layer
+MIN_IMAGE_COVERAGE = 0.3       # share of the page covered by images to treat it as scanned
 
-    # Flatten header/footer candidates and count
-    flat_headers = Counter(line for grp in page_header_candidates for line in grp)
-    flat_footers = Counter(line for grp in page_footer_candidates for line in grp)
 
-    # Get top 3 repeated lines that look like headers/footers
-    common_headers = {line for line, count in flat_headers.items() if count >= 2 and len(line) <= max_line_len}
-    common_footers = {line for line, count in flat_footers.items() if count >= 2 and len(line) <= max_line_len}
-
-    for line in lines:
-        if line.strip() in common_headers or line.strip() in common_footers:
-            continue
-        if re.match(r'Page\s+\d+(\s+of\s+\d+)?', line, re.IGNORECASE):
-            continue
-        cleaned_lines.append(line)
-
-    return '\n'.join(cleaned_lines)
-
-
-def extract_text_from_file(file_path):
+def classify_pdf_page(page, page_text):
+    """
+    Classifies a PyMuPDF page as 'text' (usable text layer), 'ocr' (image-only /
+    scanned) or 'empty', from its text density and image coverage.
+    """
+    if len(page_text.strip()) >= MIN_TEXT_LAYER_CHARS:
+        return 'text'
+    import fitz
+    page_area = abs(page.rect) or 1.0
+    image_area = 0.0
+    for info in page.get_image_info():
+        image_area += abs(fitz.Rect(info["bbox"]) & page.rect)
+    if image_area / page_area >= MIN_IMAGE_COVERAGE:
+        return 'ocr'
+    return 'text' if page_text.strip() else 'empty'
+
+
+def iter_pdf_pages(file_path):
+    """
+    Yields the text of each PDF page, in page order. Digital pages use the
+    PyMuPDF text layer; only image-only pages go through OCR. If no page yields
+    any text, the whole document is OCR'd as before. Each page's text layer is
+    read once, in the pass that classifies it, and kept for the digital pages
+    (text only, no page objects). The image-only pages are submitted to the OCR
+    pool before the first page is yielded, so they are recognised while the
+    pages ahead of them are consumed.
+    """
+    import fitz
+    kinds, texts = [], []
+    try:
+        with fitz.open(file_path) as pdf:
+            for page in pdf:
+                page_text = page.get_text()
+                kind = classify_pdf_page(page, page_text)
+                kinds.append(kind)
+                texts.append(page_text if kind == 'text' else "")
+    except Exception as e:
+        print("fitz PDF text extraction failed:", str(e))
+        kinds = None
+
+    if kinds is not None and 'ocr' not in kinds and 'text' not in kinds:
+        print("fitz PDF text extraction empty; falling back to OCR for all pages")
+        kinds = None
+
+    if kinds is None:
+        # Fallback to OCR using Tesseract: pages stream through a process pool in page order
+        for _, ocr_text in ocr_pdf_pages(file_path):
+            yield "\n" + ocr_text
+        return
+
+    ocr_pages = [number + 1 for number, kind in enumerate(kinds) if kind == 'ocr']
+    ocr_results = iter(())
+    if ocr_pages:
+        print(f"OCR for {len(ocr_pages)} of {len(kinds)} pages (image-only)")
+        ocr_results = ocr_pdf_pages(file_path, pages=ocr_pages)
+    for kind, page_text in zip(kinds, texts):
+        if kind == 'ocr':
+            yield "\n" + next(ocr_results)[1]
+        else:
+            yield page_text
+
+
+def extract_pdf_pages(file_path):
+    """Returns the text of each PDF page, in page order (see iter_pdf_pages)."""
+    return list(iter_pdf_pages(file_path))
+
+
+def _iter_text_file_pages(file_path):
+    """Pages of a .txt file, split at form feeds; read line by line."""
+    page = []
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            while '\f' in line:
+                before, line = line.split('\f', 1)
+                page.append(before)
+                yield "".join(page)
+                page = []
+            page.append(line)
+    yield "".join(page)
+
+
+SUPPORTED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.pdf', '.docx', '.txt')
+
+
+def iter_document_pages(file_path):
+    """Yields the raw text of a document page by page (one unit for images and .docx)."""
     ext = os.path.splitext(file_path)[1].lower()
-    print("File extension:", ext)
-
-    text = ''
 
     if ext in ['.png', '.jpg', '.jpeg']:
+        from PIL import Image
         image = Image.open(file_path)
         preprocessed = preprocess_image(image)
-        text = pytesseract.image_to_string(preprocessed)
+        yield load_pytesseract().image_to_string(preprocessed)
 
     elif ext == '.pdf':
-        try:
-            # Try extracting digital text using fitz (PyMuPDF)
-            pdf = fitz.open(file_path)
-            for page in pdf:
-                page_text = page.get_text()
-                if page_text.strip():
-                    text += page_text
-            if not text.strip():
-                raise ValueError("Empty text from PyMuPDF.")
-        except Exception as e:
-            print("fitz PDF text extraction failed or empty:", str(e))
-            # Fallback to OCR using Tesseract
-            images = convert_from_path(file_path, poppler_path=poppler_path)
-            for img in images:
-                preprocessed = preprocess_image(img)
-                ocr_text = pytesseract.image_to_string(preprocessed, config='--psm 6')
-                text += "\n" + ocr_text
+        yield from iter_pdf_pages(file_path)
 
     elif ext == '.docx':
+        # python-docx keeps page headers/footers out of the body paragraphs
+        from docx import Document
         doc = Document(file_path)
-        paragraphs = [p.text.strip() for p in doc.paragraphs if p.text.strip()]
-        text = "\n".join(paragraphs)
+        yield "\n".join(p.text.strip() for p in doc.paragraphs if p.text.strip())
 
     elif ext == '.txt':
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            text = f.read()
+        yield from _iter_text_file_pages(file_path)
 
-    else:
+
+def extract_sections(file_path, max_chars=None):
+    """
+    Returns (project_name, sections) for a supported document, where sections
+    is a generator yielding each {section_id, title, content} as soon as it is
+    complete; pages are read and cleaned as the generator is consumed.
+    """
+    return document_sections(iter_document_pages(file_path), max_chars)
+
+
+def extract_text_from_file(file_path):
+    ext = os.path.splitext(file_path)[1].lower()
+    print("File extension:", ext)
+
+    if ext not in SUPPORTED_EXTENSIONS:
         return {"error": "Unsupported file format."}
 
-    # Clean and post-process the text
-    text = clean_ocr_text(text)
-    text = remove_headers_footers(text)
-    text = merge_broken_numbered_lines(text)
-    project_name = extract_project_name(text)
-    chunks = chunk_text(text)
-    chunks = [clean_chunk_formatting(chunk) for chunk in chunks]
-    structured_sections = convert_chunks_to_json(chunks)
-  
+    # Pages stream through header/footer removal, cleaning and segmentation
+    project_name, sections = extract_sections(file_path)
+    structured_sections = list(sections)
+
     print("✅ Returning from extract_text_from_file")
     print("Project Name:", project_name)
     print("Structured Sections:", structured_sections)
@@ -193,7 +192,3 @@ def extract_text_from_file(file_path):
         "project_name": project_name,
         "sections": structured_sections  # Ready to pass to GPT
     }
-
-
-
-
@@ -0,0 +1,88 @@
+import os
+import threading
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', str(max(1, (os.cpu_count() or 2) - 1))))
+OCR_PAGE_WINDOW = int(os.getenv('OCR_PAGE_WINDOW', '8'))
+OCR_DPI = int(os.getenv('OCR_DPI', '200'))
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    # Tesseract threads internally; with one process per core that only oversubscribes
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+
+def _ocr_page(file_path, page_number, dpi):
+    """Worker: rasterize a single page, preprocess it and OCR it."""
+    from pdf2image import convert_from_path
+    from .ocr_processor import load_pytesseract, preprocess_image, poppler_path
+
+    images = convert_from_path(file_path, dpi=dpi, first_page=page_number, last_page=page_number,
+                               poppler_path=poppler_path)
+    if not images:
+        return ""
+    preprocessed = preprocess_image(images[0])
+    return load_pytesseract().image_to_string(preprocessed, config='--psm 6')
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+            _pool_workers = workers
+        return _pool
+
+
+def pdf_page_count(file_path):
+    from pdf2image import pdfinfo_from_path
+    from .ocr_processor import poppler_path
+    return int(pdfinfo_from_path(file_path, poppler_path=poppler_path)["Pages"])
+
+
+def ocr_pdf_pages(file_path, pages=None, workers=None, window=None, dpi=None):
+    """
+    Returns an iterator of (page_number, text) in page order for the given
+    1-based pages (all by default). The first `window` pages are submitted to
+    the worker pool before this returns, so OCR runs while the caller is still
+    busy with other pages. Each worker rasterizes only its own page
+    (first_page/last_page) and at most `window` pages are in flight at once,
+    so memory stays bounded regardless of document length.
+    """
+    workers = workers or OCR_WORKERS
+    window = max(1, window or OCR_PAGE_WINDOW)
+    dpi = dpi or OCR_DPI
+    pages = list(pages) if pages is not None else list(range(1, pdf_page_count(file_path) + 1))
+
+    if workers == 1:
+        return ((page_number, _ocr_page(file_path, page_number, dpi)) for page_number in pages)
+
+    pool = _get_pool(workers)
+    pending = deque()
+    remaining = iter(pages)
+    for page_number in islice(remaining, window):
+        pending.append((page_number, pool.submit(_ocr_page, file_path, page_number, dpi)))
+    return _collect_pages(pool, pending, remaining, file_path, dpi)
+
+
+def _collect_pages(pool, pending, remaining, file_path, dpi):
+    # Sliding window: a new page is submitted as soon as the oldest one is handed back
+    try:
+        while pending:
+            page_number, future = pending.popleft()
+            text = future.result()
+            for next_page in islice(remaining, 1):
+                pending.append((next_page, pool.submit(_ocr_page, file_path, next_page, dpi)))
+            yield page_number, text
+    finally:
+        # Abandoned early: don't leave queued pages running for nobody
+        for _, future in pending:
+            future.cancel()
@@ -0,0 +1,97 @@
+import os
+import threading
+import cv2
+import numpy as np
+from PIL import Image
+
+SKEW_ESTIMATE_MAX_DIM = int(os.getenv('OCR_SKEW_MAX_DIM', '1000'))
+SKEW_TOLERANCE_DEG = float(os.getenv('OCR_SKEW_TOLERANCE_DEG', '0.5'))
+
+
+def normalize_rect_angle(angle):
+    """Maps a cv2.minAreaRect angle (convention differs across OpenCV versions) into (-45, 45]."""
+    while angle <= -45:
+        angle += 90
+    while angle > 45:
+        angle -= 90
+    return angle
+
+
+class ImagePreprocessor:
+    """
+    Grayscale -> median blur -> Otsu threshold -> deskew, tuned for one call per OCR'd page.
+
+    - Skew is estimated on a copy downscaled to at most `skew_max_dim` pixels, using
+      the ink (foreground) pixels only, so minAreaRect sees thousands of points
+      instead of millions.
+    - Rotation is skipped when the estimated skew is below `skew_tolerance` degrees.
+    - Intermediate buffers are kept and reused while page sizes stay the same.
+
+    Instances hold buffers and are not thread-safe; use one per thread/process.
+    """
+
+    def __init__(self, skew_max_dim=None, skew_tolerance=None):
+        self.skew_max_dim = skew_max_dim or SKEW_ESTIMATE_MAX_DIM
+        self.skew_tolerance = SKEW_TOLERANCE_DEG if skew_tolerance is None else skew_tolerance
+        self._buffers = {}
+
+    def _buffer(self, name, shape):
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape:
+            buf = self._buffers[name] = np.empty(shape, dtype=np.uint8)
+        return buf
+
+    def _to_gray(self, pil_image):
+        img = np.asarray(pil_image)
+        if img.ndim == 2:
+            return img if img.dtype == np.uint8 else img.astype(np.uint8)
+        gray = self._buffer("gray", img.shape[:2])
+        code = cv2.COLOR_RGBA2GRAY if img.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+        cv2.cvtColor(img, code, dst=gray)
+        return gray
+
+    def estimate_skew(self, binary):
+        """Skew angle in degrees of the dark (ink) pixels of a binarized page."""
+        h, w = binary.shape
+        scale = min(1.0, self.skew_max_dim / float(max(h, w)))
+        if scale < 1.0:
+            size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            small = self._buffer("small", (size[1], size[0]))
+            cv2.resize(binary, size, dst=small, interpolation=cv2.INTER_AREA)
+        else:
+            small = binary
+        ink = self._buffer("ink", small.shape)
+        # Text is black on white after Otsu, so ink is wherever the (averaged) page is dark
+        cv2.threshold(small, 127, 255, cv2.THRESH_BINARY_INV, dst=ink)
+        points = cv2.findNonZero(ink)
+        if points is None or len(points) < 10:
+            return 0.0
+        return normalize_rect_angle(cv2.minAreaRect(points)[-1])
+
+    def process(self, pil_image):
+        gray = self._to_gray(pil_image)
+        denoised = self._buffer("denoised", gray.shape)
+        cv2.medianBlur(gray, 3, dst=denoised)
+        thresh = self._buffer("thresh", gray.shape)
+        cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=thresh)
+
+        angle = self.estimate_skew(thresh)
+        if abs(angle) < self.skew_tolerance:
+            # Copy out: the buffer is reused for the next page
+            return Image.fromarray(thresh.copy())
+
+        (h, w) = thresh.shape
+        M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+        deskewed = cv2.warpAffine(thresh, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+        return Image.fromarray(deskewed)
+
+
+_local = threading.local()
+
+
+def get_preprocessor():
+    """Per-thread preprocessor, so OCR workers reuse their buffers across pages."""
+    preprocessor = getattr(_local, "preprocessor", None)
+    if preprocessor is None:
+        preprocessor = _local.preprocessor = ImagePreprocessor()
+    return preprocessor
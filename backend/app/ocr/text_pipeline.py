@@ -0,0 +1,110 @@
+import re
+from collections import Counter, deque
+from itertools import chain, islice
+from ..services.segmenter import merge_numbered_lines, segment_lines
+
+HEADER_FOOTER_BAND = 5          # lines at the top/bottom of a page that may be a header/footer
+HEADER_FOOTER_MAX_LEN = 80
+HEADER_FOOTER_LOOKAHEAD = 2     # pages held back so a header is recognised on the first page too
+HEADER_FOOTER_MIN_SHARE = 0.5   # share of pages a line must repeat on to count as header/footer
+HEADER_FOOTER_MIN_PAGES = 3     # fewer pages than this are too few to tell a header from repeated text
+PROJECT_NAME_LINES = 20
+
+_PAGE_MARKER = re.compile(r'Page\s+\d+(\s+of\s+\d+)?', re.IGNORECASE)
+_ALNUM = re.compile(r'[^\W_]')
+_PAGE_NUMBER = re.compile(r'[\W_]*\d+[\W_]*')
+_BROKEN_NUMBER_TAIL = re.compile(r'(?<!\w)\d\.\s*$')
+_DIGIT_START = re.compile(r'\s*\d')
+
+
+# ---------- HEADERS / FOOTERS ----------
+def _band_keys(lines, band=HEADER_FOOTER_BAND, max_line_len=HEADER_FOOTER_MAX_LEN):
+    """
+    Maps line index -> keys for the first and last `band` non-blank lines of a
+    page. A key is the line's distance from the top or bottom plus its text
+    (any bare page number counts as one text), so a subheading that happens
+    to open two pages at different offsets is not mistaken for a header.
+    """
+    nonblank = [i for i, line in enumerate(lines) if line.strip()]
+    keys = {}
+    for edge, positions in (('top', nonblank[:band]), ('bottom', nonblank[::-1][:band])):
+        for offset, i in enumerate(positions):
+            text = lines[i].strip()
+            if len(text) <= max_line_len and _ALNUM.search(text):
+                keys.setdefault(i, []).append((edge, offset, '#' if _PAGE_NUMBER.fullmatch(text) else text))
+    return keys
+
+
+def strip_headers_footers(pages, lookahead=HEADER_FOOTER_LOOKAHEAD):
+    """
+    Takes an iterable of pages (lists of lines) and yields them without
+    'Page N of M' markers and without top/bottom lines that repeat at the same
+    place on at least half of the pages seen (and at least two). Repeated lines
+    are only removed once HEADER_FOOTER_MIN_PAGES pages have been seen, so a
+    one- or two-page document keeps them. Only `lookahead` + 1 pages are held
+    at a time; a page is released once the pages after it have been seen.
+    """
+    seen = Counter()        # band key -> number of pages it appeared on
+    window = deque()
+    pages_seen = 0
+
+    def release(lines, keys):
+        if pages_seen < HEADER_FOOTER_MIN_PAGES:
+            keys = {}
+        threshold = max(2, HEADER_FOOTER_MIN_SHARE * pages_seen)
+        return [
+            line for i, line in enumerate(lines)
+            if not any(seen[key] >= threshold for key in keys.get(i, ()))
+            and not _PAGE_MARKER.match(line)
+        ]
+
+    for lines in pages:
+        keys = _band_keys(lines)
+        seen.update({key for page_keys in keys.values() for key in page_keys})
+        pages_seen += 1
+        window.append((lines, keys))
+        if len(window) > lookahead:
+            yield release(*window.popleft())
+    while window:
+        yield release(*window.popleft())
+
+
+# ---------- LINE CLEANING ----------
+def clean_lines(lines):
+    """
+    Joins numbers broken over lines ("1.\\n7.3" ->
+    "1.7.3", "1.\\n7" -> "1.7") and drops blank lines.
+    """
+    pending = None
+    for line in lines:
+        if not line.strip():
+            continue
+        if pending is not None:
+            m = _BROKEN_NUMBER_TAIL.search(pending)
+            if m and _DIGIT_START.match(line):
+                pending = pending[:m.start() + 2] + line.lstrip()
+                continue
+            yield pending
+        pending = line
+    if pending is not None:
+        yield pending
+
+
+# ---------- PIPELINE ----------
+def document_sections(pages, max_chars=None):
+    """
+    Runs page texts (any iterable, consumed lazily) through header/footer
+    removal, line cleaning and segmentation.
+
+    Returns (project_name, sections), where sections is a generator yielding
+    {section_id, title, content} dicts as each section ends. Only the first
+    PROJECT_NAME_LINES lines are read up front; after that the pipeline
+    holds a few pages plus the section being built.
+    """
+    from .ocr_processor import extract_project_name
+
+    page_lines = (text.splitlines() for text in pages)
+    lines = merge_numbered_lines(clean_lines(chain.from_iterable(strip_headers_footers(page_lines))))
+    head = list(islice(lines, PROJECT_NAME_LINES))
+    project_name = extract_project_name("\n".join(head))
+    return project_name, segment_lines(chain(head, lines), max_chars)
@@ -0,0 +1,27 @@
+from flask import Blueprint, jsonify
+from ..services import codebook_cache
+from ..services import llm_cache
+from ..services import prompt_budget
+
+cache_bp = Blueprint('cache_routes', __name__)
+
+
+@cache_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({
+        'status': 'success',
+        'llm_responses': llm_cache.cache_stats(),
+        'codebook_text': codebook_cache.cache_stats()
+    })
+
+
+@cache_bp.route('/cache/llm', methods=['DELETE'])
+def clear_llm_cache():
+    llm_cache.clear()
+    return jsonify({'status': 'success', 'message': 'LLM response cache cleared'})
+
+
+@cache_bp.route('/usage', methods=['GET'])
+def get_usage():
+    """Tokens and estimated cost of LLM calls since this process started."""
+    return jsonify({'status': 'success', 'usage': prompt_budget.usage_stats()})
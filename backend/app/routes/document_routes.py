@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 import os
-from werkzeug.utils import secure_filename
 from ..ocr.ocr_processor import extract_text_from_file  # ✅ relative import
+from ..services import document_registry
 document_bp = Blueprint('document', __name__, url_prefix='/api')
 
 
@@ -26,12 +26,10 @@ def upload_file():
         return jsonify({'status': 'error', 'message': 'No selected file'}), 400
 
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-
-        print("Processing file:", file_path)
-        result = extract_text_from_file(file_path)
+        # Stored by content hash; identical re-uploads reuse the cached extraction
+        document_id = document_registry.register_upload(file)
+        print("Processing document:", document_id)
+        result = document_registry.get_document(document_id, extract=extract_text_from_file)
 
         sections = result.get("sections")
         project_name = result.get("project_name")
@@ -45,6 +43,7 @@ def upload_file():
         return jsonify({
     'status': 'success',
     'message': 'Document uploaded and processed successfully',
+    'document_id': document_id,
     'metadata': {
         'project_name': project_name
     },
@@ -1,45 +1,22 @@
-from flask import Blueprint, jsonify
-import json, os
+import os
+from flask import Blueprint, Response, jsonify, request
+from ..services.subcategory_table import get_subcategory_table
 
 categories_bp = Blueprint("dubai_categories", __name__)
 
-PART_MAP = {
-    "A": "General & Compliance",
-    "B": "Architecture & Space Planning",
-    "C": "Accessibility",
-    "D": "Vertical Transportation",
-    "E": "Building Envelope",
-    "F": "Structure",
-    "G": "MEP & Utilities",
-    "H": "Indoor Environment",
-    "J": "Security",
-    "K": "Villas & Special Buildings"
-}
-
 
 @categories_bp.route("/dubai/categories", methods=["GET"])
 def get_dubai_categories():
     base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../shared/Dubai Book'))
     mapping_file = os.path.join(base_path, "dubai_dbc_subcategories.json")
 
-    if not os.path.exists(mapping_file):
+    try:
+        table = get_subcategory_table(mapping_file)
+    except FileNotFoundError:
         return jsonify({"error": "File not found"}), 404
 
-    with open(mapping_file, "r", encoding="utf-8") as f:
-        sub_map = json.load(f)
-
-    output = {}
-
-    for part_letter, cat_data in sub_map.items():
-        main_cat = PART_MAP.get(part_letter, part_letter)
-        output[main_cat] = []
-
-        subcategories = cat_data.get("subcategories", [])
-        for sub in subcategories:
-            output[main_cat].append({
-                "subcategory_id": sub["id"],
-                "subcategory_name": sub["name"],
-                "prefixes": sub.get("prefixes", [])
-            })
-
-    return jsonify(output)
\ No newline at end of file
+    # Body is serialized once per file version; clients revalidate with If-None-Match
+    response = Response(table.categories_body, mimetype="application/json")
+    response.set_etag(table.etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
@@ -0,0 +1,20 @@
+from flask import Blueprint, jsonify
+from ..services import warmup
+
+health_bp = Blueprint('health_routes', __name__)
+
+
+@health_bp.route('/health', methods=['GET'])
+def get_health():
+    """Liveness: the process is up and answering."""
+    state = warmup.warmup_state()
+    return jsonify({'status': 'success', 'pid': state['pid'], 'uptime_seconds': state['uptime_seconds']})
+
+
+@health_bp.route('/ready', methods=['GET'])
+def get_ready():
+    """Readiness: 200 once warm-up has finished, 503 before, so a load balancer skips cold workers."""
+    state = warmup.warmup_state()
+    if not state['ready']:
+        return jsonify({'status': 'error', 'message': 'Warming up', 'warmup': state}), 503
+    return jsonify({'status': 'success', 'warmup': state})
@@ -0,0 +1,80 @@
+from flask import Blueprint, request, jsonify, url_for
+from ..services import job_queue
+from ..services import match_pipeline
+from ..services.match_pipeline import MatchError, MatchCancelled
+from ..services.llm_cache import CompletionCancelled
+from .match_routes import document_id_from_request
+
+job_bp = Blueprint('job_routes', __name__)
+
+QUEUE_FULL_RETRY_AFTER = 10
+
+
+def _job_body(job):
+    body = dict(job.to_dict(), status='success')
+    body['status_url'] = url_for('job_routes.get_match_job', job_id=job.id)
+    body['result_url'] = url_for('job_routes.get_match_job_result', job_id=job.id)
+    return body
+
+
+def _unknown_job(job_id):
+    return jsonify({'status': 'error', 'message': f'Unknown job_id: {job_id}'}), 404
+
+
+@job_bp.route('/match/jobs', methods=['POST'])
+def create_match_job():
+    """Same form fields as /api/match; answers 202 with a job ID instead of waiting for the result."""
+    try:
+        options = match_pipeline.parse_match_options(request.form)
+        document_id = document_id_from_request()
+    except MatchError as e:
+        return jsonify({'status': 'error', 'message': e.message}), e.status
+
+    try:
+        job = job_queue.submit('match', match_pipeline.run_match, document_id, options,
+                               cancelled_types=(MatchCancelled, CompletionCancelled))
+    except job_queue.QueueFull:
+        response = jsonify({'status': 'error', 'message': 'Too many match jobs pending, retry later'})
+        response.headers['Retry-After'] = str(QUEUE_FULL_RETRY_AFTER)
+        return response, 429
+
+    response = jsonify(dict(_job_body(job), document_id=document_id))
+    response.headers['Location'] = url_for('job_routes.get_match_job', job_id=job.id)
+    return response, 202
+
+
+@job_bp.route('/match/jobs/<job_id>', methods=['GET'])
+def get_match_job(job_id):
+    job = job_queue.get_job(job_id)
+    if job is None:
+        return _unknown_job(job_id)
+    return jsonify(_job_body(job))
+
+
+@job_bp.route('/match/jobs/<job_id>/result', methods=['GET'])
+def get_match_job_result(job_id):
+    """The /api/match response body once the job has succeeded; 202 with the job state until then."""
+    job = job_queue.get_job(job_id)
+    if job is None:
+        return _unknown_job(job_id)
+    body = _job_body(job)
+    if body['state'] == job_queue.SUCCEEDED:
+        return jsonify(job.result)
+    if body['state'] == job_queue.FAILED:
+        return jsonify({'status': 'error', 'message': job.error, 'job': body}), job.error_status or 500
+    if body['state'] == job_queue.CANCELLED:
+        return jsonify({'status': 'error', 'message': 'Job cancelled', 'job': body}), 409
+    return jsonify(body), 202
+
+
+@job_bp.route('/match/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_match_job(job_id):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return _unknown_job(job_id)
+    return jsonify(_job_body(job))
+
+
+@job_bp.route('/match/jobs', methods=['GET'])
+def get_match_job_stats():
+    return jsonify({'status': 'success', 'jobs': job_queue.job_stats()})
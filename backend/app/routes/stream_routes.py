@@ -0,0 +1,97 @@
+import os
+import json
+import queue
+from flask import Blueprint, Response, request, jsonify
+from ..services import job_queue
+from ..services import match_pipeline
+from ..services.match_pipeline import MatchError, MatchCancelled
+from ..services.llm_cache import CompletionCancelled
+from .match_routes import document_id_from_request
+from .job_routes import QUEUE_FULL_RETRY_AFTER
+
+stream_bp = Blueprint('stream_routes', __name__)
+
+STREAM_KEEPALIVE_SECONDS = int(os.getenv('MATCH_STREAM_KEEPALIVE_SECONDS', '15'))
+
+
+def _format_ndjson(event, data):
+    return json.dumps({'event': event, 'data': data}, ensure_ascii=False) + "\n"
+
+
+def _format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@stream_bp.route('/match/stream', methods=['POST'])
+def stream_match():
+    """
+    Same form fields as /api/match, answered incrementally: one event per line
+    (NDJSON), or Server-Sent Events when the client sends Accept: text/event-stream.
+
+    Events, in order: job, progress*, sections, matches* (per finished batch,
+    not yet de-duplicated), checklist, then either result (the full /api/match
+    body) or error. Disconnecting cancels the match.
+    """
+    try:
+        options = match_pipeline.parse_match_options(request.form)
+        document_id = document_id_from_request()
+    except MatchError as e:
+        return jsonify({'status': 'error', 'message': e.message}), e.status
+
+    events = queue.Queue()
+
+    def emit(event, data):
+        events.put((event, data))
+
+    def run(progress=None, cancel_event=None):
+        try:
+            result = match_pipeline.run_match(document_id, options, progress=progress,
+                                              cancel_event=cancel_event, emit=emit)
+            emit('result', result)
+            return result
+        except MatchError as e:
+            emit('error', {'message': e.message, 'status': e.status})
+            raise
+        except (MatchCancelled, CompletionCancelled):
+            emit('error', {'message': 'Match cancelled', 'status': 409})
+            raise
+        except Exception as e:
+            emit('error', {'message': str(e), 'status': 500})
+            raise
+        finally:
+            events.put(None)
+
+    try:
+        job = job_queue.submit('match-stream', run, cancelled_types=(MatchCancelled, CompletionCancelled))
+    except job_queue.QueueFull:
+        response = jsonify({'status': 'error', 'message': 'Too many match jobs pending, retry later'})
+        response.headers['Retry-After'] = str(QUEUE_FULL_RETRY_AFTER)
+        return response, 429
+
+    use_sse = 'text/event-stream' in request.headers.get('Accept', '')
+    fmt = _format_sse if use_sse else _format_ndjson
+
+    def generate():
+        finished = False
+        try:
+            yield fmt('job', {'job_id': job.id, 'document_id': document_id})
+            while True:
+                try:
+                    item = events.get(timeout=STREAM_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    # Keeps proxies from closing an idle connection during long stages
+                    yield ": keepalive\n\n" if use_sse else fmt('keepalive', {})
+                    continue
+                if item is None:
+                    finished = True
+                    return
+                yield fmt(*item)
+        finally:
+            if not finished:
+                # Client went away: stop the match and its in-flight LLM calls
+                job_queue.cancel(job.id)
+
+    response = Response(generate(), mimetype='text/event-stream' if use_sse else 'application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,110 @@
+import os
+import json
+import threading
+from . import fanout
+from .prompt_budget import count_tokens
+
+MATCH_BATCH_TOKENS = int(os.getenv('MATCH_BATCH_TOKENS', '3000'))
+MATCH_BATCH_MAX_SECTIONS = int(os.getenv('MATCH_BATCH_MAX_SECTIONS', '20'))
+
+
+class PartialBatch(Exception):
+    """
+    Raised by a match_batch whose answer was cut off (e.g. at max_tokens):
+    `matches` holds what was parsed before the cut.
+    """
+
+    def __init__(self, matches, message):
+        super().__init__(message)
+        self.matches = matches
+
+
+def estimate_tokens(text):
+    """Token count from the local tokenizer (see prompt_budget.count_tokens)."""
+    return count_tokens(text)
+
+
+def section_tokens(section):
+    return estimate_tokens(json.dumps(section, ensure_ascii=False))
+
+
+def plan_batches(sections, max_tokens=None, max_sections=None):
+    """
+    Packs every section, in document order, into batches whose serialized size
+    stays under `max_tokens`. A section larger than the budget gets a batch of its own.
+    """
+    max_tokens = max_tokens or MATCH_BATCH_TOKENS
+    max_sections = max_sections or MATCH_BATCH_MAX_SECTIONS
+    batches, current, current_tokens = [], [], 0
+    for section in sections:
+        tokens = section_tokens(section)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_sections):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(section)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _match_key(match):
+    user_sec = match.get("user_section") or {}
+    clause = match.get("matched_clause") or {}
+    return (str(user_sec.get("section_id", "")).strip(),
+            str(clause.get("section_id", "")).strip(),
+            str(clause.get("codebook", "")).strip())
+
+
+def merge_matches(match_lists):
+    """Concatenates batch results, keeping the highest-scoring copy of duplicate matches."""
+    merged = {}
+    for matches in match_lists:
+        for match in matches:
+            key = _match_key(match)
+            kept = merged.get(key)
+            if kept is None or match.get("similarity_score", 0) > kept.get("similarity_score", 0):
+                merged[key] = match
+    return list(merged.values())
+
+
+def run_batched(sections, match_batch, max_tokens=None, max_concurrency=None, on_batch=None):
+    """
+    Plans token-budgeted batches over all `sections`, runs match_batch(batch)
+    concurrently and merges the results.
+    Returns (matches, coverage). Raises if every batch failed.
+    on_batch(outcome) sees each batch's fanout outcome as soon as it finishes.
+    A batch that raised PartialBatch keeps its matches but is reported as partial,
+    not evaluated, in the coverage.
+    """
+    batches = plan_batches(sections, max_tokens)
+    partial = {}    # id(batch) -> message
+    partial_lock = threading.Lock()
+
+    def run_one(batch):
+        try:
+            return match_batch(batch)
+        except PartialBatch as e:
+            print(f"[batch] Partial answer for a batch of {len(batch)} sections: {e}")
+            with partial_lock:
+                partial[id(batch)] = str(e)
+            return e.matches
+
+    outcomes = fanout.run_bounded(batches, run_one, max_concurrency, on_done=on_batch)
+
+    failed = [o for o in outcomes if o["error"]]
+    if outcomes and len(failed) == len(outcomes):
+        raise RuntimeError(f"All {len(outcomes)} match batches failed: {failed[0]['error']}")
+
+    matches = merge_matches(o["result"] for o in outcomes if not o["error"])
+    complete = [o for o in outcomes if not o["error"] and id(o["item"]) not in partial]
+    coverage = {
+        "total_sections": len(sections),
+        "evaluated_sections": sum(len(o["item"]) for o in complete),
+        "partial_sections": sum(len(o["item"]) for o in outcomes if id(o["item"]) in partial),
+        "batches": len(batches),
+        "failed_batches": len(failed),
+        "partial_batches": len(partial),
+        "errors": [o["error"] for o in failed] + list(partial.values())
+    }
+    return matches, coverage
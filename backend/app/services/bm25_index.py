@@ -0,0 +1,139 @@
+import re
+import math
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from .clause_splitter import split_clauses
+from .prompt_budget import count_tokens, truncate_to_tokens
+
+INDEX_CACHE_SIZE = 8
+DEFAULT_CONTEXT_CHARS = 12000
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+_STOPWORDS = frozenset("""
+a an and are as at be been but by for from has have in is it its of on or shall
+should that the their there these this to was were which will with within not no
+be any all such other than into per may must each where when
+""".split())
+
+_lock = threading.Lock()
+_indexes = OrderedDict()   # text digest -> BM25Index
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_PATTERN.findall((text or "").lower()) if t not in _STOPWORDS and len(t) > 1]
+
+
+class BM25Index:
+    """
+    Clause-level inverted index with Okapi BM25 scoring.
+    Postings are term -> list of (clause position, term frequency).
+    """
+
+    def __init__(self, clauses, k1=1.5, b=0.75):
+        self.clauses = clauses
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.doc_lengths = []
+
+        for pos, clause in enumerate(clauses):
+            tokens = tokenize(f"{clause['clause_id']} {clause['title']} {clause['content']}")
+            self.doc_lengths.append(len(tokens))
+            counts = defaultdict(int)
+            for tok in tokens:
+                counts[tok] += 1
+            for tok, tf in counts.items():
+                self.postings[tok].append((pos, tf))
+
+        n = len(clauses)
+        self.avg_length = (sum(self.doc_lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.clauses)
+
+    def search(self, query, k=5):
+        """Returns up to k (score, clause position) pairs, best first."""
+        scores = defaultdict(float)
+        k1, b, avg = self.k1, self.b, self.avg_length or 1.0
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for pos, tf in plist:
+                norm = k1 * (1 - b + b * self.doc_lengths[pos] / avg)
+                scores[pos] += idf * tf * (k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(score, pos) for pos, score in best]
+
+
+def get_index(codebook_text, clauses=None):
+    """
+    Returns the BM25 index for a code-book text, building it on first use.
+    Indexes are kept in memory (LRU, keyed by text digest) across requests.
+    `clauses` (e.g. a ClauseStore) are the text's pre-split clauses.
+    """
+    digest = hashlib.sha1(codebook_text.encode("utf-8", "ignore")).hexdigest()
+    with _lock:
+        index = _indexes.get(digest)
+        if index is not None:
+            _indexes.move_to_end(digest)
+            return index
+
+    index = BM25Index(clauses if clauses is not None else split_clauses(codebook_text))
+    with _lock:
+        _indexes[digest] = index
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def _section_query(section):
+    return " ".join(str(section.get(key, "")) for key in ("section_id", "title", "content"))
+
+
+def clause_size(content, max_tokens=None, model=None):
+    """Cost of one clause in the context: tokens when budgeting by max_tokens, else characters."""
+    if max_tokens is None:
+        return len(content) + 2
+    return count_tokens(content, model) + 1
+
+
+def retrieve_context(user_sections, codebook_text, max_chars=DEFAULT_CONTEXT_CHARS, k_per_section=8,
+                     max_tokens=None, model=None, clauses=None):
+    """
+    Assembles prompt context from the top-k clauses for each user section.
+    Sections take turns contributing their next-best clause until the budget
+    (`max_tokens` for `model` if given, else `max_chars`) is used, so one long
+    section can't crowd out the rest. Selected clauses are emitted in code-book
+    order. Falls back to the head of the text when nothing scores (e.g. empty
+    sections). `clauses`, if given, are the text's pre-split clauses.
+    """
+    if not codebook_text:
+        return ""
+    index = get_index(codebook_text, clauses)
+    ranked = [[pos for _, pos in index.search(_section_query(sec), k_per_section)] for sec in user_sections]
+
+    budget = max_chars if max_tokens is None else max_tokens
+    selected, used = set(), 0
+    for rank in range(k_per_section):
+        for hits in ranked:
+            if rank >= len(hits) or hits[rank] in selected:
+                continue
+            pos = hits[rank]
+            size = clause_size(index.clauses[pos]["content"], max_tokens, model)
+            if used + size > budget:
+                continue
+            selected.add(pos)
+            used += size
+
+    if not selected:
+        if max_tokens is not None:
+            return truncate_to_tokens(codebook_text, max_tokens, model)
+        return codebook_text[:max_chars]
+    return "\n\n".join(index.clauses[pos]["content"] for pos in sorted(selected))
@@ -0,0 +1,40 @@
+import re
+
+# Clause headings in SBC text ("8.1.6.4.2  Development of ...", "SECTION 2104 ...")
+# and in the flattened Dubai sections ("A.3.2 References").
+CLAUSE_HEADER_PATTERN = re.compile(
+    r"^\s*((?:[A-Z]\.)?\d{1,4}(?:\.\d{1,3})+|(?:SECTION|CHAPTER)\s+\d+|[A-Z]\.\d{1,3})\s+(\S.*)$"
+)
+
+
+def split_clauses(text, max_chars=4000):
+    """
+    Splits code-book text into clause records {clause_id, title, content}.
+    Text before the first heading becomes a "preamble" clause; clauses longer
+    than `max_chars` are cut into consecutive parts sharing the same clause_id.
+    """
+    clauses = []
+    clause_id, title, buffer = "preamble", "", []
+
+    def flush():
+        content = "\n".join(buffer).strip()
+        if not content:
+            return
+        for start in range(0, len(content), max_chars):
+            clauses.append({
+                "clause_id": clause_id,
+                "title": title,
+                "content": content[start:start + max_chars]
+            })
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        m = CLAUSE_HEADER_PATTERN.match(stripped)
+        if m:
+            flush()
+            clause_id, title, buffer = m.group(1), m.group(2).strip(), []
+        buffer.append(stripped)
+    flush()
+    return clauses
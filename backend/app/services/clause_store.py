@@ -0,0 +1,238 @@
+import os
+import mmap
+import struct
+import threading
+from . import codebook_cache
+from .clause_splitter import split_clauses
+from .section_index import SectionIndex
+
+CLAUSE_STORE_DIR = os.path.join(os.getcwd(), 'shared', 'clause_store')
+
+# File layout (little-endian):
+#   header   magic, format version, clause count, split max_chars,
+#            source size, source mtime_ns, source sha256
+#   offsets  one record per clause: (offset, length) of key, clause_id, title and
+#            content in the blob
+#   blob     UTF-8 text
+STORE_MAGIC = b'SBCS'
+STORE_VERSION = 1
+_HEADER = struct.Struct('<4sIIIQq32s')
+_RECORD = struct.Struct('<8I')
+_FIELDS = ('key', 'clause_id', 'title', 'content')
+
+_lock = threading.Lock()
+_loaded = {}   # codebook_id -> (size, mtime_ns, ClauseStore)
+
+
+class StaleClauseStore(Exception):
+    """The store was built from another version of its PDF, or by another format version."""
+
+
+def store_path(codebook_id):
+    return os.path.join(CLAUSE_STORE_DIR, f"{codebook_id}.clauses")
+
+
+def codebook_id_for(pdf_name):
+    """Codebook ID of a PDF in shared/codebooks ("SBC-305_Masonary.pdf" -> "SBC-305")."""
+    return os.path.splitext(os.path.basename(pdf_name))[0].split('_')[0]
+
+
+# ---------- BUILD ----------
+def clause_records(text, max_chars=4000):
+    """
+    split_clauses records with a stable `key` each: the clause ID, suffixed
+    "#2", "#3", ... when the same ID occurs again (table of contents, repeated
+    headings, parts of long clauses). Keys depend only on the text.
+    """
+    seen = {}
+    records = []
+    for clause in split_clauses(text, max_chars=max_chars):
+        n = seen[clause['clause_id']] = seen.get(clause['clause_id'], 0) + 1
+        key = clause['clause_id'] if n == 1 else f"{clause['clause_id']}#{n}"
+        records.append(dict(clause, key=key))
+    return records
+
+
+def write_store(path, records, source_path, max_chars):
+    """Writes `records` next to a stamp of `source_path` (size, mtime, sha256); atomic."""
+    st = os.stat(source_path)
+    digest = bytes.fromhex(codebook_cache.file_digest(source_path))
+    table, blob, offset = [], [], 0
+    for record in records:
+        row = []
+        for field in _FIELDS:
+            data = record[field].encode('utf-8')
+            row.extend((offset, len(data)))
+            blob.append(data)
+            offset += len(data)
+        table.append(_RECORD.pack(*row))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(STORE_MAGIC, STORE_VERSION, len(records), max_chars,
+                             st.st_size, st.st_mtime_ns, digest))
+        f.writelines(table)
+        f.writelines(blob)
+    os.replace(tmp, path)
+    return offset
+
+
+def build_store(codebook_id, max_chars=4000):
+    """
+    Segments a codebook PDF from shared/codebooks into clause records and writes
+    its store to shared/clause_store. Returns (path, records). Raises ValueError,
+    without writing a store, when the PDF yields no text (unreadable or scanned)
+    or no clauses, so the matcher keeps falling back to the PDF.
+    """
+    source = codebook_cache.find_codebook_path(codebook_id)
+    if not source:
+        raise FileNotFoundError(f"Codebook {codebook_id} not found in {codebook_cache.CODEBOOK_DIR}")
+    text = codebook_cache.get_codebook_text(source)
+    if not text or not text.strip():
+        raise ValueError(f"No text could be extracted from {os.path.basename(source)}")
+    records = clause_records(text, max_chars)
+    if not records:
+        raise ValueError(f"No clauses found in {os.path.basename(source)}")
+    path = store_path(codebook_id)
+    write_store(path, records, source, max_chars)
+    return path, records
+
+
+# ---------- READ ----------
+class ClauseStore:
+    """
+    Read-only view of a clause store file. The file is memory-mapped, so worker
+    processes share its pages; a clause is decoded only when it is accessed.
+    Behaves as a sequence of {key, clause_id, title, content} dicts in
+    code-book order, so it can stand in for a split_clauses list.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            raise StaleClauseStore(f"{path} is truncated")
+        magic, version, count, max_chars, size, mtime_ns, digest = _HEADER.unpack_from(self._map, 0)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            raise StaleClauseStore(f"{path} has format {magic!r} v{version}, expected {STORE_MAGIC!r} v{STORE_VERSION}")
+        self.path = path
+        self.count = count
+        self.max_chars = max_chars
+        self.source_size = size
+        self.source_mtime_ns = mtime_ns
+        self.source_sha256 = digest.hex()
+        self._blob_start = _HEADER.size + count * _RECORD.size
+        self._text = None
+        self._ids = None
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self[i] for i in range(*pos.indices(self.count))]
+        if pos < 0:
+            pos += self.count
+        if not 0 <= pos < self.count:
+            raise IndexError(pos)
+        row = _RECORD.unpack_from(self._map, _HEADER.size + pos * _RECORD.size)
+        start = self._blob_start
+        return {
+            field: self._map[start + row[2 * i]:start + row[2 * i] + row[2 * i + 1]].decode('utf-8')
+            for i, field in enumerate(_FIELDS)
+        }
+
+    def __iter__(self):
+        return (self[pos] for pos in range(self.count))
+
+    def text(self):
+        """All clause contents, one paragraph each (what the BM25 fallback slices)."""
+        if self._text is None:
+            self._text = "\n\n".join(clause['content'] for clause in self)
+        return self._text
+
+    def _id_index(self):
+        if self._ids is None:
+            self._ids = SectionIndex([{"section_id": clause['clause_id'], "position": pos}
+                                      for pos, clause in enumerate(self)])
+        return self._ids
+
+    def get(self, clause_id):
+        """Every clause with this ID, in code-book order."""
+        return [self[entry["position"]] for entry in self._id_index().get(clause_id)]
+
+    def query(self, prefixes, depth=1):
+        """Clauses under any of the dotted ID prefixes (see SectionIndex.query)."""
+        return [self[entry["position"]] for entry in self._id_index().query(prefixes, depth)]
+
+    def close(self):
+        self._map.close()
+
+
+def _is_current(store, codebook_id):
+    """False when the codebook's PDF has changed since the store was built (missing PDF: trust the store)."""
+    source = codebook_cache.find_codebook_path(codebook_id)
+    if not source:
+        return True
+    st = os.stat(source)
+    if st.st_size == store.source_size and st.st_mtime_ns == store.source_mtime_ns:
+        return True
+    if codebook_cache.file_digest(source) != store.source_sha256:
+        return False
+    # Touched but unchanged: hash it once, not on every lookup
+    store.source_size, store.source_mtime_ns = st.st_size, st.st_mtime_ns
+    return True
+
+
+def load_clause_store(codebook_id):
+    """
+    Returns the ClauseStore for `codebook_id`, or None if none has been
+    ingested (scripts/ingest_codebooks.py) or it is stale. Each process maps
+    the file once and re-opens it only when it is rewritten.
+    """
+    path = store_path(codebook_id)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    cached = _loaded.get(codebook_id)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        if cached[2] is None or _is_current(cached[2], codebook_id):
+            return cached[2]
+        _loaded.pop(codebook_id, None)
+
+    with _lock:
+        cached = _loaded.get(codebook_id)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        try:
+            store = ClauseStore(path)
+            if not _is_current(store, codebook_id):
+                store.close()
+                raise StaleClauseStore(f"{path} was built from an older {codebook_id} PDF")
+            if not len(store):
+                store.close()
+                raise StaleClauseStore(f"{path} has no clauses")
+        except (StaleClauseStore, OSError, ValueError, struct.error) as e:
+            print(f"[clause_store] Ignoring {codebook_id} store: {e}")
+            _loaded[codebook_id] = (st.st_size, st.st_mtime_ns, None)
+            return None
+        _loaded[codebook_id] = (st.st_size, st.st_mtime_ns, store)
+        print(f"[clause_store] Mapped {len(store)} clauses from {os.path.basename(path)}")
+        return store
+
+
+def get_codebook_clauses(codebook_id):
+    """
+    (text, clauses) for a codebook: from its clause store when there is a
+    current one, else (extracted PDF text, None) so callers split it
+    themselves. (None, None) if the codebook doesn't exist at all.
+    """
+    store = load_clause_store(codebook_id)
+    if store is not None:
+        return store.text(), store
+    path, text = codebook_cache.get_codebook_text_by_id(codebook_id)
+    if not path:
+        return None, None
+    return text, None
@@ -0,0 +1,173 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# ---------- CONFIG ----------
+CODEBOOK_DIR = os.path.join(os.getcwd(), 'shared', 'codebooks')
+CACHE_DIR = os.path.join(os.getcwd(), 'shared', 'cache', 'codebook_text')
+MEMORY_CACHE_SIZE = int(os.getenv('CODEBOOK_CACHE_SIZE', '8'))
+
+_lock = threading.Lock()
+_memory_cache = OrderedDict()   # digest -> extracted text (LRU order)
+_digest_by_path = {}            # abs path -> (size, mtime_ns, digest)
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+
+# ---------- UTILITIES ----------
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's content, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def read_pdf_text(pdf_path):
+    """Extracts all text from a PDF file (uncached); raises when the file cannot be read."""
+    from PyPDF2 import PdfReader
+    reader = PdfReader(pdf_path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def extract_pdf_text(pdf_path):
+    """Extracts all text from a PDF file (uncached); "" when the file cannot be read."""
+    try:
+        return read_pdf_text(pdf_path)
+    except Exception as e:
+        print(f"[codebook_cache] Error reading {pdf_path}: {e}")
+        return ""
+
+
+def find_codebook_path(codebook_id, codebook_dir=None):
+    """Returns the PDF path in shared/codebooks whose name starts with codebook_id, or None."""
+    codebook_dir = codebook_dir or CODEBOOK_DIR
+    if not os.path.isdir(codebook_dir):
+        return None
+    for fname in sorted(os.listdir(codebook_dir)):
+        if fname.startswith(codebook_id) and fname.lower().endswith('.pdf'):
+            return os.path.join(codebook_dir, fname)
+    return None
+
+
+def _current_digest(path):
+    """
+    Returns the content digest for `path`, re-hashing only when size or mtime changed.
+    Entries belonging to a previous version of the file are evicted.
+    """
+    st = os.stat(path)
+    cached = _digest_by_path.get(path)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+
+    digest = file_digest(path)
+    if cached and cached[2] != digest:
+        _evict(cached[2])
+    _digest_by_path[path] = (st.st_size, st.st_mtime_ns, digest)
+    return digest
+
+
+def _disk_paths(digest):
+    return (os.path.join(CACHE_DIR, f"{digest}.txt"),
+            os.path.join(CACHE_DIR, f"{digest}.json"))
+
+
+def _evict(digest):
+    _memory_cache.pop(digest, None)
+    for p in _disk_paths(digest):
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+
+def _remember(digest, text):
+    _memory_cache[digest] = text
+    _memory_cache.move_to_end(digest)
+    while len(_memory_cache) > MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+
+
+def _read_disk(digest):
+    text_path, meta_path = _disk_paths(digest)
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(text_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except (OSError, ValueError):
+        return None
+
+
+def _write_disk(digest, text, source_path, mtime_ns):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    text_path, meta_path = _disk_paths(digest)
+    # Write to temp files first so a concurrent reader never sees a partial entry
+    for path, payload in ((text_path, text),
+                          (meta_path, json.dumps({"source": os.path.basename(source_path),
+                                                  "sha256": digest,
+                                                  "mtime_ns": mtime_ns}))):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp, path)
+
+
+# ---------- PUBLIC API ----------
+def get_codebook_text(pdf_path):
+    """
+    Returns extracted text for a codebook PDF.
+    Lookup order: in-process LRU -> on-disk store (shared/cache) -> PyPDF2 extraction.
+    Entries are keyed by content hash; size/mtime decide when the file is re-hashed,
+    so editing a PDF invalidates its entry.
+    """
+    path = os.path.abspath(pdf_path)
+    with _lock:
+        digest = _current_digest(path)
+        mtime_ns = _digest_by_path[path][1]
+        if digest in _memory_cache:
+            _memory_cache.move_to_end(digest)
+            _stats["memory_hits"] += 1
+            return _memory_cache[digest]
+
+    text = _read_disk(digest)
+    if text is not None:
+        with _lock:
+            _stats["disk_hits"] += 1
+            _remember(digest, text)
+        return text
+
+    with _lock:
+        _stats["misses"] += 1
+    # A failed or empty extraction is not cached, so the next call tries again
+    try:
+        text = read_pdf_text(path)
+    except Exception as e:
+        print(f"[codebook_cache] Error reading {path}: {e}")
+        return ""
+    if not text.strip():
+        print(f"[codebook_cache] No text extracted from {path}; not caching it")
+        return text
+
+    try:
+        _write_disk(digest, text, path, mtime_ns)
+    except OSError as e:
+        print(f"[codebook_cache] Could not persist cache entry for {path}: {e}")
+    with _lock:
+        _remember(digest, text)
+    return text
+
+
+def get_codebook_text_by_id(codebook_id):
+    """Resolves codebook_id in shared/codebooks and returns (path, text); (None, '') if missing."""
+    path = find_codebook_path(codebook_id)
+    if not path:
+        return None, ""
+    return path, get_codebook_text(path)
+
+
+def cache_stats():
+    with _lock:
+        return dict(_stats, memory_entries=len(_memory_cache))
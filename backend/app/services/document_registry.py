@@ -0,0 +1,140 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from werkzeug.utils import secure_filename
+
+UPLOAD_FOLDER = os.path.join(os.getcwd(), 'shared', 'uploads')
+REGISTRY_DIR = os.path.join(os.getcwd(), 'shared', 'cache', 'documents')
+MEMORY_CACHE_SIZE = 32
+
+# Bump when extraction/segmentation output changes so cached sections are rebuilt
+EXTRACTOR_VERSION = 4
+
+_DOCUMENT_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+_lock = threading.Lock()
+_extractions = {}               # document_id -> {lock, users, record} while requests extract it
+_records = OrderedDict()        # document_id -> record (LRU)
+
+
+def _record_path(document_id):
+    return os.path.join(REGISTRY_DIR, f"{document_id}.json")
+
+
+def is_document_id(value):
+    return bool(value) and bool(_DOCUMENT_ID_PATTERN.match(value))
+
+
+def register_upload(file_storage):
+    """
+    Saves an uploaded file under its content hash and returns its document ID.
+    Re-uploading identical bytes returns the same ID without rewriting the file.
+    """
+    filename = secure_filename(file_storage.filename)
+    ext = os.path.splitext(filename)[1].lower()
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+    tmp_path = os.path.join(UPLOAD_FOLDER, f".upload-{os.getpid()}-{threading.get_ident()}{ext}")
+    h = hashlib.sha256()
+    with open(tmp_path, 'wb') as out:
+        for block in iter(lambda: file_storage.stream.read(1024 * 1024), b''):
+            h.update(block)
+            out.write(block)
+    document_id = h.hexdigest()
+
+    stored_path = os.path.join(UPLOAD_FOLDER, f"{document_id}{ext}")
+    if os.path.exists(stored_path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, stored_path)
+
+    meta_path = _record_path(document_id)
+    if not os.path.exists(meta_path):
+        _write_record({"document_id": document_id, "filename": filename, "path": stored_path})
+    return document_id
+
+
+def _write_record(record):
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    path = _record_path(record["document_id"])
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read_record(document_id):
+    with _lock:
+        record = _records.get(document_id)
+        if record is not None:
+            _records.move_to_end(document_id)
+            return record
+    try:
+        with open(_record_path(document_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _remember(record):
+    with _lock:
+        _records[record["document_id"]] = record
+        _records.move_to_end(record["document_id"])
+        while len(_records) > MEMORY_CACHE_SIZE:
+            _records.popitem(last=False)
+
+
+def get_document(document_id, extract=None):
+    """
+    Returns {document_id, filename, project_name, sections} for a registered document,
+    running `extract(path)` (extract_text_from_file) only the first time.
+    Returns None for unknown IDs. A result without sections is not stored, in
+    memory or on disk, so the next request extracts again; requests that were
+    waiting on that extraction get its result instead of running their own.
+    """
+    if not is_document_id(document_id):
+        return None
+    record = _read_record(document_id)
+    if record is None:
+        return None
+    if record.get("extractor_version") == EXTRACTOR_VERSION and record.get("sections"):
+        _remember(record)
+        return record
+
+    # The entry lives while any request uses it, so a late request queues on the same lock
+    with _lock:
+        extraction = _extractions.setdefault(document_id, {"lock": threading.Lock(), "users": 0, "record": None})
+        extraction["users"] += 1
+    try:
+        with extraction["lock"]:
+            if extraction["record"] is not None:
+                return extraction["record"]
+            # Another request may have finished extracting (or the record been removed) while we waited
+            record = _read_record(document_id)
+            if record is None:
+                return None
+            if record.get("extractor_version") != EXTRACTOR_VERSION or not record.get("sections"):
+                if not os.path.exists(record["path"]):
+                    print(f"[document_registry] Upload for {document_id} is missing: {record['path']}")
+                    return None
+                if extract is None:
+                    from ..ocr.ocr_processor import extract_text_from_file as extract
+                result = extract(record["path"])
+                record = dict(record,
+                              project_name=result.get("project_name"),
+                              sections=result.get("sections") or [],
+                              extractor_version=EXTRACTOR_VERSION)
+                if record["sections"]:
+                    _write_record(record)
+            if record["sections"]:
+                _remember(record)
+            extraction["record"] = record
+    finally:
+        with _lock:
+            extraction["users"] -= 1
+            if extraction["users"] == 0:
+                _extractions.pop(document_id, None)
+    return record
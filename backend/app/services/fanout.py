@@ -0,0 +1,59 @@
+import os
+import threading
+import contextlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+MATCH_MAX_CONCURRENCY = int(os.getenv('MATCH_MAX_CONCURRENCY', '4'))
+
+# Slots for LLM calls in flight, shared by every worker started in a bounded_calls() context
+_call_slots = contextvars.ContextVar('llm_call_slots', default=None)
+
+
+@contextlib.contextmanager
+def bounded_calls(max_concurrency=None):
+    """
+    Caps the LLM calls in flight in this context, and in the fanout workers it
+    starts (nested ones included), at `max_concurrency` in total.
+    """
+    token = _call_slots.set(threading.BoundedSemaphore(max(1, max_concurrency or MATCH_MAX_CONCURRENCY)))
+    try:
+        yield
+    finally:
+        _call_slots.reset(token)
+
+
+def call_slot():
+    """Context manager holding one LLM call slot for the duration of a call (a no-op outside bounded_calls)."""
+    slots = _call_slots.get()
+    return slots if slots is not None else contextlib.nullcontext()
+
+
+def run_bounded(items, fn, max_workers=None, on_done=None):
+    """
+    Runs fn(item) for every item on a bounded thread pool.
+    Returns one {"item", "result", "error"} dict per item, in input order,
+    so callers merge deterministically; a failing item never aborts the others.
+    on_done(outcome), if given, is called from the worker as each item finishes.
+    Workers run in a copy of the caller's context (e.g. its usage meter).
+    """
+    items = list(items)
+    if not items:
+        return []
+    max_workers = max(1, min(max_workers or MATCH_MAX_CONCURRENCY, len(items)))
+
+    def call(item):
+        try:
+            outcome = {"item": item, "result": fn(item), "error": None}
+        except Exception as e:
+            print(f"[fanout] {item!r} failed: {e}")
+            outcome = {"item": item, "result": None, "error": str(e)}
+        if on_done is not None:
+            on_done(outcome)
+        return outcome
+
+    if max_workers == 1:
+        return [call(item) for item in items]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, call, item) for item in items]
+        return [future.result() for future in futures]
@@ -1,5 +1,7 @@
 import re
 import logging
+from .subcategory_table import SubcategoryTable
+from .keyword_matcher import get_keyword_matcher
 
 logger = logging.getLogger(__name__)
 
@@ -26,15 +28,11 @@ def filter_matches_by_subcategory(matches, selected_subcategories, sub_map, sect
     """
     Filters GPT matches so only clauses from allowed subcategories pass through.
     Uses both prefix and keyword matching, but more forgiving than before.
+    `sub_map` is a compiled SubcategoryTable (or the raw mapping JSON).
     """
     # 1️⃣ Load allowed prefixes
-    allowed_prefixes = []
-    for part_letter, cat_data in sub_map.items():
-        for sub in cat_data.get("subcategories", []):
-            if sub["id"] in selected_subcategories:
-                allowed_prefixes.extend(sub.get("prefixes", []))
-
-    allowed_prefixes = sorted(set([p.strip() for p in allowed_prefixes if p.strip()]))
+    table = sub_map if isinstance(sub_map, SubcategoryTable) else SubcategoryTable(sub_map)
+    allowed_prefixes = table.resolve(selected_subcategories)[0]
 
     filtered_matches = []
     filtered_out_log = []
@@ -43,6 +41,8 @@ def filter_matches_by_subcategory(matches, selected_subcategories, sub_map, sect
     logger.info(f"Allowed keywords: {allowed_keywords}")
     logger.info(f"Matched before filtering: {len(matches)}")
 
+    clause_ids = []
+    clause_texts = []
     for match in matches:
         if "matched_clause" not in match or not isinstance(match["matched_clause"], dict):
             match["matched_clause"] = {}
@@ -54,17 +54,17 @@ def filter_matches_by_subcategory(matches, selected_subcategories, sub_map, sect
 
         canonical = normalize_section_id(raw_id, title, content)
         match["matched_clause"]["section_id"] = canonical
+        clause_ids.append(canonical)
+        clause_texts.append(title + " " + content)
 
-        # Relaxed prefix check: allow match if prefix OR keyword matches
-        prefix_ok = any(canonical.startswith(pref) for pref in allowed_prefixes)
-        keyword_ok = any(
-            kw.lower() in (title + " " + content).lower()
-            for kw in allowed_keywords
-        ) if allowed_keywords else False
-
-        if prefix_ok or keyword_ok:
+    # Relaxed check: allow match if prefix OR keyword matches (one batched pass)
+    matcher = get_keyword_matcher(allowed_keywords or (), allowed_prefixes)
+    for match, canonical, hits in zip(matches, clause_ids, matcher.match_batch(zip(clause_ids, clause_texts))):
+        if hits["ok"]:
             filtered_matches.append(match)
+            logger.debug(f"Kept {canonical}: prefixes={hits['prefixes']} keywords={hits['keywords']}")
         else:
+            content = match["matched_clause"].get("content", "") or ""
             filtered_out_log.append({
                 "reason": "no_match",
                 "canonical": canonical,
@@ -76,3 +76,23 @@ def filter_matches_by_subcategory(matches, selected_subcategories, sub_map, sect
         logger.info(f"{len(filtered_out_log)} matches filtered out. First few: {filtered_out_log[:3]}")
 
     return filtered_matches
+
+
+def filter_candidates(candidates, allowed_prefixes, allowed_keywords):
+    """
+    Pre-LLM variant: filters code-book sections (dicts with section_id,
+    section_title/title and content) in one batched pass over all candidates.
+    Returns (kept, hits) where hits[i] explains why kept[i] passed.
+    """
+    matcher = get_keyword_matcher(allowed_keywords or (), allowed_prefixes or ())
+    items = [
+        ((c.get("section_id") or "").strip(),
+         (c.get("section_title") or c.get("title") or "") + " " + (c.get("content") or ""))
+        for c in candidates
+    ]
+    kept, kept_hits = [], []
+    for cand, hits in zip(candidates, matcher.match_batch(items)):
+        if hits["ok"]:
+            kept.append(cand)
+            kept_hits.append(hits)
+    return kept, kept_hits
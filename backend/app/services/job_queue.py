@@ -0,0 +1,159 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+MATCH_JOB_WORKERS = int(os.getenv('MATCH_JOB_WORKERS', '2'))
+MATCH_JOB_QUEUE_DEPTH = int(os.getenv('MATCH_JOB_QUEUE_DEPTH', '8'))
+MATCH_JOB_TTL_SECONDS = int(os.getenv('MATCH_JOB_TTL_SECONDS', '3600'))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFull(Exception):
+    """Raised by submit() when MATCH_JOB_WORKERS + MATCH_JOB_QUEUE_DEPTH jobs are already pending."""
+
+
+class Job:
+    """One background match. Progress is updated from the worker thread."""
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.stage = None
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.error_status = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def update(self, stage, **details):
+        """progress(stage, **details) callback handed to the pipeline."""
+        with _lock:
+            self.stage = stage
+            self.progress = details
+
+    def to_dict(self):
+        with _lock:
+            return {
+                'job_id': self.id,
+                'kind': self.kind,
+                'state': self.status,
+                'stage': self.stage,
+                'progress': dict(self.progress),
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+
+
+_lock = threading.Lock()
+_jobs = OrderedDict()       # job_id -> Job, in submission order
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=MATCH_JOB_WORKERS, thread_name_prefix='match-job')
+    return _pool
+
+
+def _prune(now):
+    """Forgets finished jobs older than MATCH_JOB_TTL_SECONDS. Caller holds _lock."""
+    expired = [job_id for job_id, job in _jobs.items()
+               if job.status in FINISHED and now - job.finished_at > MATCH_JOB_TTL_SECONDS]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+def _finish(job, status, result=None, error=None, error_status=None):
+    with _lock:
+        job.status = status
+        job.result = result
+        job.error = error
+        job.error_status = error_status
+        job.finished_at = time.time()
+
+
+def _run(job, fn, cancelled_types, args, kwargs):
+    with _lock:
+        if job.status != QUEUED:
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+    if job.cancel_event.is_set():
+        # Cancelled after the pool had already picked it up
+        _finish(job, CANCELLED, error='Job cancelled')
+        return
+    try:
+        result = fn(*args, progress=job.update, cancel_event=job.cancel_event, **kwargs)
+    except Exception as e:
+        if job.cancel_event.is_set() or isinstance(e, cancelled_types):
+            _finish(job, CANCELLED, error='Job cancelled')
+        else:
+            print(f"[jobs] {job.kind} job {job.id} failed: {e}")
+            _finish(job, FAILED, error=str(e), error_status=getattr(e, 'status', 500))
+        return
+    if job.cancel_event.is_set():
+        _finish(job, CANCELLED, error='Job cancelled')
+    else:
+        _finish(job, SUCCEEDED, result=result)
+
+
+def submit(kind, fn, *args, cancelled_types=(), **kwargs):
+    """
+    Queues fn(*args, progress=..., cancel_event=..., **kwargs) on the job pool and
+    returns its Job. Raises QueueFull instead of queueing without bound.
+    """
+    job = Job(kind)
+    with _lock:
+        _prune(job.created_at)
+        pending = sum(1 for j in _jobs.values() if j.status in (QUEUED, RUNNING))
+        if pending >= MATCH_JOB_WORKERS + MATCH_JOB_QUEUE_DEPTH:
+            raise QueueFull(f"{pending} jobs already pending")
+        _jobs[job.id] = job
+    job.future = _get_pool().submit(_run, job, fn, tuple(cancelled_types), args, kwargs)
+    return job
+
+
+def get_job(job_id):
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def cancel(job_id):
+    """
+    Requests cancellation. A queued job is cancelled immediately; a running one
+    stops at its next checkpoint, aborting in-flight LLM calls. Returns the Job or None.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        if job.status in FINISHED:
+            return job
+        job.cancel_event.set()
+        queued = job.status == QUEUED
+    if queued and job.future is not None and job.future.cancel():
+        _finish(job, CANCELLED, error='Job cancelled')
+    return job
+
+
+def job_stats():
+    with _lock:
+        counts = {status: 0 for status in (QUEUED, RUNNING) + FINISHED}
+        for job in _jobs.values():
+            counts[job.status] += 1
+    counts['workers'] = MATCH_JOB_WORKERS
+    counts['queue_depth'] = MATCH_JOB_QUEUE_DEPTH
+    return counts
@@ -0,0 +1,171 @@
+import re
+import json
+
+# Inside an element only brackets and whole strings matter; a string still open at
+# the end of the buffer matches up to the end so it can be rescanned with more input.
+_TOKEN = re.compile(r'[{}\[\]]|"[^"\\]*(?:\\.[^"\\]*)*(?:"|\\?\Z)', re.S)
+_SPACE = " \t\r\n"
+_DECODER = json.JSONDecoder(strict=False)
+
+_SEARCH, _OPEN, _ARRAY, _ELEMENT, _DONE = range(5)
+
+
+def _ends_escaped(token):
+    """True if the closing quote of a string token is itself escaped (odd run of backslashes)."""
+    run = len(token) - 1 - len(token[:-1].rstrip('\\'))
+    return run % 2 == 1
+
+
+class JsonArrayParser:
+    """
+    Incremental, tolerant parser for a JSON array of objects embedded in model output.
+
+    feed(chunk) returns the objects completed by that chunk, so callers can
+    process each element as soon as its closing brace arrives. Every character
+    is scanned once (no backtracking). Tolerates:
+    - prose or markdown fences before the array, including stray "[...]" that
+      do not open an array of objects
+    - anything after the closing bracket
+    - a truncated final element (dropped; `truncated` is set)
+    - raw control characters inside strings
+    Elements that still fail to parse are skipped and counted in `skipped`.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._start = 0         # start of the element being scanned; nothing before it is needed
+        self._state = _SEARCH
+        self._depth = 0
+        self.found = False
+        self.truncated = False
+        self.skipped = 0
+
+    @property
+    def done(self):
+        return self._state == _DONE
+
+    def feed(self, chunk):
+        if self._state == _DONE or not chunk:
+            return []
+        # Drop consumed input once per chunk rather than once per element
+        keep = self._start if self._state == _ELEMENT else self._pos
+        self._buf = self._buf[keep:] + chunk
+        self._pos -= keep
+        self._start = 0
+        out = []
+        while self._step(out):
+            pass
+        return out
+
+    def close(self):
+        """Ends the input. Returns nothing new; marks an unfinished array as truncated."""
+        if self._state in (_OPEN, _ARRAY, _ELEMENT) and self.found:
+            self.truncated = True
+        return []
+
+    def _step(self, out):
+        """Advances as far as the buffer allows; returns False when more input is needed."""
+        buf, pos = self._buf, self._pos
+
+        if self._state == _SEARCH:
+            start = buf.find('[', pos)
+            if start == -1:
+                self._pos = len(buf)
+                return False
+            self._pos = start + 1
+            self._state = _OPEN
+            return True
+
+        if self._state in (_OPEN, _ARRAY):
+            while pos < len(buf) and (buf[pos] in _SPACE or (self._state == _ARRAY and buf[pos] == ',')):
+                pos += 1
+            self._pos = pos
+            if pos == len(buf):
+                return False
+            c = buf[pos]
+            if c == ']':
+                self.found = self.found or self._state == _OPEN
+                self._state = _DONE
+                return False
+            if c == '{':
+                self.found = True
+                # Fast path: the whole element is already buffered and valid
+                try:
+                    obj, end = _DECODER.raw_decode(buf, pos)
+                except ValueError:
+                    pass
+                else:
+                    out.append(obj)
+                    self._pos = end
+                    self._state = _ARRAY
+                    return True
+                self._state = _ELEMENT
+                self._start, self._depth = pos, 0
+                return True
+            if self._state == _OPEN:
+                # "[" that does not open an array of objects: keep looking
+                self._state = _SEARCH
+                return True
+            # Stray character between elements
+            self._pos = pos + 1
+            return True
+
+        if self._state == _ELEMENT:
+            while True:
+                m = _TOKEN.search(buf, pos)
+                if m is None:
+                    self._pos = len(buf)
+                    return False
+                c = m.group()
+                if c[0] == '"':
+                    if m.end() == len(buf) and (len(c) == 1 or c[-1] != '"' or _ends_escaped(c)):
+                        # String still open at the end of the buffer: rescan it with the next chunk
+                        self._pos = m.start()
+                        return False
+                    pos = m.end()
+                    continue
+                pos = m.end()
+                if c in '{[':
+                    self._depth += 1
+                    continue
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        out.append(_DECODER.decode(buf[self._start:pos]))
+                    except ValueError:
+                        self.skipped += 1
+                    self._pos = pos
+                    self._state = _ARRAY
+                    return True
+
+        return False
+
+
+def iter_json_array(chunks):
+    """
+    Yields the objects of the JSON array in `chunks` (an iterable of strings,
+    e.g. streamed completion deltas) as each one completes.
+    Raises ValueError if no array of objects was found.
+    """
+    parser = JsonArrayParser()
+    chunks = iter(chunks)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            # Drain the rest so the underlying stream finishes normally
+            for _ in chunks:
+                pass
+            break
+    parser.close()
+    if not parser.found:
+        raise ValueError("Unable to extract JSON array from response")
+    if parser.truncated:
+        print("[json_stream] Response ended inside the JSON array; kept the complete elements")
+    if parser.skipped:
+        print(f"[json_stream] Skipped {parser.skipped} unparseable element(s)")
+
+
+def parse_json_array(text):
+    """Whole-text form of iter_json_array; returns a list."""
+    return list(iter_json_array([text]))
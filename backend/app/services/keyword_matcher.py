@@ -0,0 +1,132 @@
+import re
+from bisect import bisect_right
+from functools import lru_cache
+
+# Separator between documents in batch mode; never appears in a keyword
+_DOC_SEPARATOR = "\x00"
+
+
+def _trie_regex(words):
+    """
+    Regex source for `words` factored by common prefix, e.g. ["scope", "stairs"] ->
+    "s(?:cope|tairs)". Python's re doesn't optimize plain alternations, so the
+    factored form lets each text position be rejected on its first character.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        is_end = "" in node
+        alternatives = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch != ""]
+        if not alternatives:
+            return ""
+        if len(alternatives) == 1 and not is_end:
+            return alternatives[0]
+        group = "(?:" + "|".join(alternatives) + ")"
+        return group + "?" if is_end else group
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Compiled matcher for one keyword/prefix set.
+
+    Keywords are folded into a single prefix-factored regex (inside a lookahead so
+    overlapping hits are still reported), so each text is lowercased and scanned
+    once regardless of how many keywords there are. Section-ID
+    prefixes live in a character trie, so a prefix check costs O(len(section_id)).
+    Semantics match the original filter: substring containment for keywords and
+    plain `str.startswith` for prefixes.
+    """
+
+    def __init__(self, keywords=(), prefixes=()):
+        self.keywords = sorted({k.strip().lower() for k in keywords if k and k.strip()},
+                               key=lambda k: (-len(k), k))
+        self.prefixes = sorted({p.strip() for p in prefixes if p and p.strip()})
+
+        self._pattern = None
+        if self.keywords:
+            self._pattern = re.compile(f"(?=({_trie_regex(self.keywords)}))")
+
+        # A regex hit reports the longest keyword at a position; shorter keywords
+        # that are prefixes of it start at the same position and hit as well.
+        self._implied = {
+            kw: [other for other in self.keywords if kw.startswith(other)]
+            for kw in self.keywords
+        }
+
+        self._trie = {}
+        for prefix in self.prefixes:
+            node = self._trie
+            for ch in prefix:
+                node = node.setdefault(ch, {})
+            node[None] = prefix
+
+    def prefix_hits(self, section_id):
+        """All allowed prefixes that `section_id` starts with."""
+        hits = []
+        node = self._trie
+        for ch in section_id or "":
+            node = node.get(ch)
+            if node is None:
+                break
+            if None in node:
+                hits.append(node[None])
+        return hits
+
+    def keyword_hits(self, text):
+        """All keywords contained in `text` (case-insensitive)."""
+        if self._pattern is None or not text:
+            return []
+        hits = set()
+        for m in self._pattern.finditer(text.lower()):
+            hits.update(self._implied[m.group(1)])
+        return sorted(hits)
+
+    def match(self, section_id, text):
+        """Returns {"ok", "prefixes", "keywords"} for one clause."""
+        prefixes = self.prefix_hits(section_id)
+        keywords = self.keyword_hits(text)
+        return {"ok": bool(prefixes or keywords), "prefixes": prefixes, "keywords": keywords}
+
+    def match_batch(self, items):
+        """
+        Batch mode: `items` is a sequence of (section_id, text) pairs.
+        All texts are lowercased and scanned in a single regex pass; hits are
+        mapped back to their item by offset. Returns one result dict per item.
+        """
+        items = list(items)
+        keyword_sets = [set() for _ in items]
+        if self._pattern is not None and items:
+            # Lowercase per item so offsets stay valid even if case folding changes length
+            texts = [(text or "").lower() for _, text in items]
+            starts = []
+            offset = 0
+            for text in texts:
+                starts.append(offset)
+                offset += len(text) + len(_DOC_SEPARATOR)
+            joined = _DOC_SEPARATOR.join(texts)
+            for m in self._pattern.finditer(joined):
+                idx = bisect_right(starts, m.start()) - 1
+                keyword_sets[idx].update(self._implied[m.group(1)])
+
+        results = []
+        for (section_id, _), kw_hits in zip(items, keyword_sets):
+            prefixes = self.prefix_hits(section_id)
+            results.append({"ok": bool(prefixes or kw_hits), "prefixes": prefixes, "keywords": sorted(kw_hits)})
+        return results
+
+
+@lru_cache(maxsize=64)
+def _cached_matcher(keywords, prefixes):
+    return KeywordMatcher(keywords, prefixes)
+
+
+def get_keyword_matcher(keywords=(), prefixes=()):
+    """Returns a compiled matcher, reused across requests for the same keyword/prefix set."""
+    return _cached_matcher(tuple(sorted(set(keywords or ()))), tuple(sorted(set(prefixes or ()))))
@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from .fanout import call_slot
+from .prompt_budget import count_message_tokens, count_tokens, record_usage
+
+LLM_CACHE_PATH = os.path.join(os.getcwd(), 'shared', 'cache', 'llm_responses.sqlite3')
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', '1') not in ('0', 'false', 'False')
+LLM_CACHE_TTL_SECONDS = int(os.getenv('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+
+# Per-request controls: "use" reads and writes, "refresh" skips the read but stores
+# the new answer, "bypass" neither reads nor writes.
+CACHE_MODES = ("use", "refresh", "bypass")
+
+_lock = threading.Lock()
+_conn = None
+_conn_pid = None
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "bypassed": 0}
+
+
+def _connection():
+    global _conn, _conn_pid
+    # SQLite connections must not cross a fork; each worker process opens its own
+    if _conn is None or _conn_pid != os.getpid():
+        _conn_pid = os.getpid()
+        os.makedirs(os.path.dirname(LLM_CACHE_PATH), exist_ok=True)
+        _conn = sqlite3.connect(LLM_CACHE_PATH, check_same_thread=False, timeout=30)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )""")
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        _conn.commit()
+    return _conn
+
+
+def fingerprint(model, messages, params):
+    """SHA-256 over model, messages and sampling parameters."""
+    payload = json.dumps({"model": model, "messages": messages, "params": params},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(key):
+    """Returns cached content for `key`, or None if missing or older than the TTL."""
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        row = conn.execute("SELECT content, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if now - row[1] > LLM_CACHE_TTL_SECONDS:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+            _stats["evictions"] += 1
+            return None
+        conn.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        conn.commit()
+        return row[0]
+
+
+def put(key, model, content):
+    """Stores a response and evicts least-recently-used rows beyond LLM_CACHE_MAX_ENTRIES."""
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, content, created_at, last_used, hits) VALUES (?, ?, ?, ?, ?, 0)",
+            (key, model, content, now, now))
+        count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > LLM_CACHE_MAX_ENTRIES:
+            excess = count - LLM_CACHE_MAX_ENTRIES
+            conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                (excess,))
+            _stats["evictions"] += excess
+        conn.commit()
+        _stats["writes"] += 1
+
+
+class CompletionCancelled(Exception):
+    """Raised when a chat completion is abandoned because its cancel_event was set."""
+
+
+class CompletionTruncated(Exception):
+    """Raised after a streamed answer that was cut off (finish_reason "length") has been yielded in full."""
+
+
+def _finish_reason_of(response):
+    """finish_reason of a streamed chunk, from either response style; None if absent."""
+    try:
+        choices = response.choices
+        return getattr(choices[0], "finish_reason", None) if choices else None
+    except AttributeError:
+        choices = response.get('choices') or []
+        return choices[0].get('finish_reason') if choices else None
+
+
+def _delta_of(chunk):
+    """Content delta of a streamed chunk, from either response style."""
+    try:
+        choices = chunk.choices
+        return (choices[0].delta.content or "") if choices else ""
+    except AttributeError:
+        choices = chunk.get('choices') or []
+        return (choices[0].get('delta', {}).get('content') or "") if choices else ""
+
+
+def _usage_of(response):
+    """(prompt_tokens, completion_tokens) reported by the API, or None."""
+    try:
+        usage = response.usage
+    except AttributeError:
+        usage = response.get('usage') if isinstance(response, dict) else None
+    if not usage:
+        return None
+    if isinstance(usage, dict):
+        return usage.get('prompt_tokens') or 0, usage.get('completion_tokens') or 0
+    return usage.prompt_tokens or 0, usage.completion_tokens or 0
+
+
+def _record(model, messages, content, usage):
+    """Records a call's usage, counting tokens locally when the API reported none."""
+    if usage is not None:
+        record_usage(model, *usage)
+    else:
+        record_usage(model, count_message_tokens(messages, model), count_tokens(content, model), estimated=True)
+
+
+def _stream(create, model, messages, cancel_event=None, **params):
+    """
+    Yields the content deltas of a streamed completion. A set cancel_event stops
+    reading and closes the connection instead of waiting for the full answer.
+    Usage is recorded when the stream ends, however it ends.
+    Returns (content, finish_reason) once the stream has been read to the end.
+    """
+    # The call holds one of the request's slots (see fanout.bounded_calls) until the stream ends
+    with call_slot():
+        if cancel_event is not None and cancel_event.is_set():
+            raise CompletionCancelled("Completion cancelled")
+        stream = create(model=model, messages=messages, stream=True,
+                        stream_options={"include_usage": True}, **params)
+        parts, usage, finish_reason = [], None, None
+        try:
+            for chunk in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise CompletionCancelled("Completion cancelled")
+                # The usage arrives on a final chunk without choices
+                usage = _usage_of(chunk) or usage
+                finish_reason = _finish_reason_of(chunk) or finish_reason
+                delta = _delta_of(chunk)
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            _record(model, messages, "".join(parts), usage)
+    return "".join(parts), finish_reason
+
+
+def _is_cacheable(cache_mode, params):
+    cacheable = (LLM_CACHE_ENABLED and cache_mode != "bypass"
+                 and params.get("temperature", 1.0) == 0)
+    if not cacheable:
+        with _lock:
+            _stats["bypassed"] += 1
+    return cacheable
+
+
+def _cached(key, cache_mode):
+    content = get(key) if cache_mode != "refresh" else None
+    with _lock:
+        _stats["hits" if content is not None else "misses"] += 1
+    return content
+
+
+def _cache_hit(key, model, cache_mode):
+    content = _cached(key, cache_mode)
+    if content is not None:
+        record_usage(model, 0, 0, cached=True)
+    return content
+
+
+def cached_chat_completion_stream(create, model, messages, cache_mode="use", cancel_event=None, **params):
+    """
+    Calls create(model=..., messages=..., stream=True, **params) and yields the
+    content in pieces as the model produces them, going through the response
+    cache for deterministic (temperature=0) calls; a cache hit arrives as one
+    piece. Setting `cancel_event` aborts the call while it is in flight
+    (CompletionCancelled). The full answer is stored once the stream has been
+    read to the end, if it finished with "stop". An answer cut off at max_tokens
+    is not stored, and CompletionTruncated is raised after its last piece, so
+    callers can tell it from a complete one.
+    """
+    cacheable = _is_cacheable(cache_mode, params)
+    key = fingerprint(model, messages, params) if cacheable else None
+    if cacheable:
+        content = _cache_hit(key, model, cache_mode)
+        if content is not None:
+            yield content
+            return
+
+    content, finish_reason = yield from _stream(create, model, messages, cancel_event, **params)
+    if finish_reason == "length":
+        raise CompletionTruncated(f"{model} answer was cut off at max_tokens={params.get('max_tokens')}")
+    if cacheable and content and finish_reason == "stop":
+        put(key, model, content)
+    elif cacheable and content:
+        print(f"[llm_cache] Not caching a {model} answer that ended with finish_reason={finish_reason!r}")
+
+
+def cache_stats():
+    with _lock:
+        stats = dict(_stats)
+        if _conn is not None or os.path.exists(LLM_CACHE_PATH):
+            stats["entries"] = _connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        else:
+            stats["entries"] = 0
+    stats["enabled"] = LLM_CACHE_ENABLED
+    return stats
+
+
+def clear():
+    with _lock:
+        conn = _connection()
+        conn.execute("DELETE FROM responses")
+        conn.commit()
@@ -0,0 +1,73 @@
+import re
+
+_LABEL = re.compile(r'^(?:section|requirement|clause)\b\s*', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_id(value):
+    """
+    Canonical form of a user-section or clause ID for joins: no leading
+    "Section"/"Requirement"/"Clause" label, no trailing punctuation, single
+    spaces, upper case. "Section 2.1." and "2.1" both become "2.1".
+    """
+    text = _LABEL.sub('', str(value or '').strip())
+    return _SPACES.sub(' ', text).strip(' .:-').upper()
+
+
+def _ancestors(key):
+    """'B.2.1' -> ['B', 'B.2']: whole dotted components only, so '2.1' is not an ancestor of '12.1.3'."""
+    parts = key.split('.')
+    return ['.'.join(parts[:i]) for i in range(1, len(parts))]
+
+
+class MatchIndex:
+    """
+    Hashed lookups over matches (user_section / matched_clause dicts) by
+    normalized ID. Built once in O(matches); each lookup is a few dict hits.
+    For every key the first match in input order wins, so results are
+    deterministic.
+    """
+
+    def __init__(self, matches):
+        self.by_user = {}
+        self.by_clause = {}
+        self.by_clause_prefix = {}      # ancestor ID -> first match whose clause sits under it
+        self.by_user_prefix = {}
+        for match in matches:
+            user_key = normalize_id((match.get('user_section') or {}).get('section_id'))
+            clause_key = normalize_id((match.get('matched_clause') or {}).get('section_id'))
+            self._add(self.by_user, self.by_user_prefix, user_key, match)
+            self._add(self.by_clause, self.by_clause_prefix, clause_key, match)
+
+    @staticmethod
+    def _add(exact, prefixes, key, match):
+        if not key:
+            return
+        exact.setdefault(key, match)
+        for ancestor in _ancestors(key):
+            prefixes.setdefault(ancestor, match)
+
+    def find(self, section_id):
+        """
+        The match for a checklist/section ID: exact user-section ID, then exact
+        clause ID, then the first clause (or user section) below it in the
+        hierarchy ('D.2' -> 'D.2.1'). None if nothing matches.
+        """
+        key = normalize_id(section_id)
+        if not key:
+            return None
+        for table in (self.by_user, self.by_clause, self.by_clause_prefix, self.by_user_prefix):
+            match = table.get(key)
+            if match is not None:
+                return match
+        return None
+
+
+def index_sections(sections):
+    """Normalized section_id -> first extracted user section with that ID."""
+    index = {}
+    for section in sections:
+        key = normalize_id(section.get('section_id'))
+        if key:
+            index.setdefault(key, section)
+    return index
@@ -0,0 +1,311 @@
+import os
+import json
+import threading
+from . import fanout
+from . import filter_utils
+from . import clause_store
+from . import document_registry
+from . import llm_cache
+from .subcategory_table import get_subcategory_table
+from .match_join import MatchIndex, index_sections, normalize_id
+from .prompt_budget import UsageMeter, metered
+
+sections_file_path = os.path.join(
+    os.getcwd(),
+    'shared',
+    'Dubai Book',
+    'dubai_building_code_sections.json'
+)
+
+REGIONS = ('saudi', 'dubai')
+
+
+class MatchError(Exception):
+    """A match request that cannot be served; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class MatchCancelled(Exception):
+    """Raised between stages once a match has been cancelled."""
+
+
+def _json_list(form, key):
+    try:
+        value = json.loads(form.get(key, '[]'))
+    except Exception:
+        return []
+    return value if isinstance(value, list) else []
+
+
+def parse_match_options(form):
+    """
+    Validates the /api/match form fields (everything but the document itself)
+    and returns them as a plain dict, so a match can run outside the request.
+    """
+    region = form.get('region', '').strip().lower()
+    if region not in REGIONS:
+        raise MatchError(f'Unsupported region: {region}')
+
+    # Per-request LLM cache control: use (default) / refresh / bypass
+    cache_mode = form.get('llm_cache', 'use').strip().lower()
+    if cache_mode not in llm_cache.CACHE_MODES:
+        raise MatchError(f'Unsupported llm_cache mode: {cache_mode}')
+
+    # Optional `max_concurrency`, capped at the server-wide MATCH_MAX_CONCURRENCY
+    try:
+        requested = int(form.get('max_concurrency', fanout.MATCH_MAX_CONCURRENCY))
+    except ValueError:
+        requested = fanout.MATCH_MAX_CONCURRENCY
+
+    options = {
+        'region': region,
+        'cache_mode': cache_mode,
+        'max_concurrency': max(1, min(requested, fanout.MATCH_MAX_CONCURRENCY))
+    }
+    if region == 'saudi':
+        options['codebook_ids'] = form.getlist('codebook_ids[]')
+        if not options['codebook_ids']:
+            raise MatchError('codebook_ids are required for Saudi')
+    else:
+        options['selected_chapters'] = _json_list(form, 'selected_chapters')
+        options['selected_subcategories'] = _json_list(form, 'selected_subcategories')
+        if not options['selected_subcategories'] and not options['selected_chapters']:
+            raise MatchError('At least one chapter or subcategory is required for Dubai')
+    return options
+
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise MatchCancelled('Match cancelled')
+
+
+def run_match(document_id, options, progress=None, cancel_event=None, emit=None):
+    """
+    Runs the full match for a registered document: extraction, code-book
+    matching, filtering and checklist generation. Returns the /api/match body.
+
+    progress(stage, **details) is called as each stage starts; setting
+    `cancel_event` stops the run at the next stage boundary and aborts
+    in-flight LLM calls. emit(event, data) receives partial results as they
+    become available: "progress", "sections", "matches" (one per finished
+    batch, not yet de-duplicated) and "checklist". The body's "usage" holds
+    the tokens and estimated cost of this run's LLM calls.
+    """
+    def report(stage, **details):
+        if progress is not None:
+            progress(stage, **details)
+        if emit is not None:
+            emit('progress', dict(details, stage=stage))
+
+    def publish(event, data):
+        if emit is not None:
+            emit(event, data)
+
+    report('extracting')
+    from ..ocr.ocr_processor import extract_text_from_file
+    document = document_registry.get_document(document_id, extract=extract_text_from_file)
+    if document is None:
+        raise MatchError(f'Unknown document_id: {document_id}', 404)
+    sections = document.get('sections')
+    if not sections or not isinstance(sections, list):
+        raise MatchError('No sections extracted', 500)
+    publish('sections', {'document_id': document_id, 'project_name': document.get('project_name'),
+                         'sections': sections})
+    _check_cancelled(cancel_event)
+
+    # max_concurrency caps the run's LLM calls in flight, across codebooks and batches
+    with metered(UsageMeter()) as usage, fanout.bounded_calls(options['max_concurrency']):
+        if options['region'] == 'saudi':
+            result = _run_saudi(document_id, sections, options, report, publish, cancel_event)
+        else:
+            result = _run_dubai(document_id, sections, options, report, publish, cancel_event)
+    result['usage'] = usage.to_dict()
+    return result
+
+
+# ---------- SAUDI ----------
+def _run_saudi(document_id, sections, options, report, publish, cancel_event):
+    from .openai_matcher import get_matching_clauses_openai_unified, generate_checklist_openai
+    from .matching_engine import index_name_for
+
+    codebook_ids = options['codebook_ids']
+    cache_mode = options['cache_mode']
+    done = {'count': 0}
+    done_lock = threading.Lock()
+    report('matching', completed=0, total=len(codebook_ids))
+
+    def match_codebook(codebook_id):
+        _check_cancelled(cancel_event)
+        # Ingested clause store if there is one, else the (cached) PDF text
+        codebook_text, clauses = clause_store.get_codebook_clauses(codebook_id)
+        if codebook_text is None:
+            raise FileNotFoundError(f"Codebook {codebook_id} not found")
+
+        def on_batch(outcome):
+            if not outcome['error']:
+                publish('matches', {'codebook_id': codebook_id, 'matches': outcome['result'],
+                                    'sections_evaluated': len(outcome['item'])})
+
+        try:
+            return get_matching_clauses_openai_unified(
+                sections, 'saudi', codebook_text, codebook_id,
+                index_name=index_name_for(codebook_id),
+                return_coverage=True,
+                cache_mode=cache_mode,
+                cancel_event=cancel_event,
+                on_batch=on_batch,
+                clauses=clauses,
+                max_concurrency=options['max_concurrency']
+            )
+        finally:
+            with done_lock:
+                done['count'] += 1
+                report('matching', completed=done['count'], total=len(codebook_ids), codebook_id=codebook_id)
+
+    # Codebooks are extracted and matched in parallel; results merge in request order
+    all_matches = []
+    codebook_errors = []
+    coverage = {}
+    for outcome in fanout.run_bounded(codebook_ids, match_codebook, options['max_concurrency']):
+        if outcome['error']:
+            codebook_errors.append({'codebook_id': outcome['item'], 'message': outcome['error']})
+        else:
+            matches, coverage[outcome['item']] = outcome['result']
+            all_matches.extend(matches)
+    _check_cancelled(cancel_event)
+    if len(codebook_errors) == len(codebook_ids):
+        details = "; ".join(f"{e['codebook_id']}: {e['message']}" for e in codebook_errors)
+        raise MatchError(f'Matching failed for every codebook ({details})', 502)
+
+    report('generating_checklist', matches=len(all_matches))
+    # Nothing to summarise: skip the (paid) checklist call
+    checklist = generate_checklist_openai(all_matches, 'saudi', cache_mode=cache_mode,
+                                          cancel_event=cancel_event) if all_matches else []
+    publish('checklist', {'checklist': checklist})
+    return {
+        'status': 'success',
+        'region': 'saudi',
+        'document_id': document_id,
+        'codebook_ids': codebook_ids,
+        'sections': sections,
+        'matched_clauses': all_matches,
+        'checklist': checklist,
+        'codebook_errors': codebook_errors,
+        'coverage': coverage
+    }
+
+
+# ---------- DUBAI ----------
+def _run_dubai(document_id, sections, options, report, publish, cancel_event):
+    from .openai_matcher import (
+        get_matching_clauses_openai_unified,
+        generate_checklist_openai,
+        load_dubai_code_sections
+    )
+
+    cache_mode = options['cache_mode']
+    selected_chapters = options['selected_chapters']
+    selected_subcategories = options['selected_subcategories']
+
+    # Prefer subcategories over chapters
+    selected_ids = selected_subcategories if selected_subcategories else selected_chapters
+    print(f"Selected chapters: {selected_chapters}")
+    print(f"Selected subcategories: {selected_subcategories}")
+    print(f"Using selected IDs for matching: {selected_ids}")
+
+    # Resolve allowed prefixes & keywords from the compiled subcategory table
+    sub_table = get_subcategory_table()
+    allowed_prefixes, allowed_keywords = sub_table.resolve(selected_ids)
+
+    print("Mapped prefixes:", allowed_prefixes)
+    print("Derived keywords:", allowed_keywords)
+
+    # Load Dubai sections for allowed prefixes
+    dubai_sections = load_dubai_code_sections(allowed_prefixes)
+    # Keep only candidates the post-match filter would accept, in one batched pass, before building the prompt
+    dubai_sections, _ = filter_utils.filter_candidates(dubai_sections, allowed_prefixes, allowed_keywords)
+    print("Dubai sections after candidate filtering:", len(dubai_sections))
+    if not dubai_sections:
+        raise MatchError('No matching Dubai sections found')
+
+    codebook_text = "\n".join(
+        f"{sec['section_id']} {sec['section_title']}\n{sec.get('content','')}"
+        for sec in dubai_sections
+    )
+
+    def filter_matches(matches):
+        # Filter matches using prefixes & keywords
+        return filter_utils.filter_matches_by_subcategory(
+            matches=matches,
+            selected_subcategories=selected_ids,
+            sub_map=sub_table,
+            sections_file_path=sections_file_path,
+            allowed_keywords=allowed_keywords
+        )
+
+    def on_batch(outcome):
+        # Published batches are filtered on copies; the merge below still sees the raw matches
+        if not outcome['error']:
+            batch = [dict(m, matched_clause=dict(m.get('matched_clause') or {})) for m in outcome['result']]
+            publish('matches', {'codebook_id': 'Dubai Building Code', 'matches': filter_matches(batch),
+                                'sections_evaluated': len(outcome['item'])})
+
+    # Get GPT matches
+    report('matching', completed=0, total=1)
+    matches, coverage = get_matching_clauses_openai_unified(
+        sections, 'dubai', codebook_text, 'Dubai Building Code',
+        return_coverage=True,
+        cache_mode=cache_mode,
+        cancel_event=cancel_event,
+        on_batch=on_batch,
+        max_concurrency=options['max_concurrency']
+    )
+    report('matching', completed=1, total=1)
+    _check_cancelled(cancel_event)
+    print("Matched before filtering:", len(matches))
+
+    filtered_matches = filter_matches(matches)
+    print("Matched after filtering:", len(filtered_matches))
+
+    # Generate checklist from filtered matches
+    report('generating_checklist', matches=len(filtered_matches))
+    checklist = generate_checklist_openai(filtered_matches, 'dubai', cache_mode=cache_mode, cancel_event=cancel_event)
+
+    # Enrich checklist: one hashed join against the matches and the extracted sections
+    match_index = MatchIndex(filtered_matches)
+    sections_by_id = index_sections(sections)
+    enriched_checklist = []
+    for chk in checklist:
+        related_match = match_index.find(chk.get("id"))
+        if related_match:
+            user_section = related_match.get("user_section") or {}
+            clause = related_match.get("matched_clause") or {}
+            section = sections_by_id.get(normalize_id(user_section.get("section_id"))) or {}
+            user_section_text = section.get("title") or user_section.get("title") or ""
+            chk["title"] = user_section_text or f"Section {chk.get('id')}"
+            chk["title_short"] = (
+                (user_section_text[:100].rsplit(" ", 1)[0] + "...") if len(user_section_text) > 100 else user_section_text
+            ) if user_section_text else chk["title"]
+            chk["reference"] = clause.get("section_id", "")
+            chk["description"] = clause.get("content", "")
+            chk["category"] = related_match.get("category", "")
+            chk["subcategory"] = related_match.get("subcategory", "")
+        else:
+            chk["title"] = str(chk.get("title", "")).replace("Section ", "Requirement ")
+        enriched_checklist.append(chk)
+    publish('checklist', {'checklist': enriched_checklist})
+
+    return {
+        'status': 'success',
+        'region': 'dubai',
+        'document_id': document_id,
+        'selected_ids': selected_ids,
+        'sections': sections,
+        'matched_clauses': filtered_matches,
+        'checklist': enriched_checklist,
+        'coverage': coverage
+    }
@@ -0,0 +1,198 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+from .clause_splitter import split_clauses
+from .bm25_index import tokenize, clause_size
+
+VECTOR_INDEX_DIR = os.path.join(os.getcwd(), 'shared', 'vector_index')
+DEFAULT_EMBEDDER = os.getenv('CLAUSE_EMBEDDER', 'hashing')
+
+_lock = threading.Lock()
+_loaded = {}   # index name -> (mtime_ns, VectorIndex)
+
+
+# ---------- EMBEDDERS ----------
+class HashingEmbedder:
+    """
+    Deterministic local embedder (feature hashing of unigrams + bigrams).
+    Needs no network or model files, so it is what offline runs and tests use.
+    """
+    name = "hashing"
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def _bucket(self, feature):
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        return h % self.dim, (1.0 if (h >> 63) & 1 else -1.0)
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                col, sign = self._bucket(feature)
+                vectors[row, col] += sign
+        return _normalize(vectors)
+
+
+class OpenAIEmbedder:
+    """Embeds through the OpenAI embeddings API, in batches."""
+    name = "openai"
+
+    def __init__(self, model="text-embedding-3-small", batch_size=128):
+        import openai
+        self.model = model
+        self.batch_size = batch_size
+        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'), base_url=os.getenv('OPENAI_BASE_URL') or None)
+        self.dim = None
+
+    def embed(self, texts):
+        rows = []
+        for start in range(0, len(texts), self.batch_size):
+            response = self.client.embeddings.create(model=self.model, input=texts[start:start + self.batch_size])
+            rows.extend(item.embedding for item in response.data)
+        vectors = np.asarray(rows, dtype=np.float32)
+        self.dim = vectors.shape[1] if len(rows) else self.dim
+        return _normalize(vectors)
+
+
+EMBEDDERS = {
+    "hashing": HashingEmbedder,
+    "openai": OpenAIEmbedder,
+}
+
+
+def get_embedder(name=None, **kwargs):
+    name = name or DEFAULT_EMBEDDER
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder '{name}'. Available: {sorted(EMBEDDERS)}")
+    return EMBEDDERS[name](**kwargs)
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def _clause_text(clause):
+    return f"{clause['clause_id']} {clause['title']}\n{clause['content']}"
+
+
+# ---------- PIPELINE ----------
+def split_codebook_by_clause(text, max_chars=4000):
+    """Splits a codebook into clause records {clause_id, title, content}."""
+    return split_clauses(text, max_chars=max_chars)
+
+
+def _index_paths(index_name):
+    return (os.path.join(VECTOR_INDEX_DIR, f"{index_name}.npy"),
+            os.path.join(VECTOR_INDEX_DIR, f"{index_name}.json"))
+
+
+def embed_and_store_clauses(clauses, index_name, embedder=None):
+    """
+    Embeds clauses and writes the index to shared/vector_index:
+    <index_name>.npy (float32, L2-normalized rows) and <index_name>.json (clause metadata).
+    Returns the number of clauses stored.
+    """
+    embedder = embedder or get_embedder()
+    vectors = embedder.embed([_clause_text(c) for c in clauses]) if clauses else np.zeros((0, 1), np.float32)
+
+    os.makedirs(VECTOR_INDEX_DIR, exist_ok=True)
+    vectors_path, meta_path = _index_paths(index_name)
+    meta = {
+        "embedder": embedder.name,
+        "embedder_options": {"dim": vectors.shape[1]} if embedder.name == "hashing" else {"model": embedder.model},
+        "clauses": clauses
+    }
+    # Metadata is written last and is what loaders check, so readers never see a half-written pair
+    tmp_vectors = f"{vectors_path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_vectors, vectors)
+    os.replace(tmp_vectors, vectors_path)
+    tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_meta, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_meta, meta_path)
+    print(f"[matching_engine] Stored {len(clauses)} clause vectors in {vectors_path}")
+    return len(clauses)
+
+
+# ---------- SEARCH ----------
+class VectorIndex:
+    """Memory-mapped clause vectors; top-k cosine search is a single matmul."""
+
+    def __init__(self, vectors, clauses, embedder):
+        self.vectors = vectors
+        self.clauses = clauses
+        self.embedder = embedder
+
+    def __len__(self):
+        return len(self.clauses)
+
+    def search_many(self, queries, k=5):
+        """Returns, per query, up to k (score, clause position) pairs, best first."""
+        if not len(self.clauses) or not queries:
+            return [[] for _ in queries]
+        q = self.embedder.embed(list(queries))
+        scores = q @ self.vectors.T
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, cols in enumerate(top):
+            ordered = cols[np.argsort(-scores[row, cols], kind="stable")]
+            results.append([(float(scores[row, c]), int(c)) for c in ordered])
+        return results
+
+    def search(self, query, k=5):
+        return self.search_many([query], k)[0]
+
+    def retrieve_context(self, user_sections, max_chars=12000, k_per_section=8, max_tokens=None, model=None):
+        """Same contract as bm25_index.retrieve_context, using vector similarity."""
+        queries = [" ".join(str(sec.get(key, "")) for key in ("section_id", "title", "content"))
+                   for sec in user_sections]
+        ranked = [[pos for _, pos in hits] for hits in self.search_many(queries, k_per_section)]
+
+        budget = max_chars if max_tokens is None else max_tokens
+        selected, used = set(), 0
+        for rank in range(k_per_section):
+            for hits in ranked:
+                if rank >= len(hits) or hits[rank] in selected:
+                    continue
+                size = clause_size(self.clauses[hits[rank]]["content"], max_tokens, model)
+                if used + size > budget:
+                    continue
+                selected.add(hits[rank])
+                used += size
+        return "\n\n".join(self.clauses[pos]["content"] for pos in sorted(selected))
+
+
+def load_vector_index(index_name):
+    """
+    Returns the VectorIndex for `index_name`, or None if it hasn't been built.
+    Vectors are opened with mmap_mode='r', so worker processes share the pages.
+    """
+    vectors_path, meta_path = _index_paths(index_name)
+    if not (os.path.exists(vectors_path) and os.path.exists(meta_path)):
+        return None
+
+    mtime_ns = os.stat(meta_path).st_mtime_ns
+    cached = _loaded.get(index_name)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+
+    with _lock:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        vectors = np.load(vectors_path, mmap_mode='r')
+        index = VectorIndex(vectors, meta["clauses"], get_embedder(meta["embedder"], **meta.get("embedder_options", {})))
+        _loaded[index_name] = (mtime_ns, index)
+        return index
+
+
+def index_name_for(codebook_id):
+    """Conventional vector index name for a codebook ID ("SBC-501" -> "sbc501")."""
+    return codebook_id.lower().replace('-', '').replace(' ', '_')
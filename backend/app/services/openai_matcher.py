@@ -1,74 +1,61 @@
 import os
 import re
 import json
-from PyPDF2 import PdfReader
-import openai
+import threading
+from .section_index import get_section_index
+from .bm25_index import retrieve_context
+from .matching_engine import load_vector_index
+from .batch_planner import run_batched, PartialBatch
+from .llm_cache import cached_chat_completion_stream, CompletionTruncated
+from .json_stream import iter_json_array
+from .match_join import MatchIndex
+from .prompt_budget import PromptBudget
+from .codebook_cache import extract_pdf_text  # re-exported; the one PyPDF2 extractor lives in codebook_cache
 
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+# An OpenAI-compatible endpoint to use instead of api.openai.com (e.g. scripts/openai_standin.py)
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None
+client = None   # built on first use, see get_client()
+_client_lock = threading.Lock()
+
+MATCH_MODEL = 'gpt-4-turbo'
+CHECKLIST_MODEL = 'gpt-4-turbo'
+MATCH_SYSTEM_PROMPT = "You are an expert in construction specifications and building codes. Output valid JSON only."
+CHECKLIST_SYSTEM_PROMPT = "You are a construction compliance expert."
+# Completion tokens one checklist entry takes, so the answer for every match fits the output reserve
+CHECKLIST_ENTRY_TOKENS = int(os.getenv('CHECKLIST_ENTRY_TOKENS', '300'))
 
 # ---------- UTILITIES ----------
-def extract_json_array(text):
-    """Robust JSON array extraction from GPT output."""
-    text = text.strip()
-    json_match = re.search(r'\[\s*\{.*\}\s*\]', text, re.DOTALL)
-    if json_match:
-        return json.loads(json_match.group(0))
-
-    array_start = text.find('[')
-    array_end = text.rfind(']')
-    if array_start != -1 and array_end != -1 and array_end > array_start:
-        return json.loads(text[array_start:array_end+1])
-
-    raise ValueError("Unable to extract JSON array from response")
-
-
-def extract_pdf_text(pdf_path):
-    """Extracts all text from a PDF file."""
-    text = []
-    try:
-        reader = PdfReader(pdf_path)
-        for page in reader.pages:
-            text.append(page.extract_text() or "")
-    except Exception as e:
-        print(f"Error reading {pdf_path}: {e}")
-    return "\n".join(text)
+def get_client():
+    """The OpenAI client; the SDK is imported and the client created by the first call."""
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                import openai
+                client = openai.OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+    return client
 
 
 # ---------- DUBAI HELPER ----------
-def load_dubai_code_sections(selected_ids):
+def load_dubai_code_sections(selected_ids, depth=1):
     """
     Load Dubai Building Code sections for the selected subcategories/chapters.
-    Expands each prefix to include its direct children (one level down).
+    Expands each prefix to include its children (one level down by default).
+    Served from the process-wide section index, which reloads when the file changes.
     """
-    base_path = os.path.join(os.getcwd(), 'shared', 'Dubai Book')
-    sections_file = os.path.join(base_path, 'dubai_building_code_sections.json')
-
-    if not os.path.exists(sections_file):
-        raise FileNotFoundError(f"Dubai building code sections file not found at {sections_file}")
-
-    with open(sections_file, 'r', encoding='utf-8') as f:
-        all_sections = json.load(f)
-
-    matched_sections = []
-    for sec in all_sections:
-        sec_id = sec.get("section_id", "")
-        for sel in selected_ids:
-            # Include exact match
-            if sec_id == sel:
-                matched_sections.append(sec)
-            # Include one-level children like H.3.1 of H.3
-            elif sec_id.startswith(sel + ".") and sec_id.count(".") == sel.count(".") + 1:
-                matched_sections.append(sec)
-
-    return matched_sections
+    return get_section_index().query(selected_ids, depth=depth)
 
 
 # ---------- PROMPTS ----------
-def build_match_prompt(user_sections, codebook_text, region, codebook_label):
+def build_match_prompt(user_sections, codebook_text, region, codebook_label, codebook_context=None):
     """
     Builds the strict GPT prompt for matching clauses to user specs.
+    Code-book context is the BM25 top clauses for these sections unless a
+    pre-selected `codebook_context` is passed in.
     """
+    if codebook_context is None:
+        codebook_context = retrieve_context(user_sections, codebook_text)
     return f"""
 You are a senior building code compliance officer specializing in {region.capitalize()} Building Code.
 
@@ -110,7 +97,7 @@ USER PROJECT SPEC SECTIONS:
 {json.dumps(user_sections, ensure_ascii=False, indent=2)}
 
 RELEVANT {region.upper()} BUILDING CODE TEXT:
-{codebook_text[:12000]}
+{codebook_context}
 """
 
 
@@ -164,100 +151,172 @@ Matched Data:
 
 
 # ---------- MAIN MATCHER ----------
-def get_matching_clauses_openai_unified(user_sections, region, codebook_text, codebook_label):
+def get_matching_clauses_openai_unified(user_sections, region, codebook_text, codebook_label,
+                                        index_name=None, return_coverage=False, cache_mode="use",
+                                        cancel_event=None, on_batch=None, clauses=None, max_concurrency=None):
     """
     Single matcher for both Saudi and Dubai.
     Returns matches in the nested structure that frontend expects.
+    Every user section is evaluated: sections are packed into token-budgeted
+    batches that run concurrently, and the merged matches are de-duplicated.
+    With return_coverage=True, returns (matches, coverage) instead.
+    `cache_mode` ("use" / "refresh" / "bypass") controls the LLM response cache;
+    setting `cancel_event` aborts batches that are still running or queued.
+    on_batch(outcome) receives each batch's matches as they arrive (before de-duplication).
+    `clauses` are codebook_text's pre-split clauses (a ClauseStore), if any.
+    At most `max_concurrency` batches run at once; inside fanout.bounded_calls the
+    request-wide cap on LLM calls in flight applies on top.
     """
-    processable_sections = user_sections[:10] if len(user_sections) > 10 else user_sections
-    prompt = build_match_prompt(processable_sections, codebook_text, region, codebook_label)
+    matches, coverage = run_batched(
+        user_sections,
+        lambda batch: _match_batch(batch, region, codebook_text, codebook_label, index_name, cache_mode,
+                                    cancel_event, clauses),
+        max_concurrency=max_concurrency,
+        on_batch=on_batch
+    )
+    print(f"[match] {codebook_label}: evaluated {coverage['evaluated_sections']}/{coverage['total_sections']} "
+          f"sections in {coverage['batches']} batches")
+    return (matches, coverage) if return_coverage else matches
 
-    response = client.chat.completions.create(
-        model='gpt-4-turbo',
+
+def _match_batch(batch_sections, region, codebook_text, codebook_label, index_name=None, cache_mode="use",
+                 cancel_event=None, clauses=None):
+    """
+    Matches one batch of user sections in a single GPT call.
+    If a clause vector index named `index_name` has been built, candidate
+    clauses come from it; otherwise from the BM25 index over `codebook_text`.
+    Code-book context gets the tokens left once the instructions and sections
+    are counted and the completion is reserved.
+    """
+    budget = PromptBudget(MATCH_MODEL)
+    context_tokens = budget.take(
+        MATCH_SYSTEM_PROMPT,
+        build_match_prompt(batch_sections, codebook_text, region, codebook_label, codebook_context="")
+    )
+    codebook_context = None
+    if index_name:
+        vector_index = load_vector_index(index_name)
+        if vector_index is not None:
+            codebook_context = vector_index.retrieve_context(batch_sections, max_tokens=context_tokens,
+                                                             model=MATCH_MODEL)
+    if codebook_context is None:
+        codebook_context = retrieve_context(batch_sections, codebook_text, max_tokens=context_tokens,
+                                            model=MATCH_MODEL, clauses=clauses)
+    prompt = build_match_prompt(batch_sections, codebook_text, region, codebook_label, codebook_context)
+
+    # Streamed: each match is parsed and normalized as soon as its object is complete
+    chunks = cached_chat_completion_stream(
+        get_client().chat.completions.create,
+        model=MATCH_MODEL,
         messages=[
-            {"role": "system", "content": "You are an expert in construction specifications and building codes. Output valid JSON only."},
+            {"role": "system", "content": MATCH_SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ],
-        temperature=0.0
+        cache_mode=cache_mode,
+        cancel_event=cancel_event,
+        temperature=0.0,
+        max_tokens=budget.output_tokens
     )
 
     # Raw GPT matches
-    raw_matches = extract_json_array(response.choices[0].message.content)
+    raw_matches = iter_json_array(chunks)
 
     # --- Normalize into the structure frontend expects ---
     normalized_matches = []
-    for m in raw_matches:
-        user_sec = m.get("user_section", {})
-        clause = m.get("matched_clause", {})
-
-        # Skip if clause totally empty
-        if not clause.get("section_id") and not clause.get("content", "").strip():
-            continue
-
-        normalized_matches.append({
-            "user_section": {
-                "section_id": user_sec.get("section_id", ""),
-                "title": user_sec.get("title", ""),
-                "content": user_sec.get("content", "")
-            },
-            "matched_clause": {
-                "section_id": clause.get("section_id", ""),
-                "title": clause.get("title", ""),
-                "content": clause.get("content", ""),
-                "codebook": clause.get("codebook", codebook_label)
-            },
-            "similarity_score": m.get("similarity_score", 0.0)
-        })
+    truncated = None
+    try:
+        for m in raw_matches:
+            user_sec = m.get("user_section", {})
+            clause = m.get("matched_clause", {})
+
+            # Skip if clause totally empty
+            if not clause.get("section_id") and not clause.get("content", "").strip():
+                continue
+
+            normalized_matches.append({
+                "user_section": {
+                    "section_id": user_sec.get("section_id", ""),
+                    "title": user_sec.get("title", ""),
+                    "content": user_sec.get("content", "")
+                },
+                "matched_clause": {
+                    "section_id": clause.get("section_id", ""),
+                    "title": clause.get("title", ""),
+                    "content": clause.get("content", ""),
+                    "codebook": clause.get("codebook", codebook_label)
+                },
+                "similarity_score": m.get("similarity_score", 0.0)
+            })
+    except CompletionTruncated as e:
+        # The complete elements before the cut are kept; coverage reports the batch as partial
+        truncated = e
 
     # --- Apply similarity threshold ---
     normalized_matches = [
         m for m in normalized_matches if m.get("similarity_score", 0) >= 0.7
     ]
 
+    if truncated is not None:
+        raise PartialBatch(normalized_matches, str(truncated))
     return normalized_matches
 
 
 
 
 # ---------- CHECKLIST ----------
-def generate_checklist_openai(matched_clauses, region):
-    top_matches = matched_clauses[:10] if len(matched_clauses) > 10 else matched_clauses
+def _until_truncated(entries):
+    """Yields the checklist entries parsed before an answer cut off at max_tokens ended."""
+    try:
+        yield from entries
+    except CompletionTruncated as e:
+        print(f"[checklist] {e}; keeping the complete entries")
+
+
+def generate_checklist_openai(matched_clauses, region, cache_mode="use", cancel_event=None):
+    # As many matches, in order, as fit the input budget and leave room in the output for their entries
+    budget = PromptBudget(CHECKLIST_MODEL)
+    budget.take(CHECKLIST_SYSTEM_PROMPT, build_checklist_prompt([], region))
+    top_matches = budget.fit(
+        matched_clauses,
+        lambda match: json.dumps(match, ensure_ascii=False) + ", ",
+        max_items=max(1, budget.output_tokens // CHECKLIST_ENTRY_TOKENS)
+    )
+    if len(top_matches) < len(matched_clauses):
+        print(f"[checklist] {len(top_matches)}/{len(matched_clauses)} matches fit the prompt budget")
     prompt = build_checklist_prompt(top_matches, region)
 
-    response = client.chat.completions.create(
-        model='gpt-4-turbo',
+    chunks = cached_chat_completion_stream(
+        get_client().chat.completions.create,
+        model=CHECKLIST_MODEL,
         messages=[
-            {"role": "system", "content": "You are a construction compliance expert."},
+            {"role": "system", "content": CHECKLIST_SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ],
-        temperature=0.0
+        cache_mode=cache_mode,
+        cancel_event=cancel_event,
+        temperature=0.0,
+        max_tokens=budget.output_tokens
     )
 
-    checklist_raw = extract_json_array(response.choices[0].message.content)
+    checklist_raw = _until_truncated(iter_json_array(chunks))
     enriched_checklist = []
 
+    # ✅ Match by nested structure keys: hashed on normalized user-section / clause IDs
+    match_index = MatchIndex(matched_clauses)
+
     for entry in checklist_raw:
         sec_id = (entry.get('section_id') or 'N/A').strip()
-        clean_sec_id = sec_id.replace("Requirement", "").strip()
-
-        # ✅ Match by nested structure keys
-        match = next(
-            (m for m in matched_clauses
-             if clean_sec_id in (m.get('user_section', {}).get('section_id') or '') 
-             or clean_sec_id in (m.get('matched_clause', {}).get('section_id') or '')
-             or (m.get('matched_clause', {}).get('section_id') or '').startswith(clean_sec_id)),
-            None
-        )
+        match = match_index.find(sec_id)
 
         # ✅ Always get title from user_section.title if possible
         display_title = None
+        user_section = (match.get('user_section') or {}) if match else {}
         if match:
-            display_title = match.get('user_section', {}).get('title') \
-                             or match.get('user_section', {}).get('content', '')[:60]
+            display_title = user_section.get('title') or (user_section.get('content') or '')[:60]
 
         # 🚨 Fallback — if title is still just a number (like '2.1'), use content snippet
         if display_title and re.match(r'^\d+(\.\d+)*$', display_title.strip()):
-            display_title = match.get('user_section', {}).get('content', '')[:60]
+            display_title = (user_section.get('content') or '')[:60]
 
         if not display_title:
             display_title = f"Section {sec_id}"
@@ -0,0 +1,229 @@
+import os
+import re
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Input tokens allowed per call, whatever the model's window (latency and spend cap)
+PROMPT_MAX_TOKENS = int(os.getenv('PROMPT_MAX_TOKENS', '24000'))
+# Completion tokens reserved (and passed as max_tokens) per call
+PROMPT_OUTPUT_TOKENS = int(os.getenv('PROMPT_OUTPUT_TOKENS', '4096'))
+
+# Context window, max completion and USD per 1M tokens; dated variants match by prefix
+MODELS = {
+    'gpt-4-turbo': {'context': 128000, 'output': 4096, 'input_per_m': 10.00, 'output_per_m': 30.00},
+    'gpt-4o-mini': {'context': 128000, 'output': 16384, 'input_per_m': 0.15, 'output_per_m': 0.60},
+    'gpt-4o': {'context': 128000, 'output': 16384, 'input_per_m': 2.50, 'output_per_m': 10.00},
+    'gpt-4': {'context': 8192, 'output': 4096, 'input_per_m': 30.00, 'output_per_m': 60.00},
+    'gpt-3.5-turbo': {'context': 16385, 'output': 4096, 'input_per_m': 0.50, 'output_per_m': 1.50},
+}
+DEFAULT_MODEL = 'gpt-4-turbo'
+
+MESSAGE_OVERHEAD_TOKENS = 4     # role and separators per chat message
+REPLY_PRIMING_TOKENS = 3
+HEURISTIC_MARGIN = 1.1          # without tiktoken, over- rather than under-estimate
+
+_APPROX_TOKEN = re.compile(r"[A-Za-z]+|\d{1,3}|\S")
+
+_lock = threading.Lock()
+_encodings = {}
+_tiktoken_missing = False
+
+
+def model_limits(model):
+    """Limits and prices for `model` (exact name, then longest known prefix, then DEFAULT_MODEL)."""
+    if model in MODELS:
+        return MODELS[model]
+    prefixes = [name for name in MODELS if (model or '').startswith(name)]
+    return MODELS[max(prefixes, key=len)] if prefixes else MODELS[DEFAULT_MODEL]
+
+
+# ---------- TOKENIZER ----------
+def _encoding(model):
+    """tiktoken encoding for the model, or None when tiktoken (or its BPE file) is unavailable."""
+    global _tiktoken_missing
+    model = model or DEFAULT_MODEL
+    with _lock:
+        if _tiktoken_missing:
+            return None
+        if model in _encodings:
+            return _encodings[model]
+    try:
+        import tiktoken
+    except ImportError:
+        print("[prompt_budget] tiktoken not installed; using the approximate token counter")
+        _tiktoken_missing = True
+        return None
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding('cl100k_base')
+    except Exception as e:
+        print(f"[prompt_budget] No tiktoken encoding for {model} ({e}); using the approximate token counter")
+        encoding = None
+    with _lock:
+        _encodings[model] = encoding
+    return encoding
+
+
+def _approx_tokens(text):
+    """Words, 3-digit groups and single symbols, with long words counted as several pieces."""
+    pieces = _APPROX_TOKEN.findall(text)
+    extra = sum((len(p) - 1) // 8 for p in pieces if len(p) > 8)
+    return int((len(pieces) + extra) * HEURISTIC_MARGIN) + 1
+
+
+def count_tokens(text, model=None):
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return _approx_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages, model=None):
+    return REPLY_PRIMING_TOKENS + sum(
+        MESSAGE_OVERHEAD_TOKENS + count_tokens(str(m.get('content') or ''), model) for m in messages
+    )
+
+
+def truncate_to_tokens(text, max_tokens, model=None):
+    """Longest prefix of `text` (cut at a whitespace where possible) within max_tokens."""
+    tokens = count_tokens(text, model)
+    if tokens <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    cut = int(len(text) * max_tokens / tokens)
+    while cut > 0:
+        space = text.rfind(' ', 0, cut)
+        candidate = text[:space if space > cut // 2 else cut]
+        if count_tokens(candidate, model) <= max_tokens:
+            return candidate
+        cut = int(cut * 0.9)
+    return ""
+
+
+# ---------- BUDGET ----------
+class PromptBudget:
+    """
+    Token budget for one call: the model's window (capped at PROMPT_MAX_TOKENS)
+    minus the completion reserve. take() charges the fixed parts of a prompt
+    (system message, instructions); whatever remains goes to variable context.
+    """
+
+    def __init__(self, model, output_tokens=None):
+        limits = model_limits(model)
+        self.model = model
+        self.output_tokens = min(output_tokens or PROMPT_OUTPUT_TOKENS, limits['output'])
+        self.total = max(0, min(limits['context'] - self.output_tokens, PROMPT_MAX_TOKENS)
+                         - REPLY_PRIMING_TOKENS)
+        self.used = 0
+
+    @property
+    def remaining(self):
+        return max(0, self.total - self.used)
+
+    def take(self, *texts):
+        """Charges `texts` (one chat message each) and returns the tokens left."""
+        self.used += sum(MESSAGE_OVERHEAD_TOKENS + count_tokens(t, self.model) for t in texts)
+        return self.remaining
+
+    def fit(self, items, render, max_items=None):
+        """Longest prefix of `items` whose rendered texts fit in what remains; charges it."""
+        fitted = []
+        for item in items:
+            if max_items is not None and len(fitted) >= max_items:
+                break
+            tokens = count_tokens(render(item), self.model)
+            if tokens > self.remaining:
+                break
+            self.used += tokens
+            fitted.append(item)
+        return fitted
+
+
+# ---------- USAGE ----------
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    limits = model_limits(model)
+    return (prompt_tokens * limits['input_per_m'] + completion_tokens * limits['output_per_m']) / 1e6
+
+
+class UsageMeter:
+    """Token and cost totals for a set of calls (one request, or the whole process)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.cached_calls = 0
+        self.estimated_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.by_model = {}
+
+    def record(self, model, prompt_tokens, completion_tokens, cost, cached=False, estimated=False):
+        with self._lock:
+            self.calls += 1
+            if cached:
+                self.cached_calls += 1
+                return
+            self.estimated_calls += int(estimated)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost_usd += cost
+            row = self.by_model.setdefault(model, {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                                                   'cost_usd': 0.0})
+            row['calls'] += 1
+            row['prompt_tokens'] += prompt_tokens
+            row['completion_tokens'] += completion_tokens
+            row['cost_usd'] += cost
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'cached_calls': self.cached_calls,
+                'estimated_calls': self.estimated_calls,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'estimated_cost_usd': round(self.cost_usd, 6),
+                'by_model': {model: dict(row, cost_usd=round(row['cost_usd'], 6))
+                             for model, row in self.by_model.items()}
+            }
+
+
+_totals = UsageMeter()
+_current = contextvars.ContextVar('usage_meter', default=None)
+
+
+@contextmanager
+def metered(meter):
+    """Also records calls made in this context (and in fanout workers it starts) on `meter`."""
+    token = _current.set(meter)
+    try:
+        yield meter
+    finally:
+        _current.reset(token)
+
+
+def record_usage(model, prompt_tokens, completion_tokens, cached=False, estimated=False):
+    """
+    Records one LLM call. `estimated` marks counts made locally because the API
+    reported no usage (e.g. a cancelled stream); cache hits cost nothing.
+    """
+    cost = 0.0 if cached else estimate_cost(model, prompt_tokens, completion_tokens)
+    for meter in (_totals, _current.get()):
+        if meter is not None:
+            meter.record(model, prompt_tokens, completion_tokens, cost, cached, estimated)
+    if cached:
+        print(f"[usage] {model}: cache hit")
+    else:
+        print(f"[usage] {model}: prompt={prompt_tokens} completion={completion_tokens} "
+              f"cost=${cost:.4f}{' (estimated)' if estimated else ''}")
+
+
+def usage_stats():
+    return _totals.to_dict()
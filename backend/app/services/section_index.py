@@ -0,0 +1,94 @@
+import os
+import json
+import threading
+
+DUBAI_SECTIONS_FILE = os.path.join(os.getcwd(), 'shared', 'Dubai Book', 'dubai_building_code_sections.json')
+
+_lock = threading.Lock()
+_indexes = {}   # abs path -> (size, mtime_ns, SectionIndex)
+
+
+class SectionIndex:
+    """
+    Hierarchical index over code-book sections keyed by dotted IDs (e.g. "A.3.2").
+    Each trie node holds the positions of the sections with that exact ID, so
+    "exact + N levels of children" queries only visit the nodes they return.
+    """
+
+    def __init__(self, sections):
+        self.sections = sections
+        self._root = {"positions": [], "children": {}}
+        for pos, sec in enumerate(sections):
+            sec_id = (sec.get("section_id") or "").strip()
+            if sec_id:
+                self._node(sec_id, create=True)["positions"].append(pos)
+
+    def _node(self, section_id, create=False):
+        node = self._root
+        for part in section_id.split("."):
+            child = node["children"].get(part)
+            if child is None:
+                if not create:
+                    return None
+                child = node["children"][part] = {"positions": [], "children": {}}
+            node = child
+        return node
+
+    def __len__(self):
+        return len(self.sections)
+
+    def get(self, section_id):
+        """All sections whose ID is exactly `section_id` (IDs are not unique in the source)."""
+        node = self._node(section_id.strip())
+        return [self.sections[p] for p in node["positions"]] if node else []
+
+    def query(self, prefixes, depth=1):
+        """
+        Sections matching any prefix exactly, plus up to `depth` levels of children
+        (depth=1: "H.3" -> "H.3" and "H.3.1" but not "H.3.1.2").
+        Results are de-duplicated and returned in source-file order.
+        """
+        positions = set()
+        for prefix in prefixes:
+            prefix = (prefix or "").strip()
+            if not prefix:
+                continue
+            node = self._node(prefix)
+            if node is None:
+                continue
+            level = [node]
+            for _ in range(depth + 1):
+                next_level = []
+                for n in level:
+                    positions.update(n["positions"])
+                    next_level.extend(n["children"].values())
+                level = next_level
+                if not level:
+                    break
+        return [self.sections[p] for p in sorted(positions)]
+
+
+def get_section_index(sections_file=None):
+    """
+    Returns the process-wide index for a sections JSON file.
+    The file is parsed once and re-parsed only when its size or mtime changes,
+    so several code books of this shape can be indexed side by side.
+    """
+    path = os.path.abspath(sections_file or DUBAI_SECTIONS_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Building code sections file not found at {path}")
+
+    st = os.stat(path)
+    cached = _indexes.get(path)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+
+    with _lock:
+        cached = _indexes.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        with open(path, 'r', encoding='utf-8') as f:
+            index = SectionIndex(json.load(f))
+        _indexes[path] = (st.st_size, st.st_mtime_ns, index)
+        print(f"[section_index] Indexed {len(index)} sections from {os.path.basename(path)}")
+        return index
@@ -0,0 +1,283 @@
+import os
+import re
+from .section_splitter import clean_chunk_formatting
+
+SECTION_MAX_CHARS = int(os.getenv('SECTION_MAX_CHARS', '8000'))
+
+# ---------- PATTERNS ----------
+# Same patterns as section_splitter, precompiled and applied one line at a time.
+_BROKEN_NUMBER = re.compile(r"\d+\.")
+_NUMBERED = re.compile(r"\d+(\.\d+)+")
+_SUBNUMBER = re.compile(r"\d+\.\d+")
+_DEEP_SUBNUMBER = re.compile(r"\d+\.\d+\.\d+")
+_HEADER = re.compile(r"^(SECTION\s+\d+[:\-]?|\d+(\.\d+)*\s+.+)", re.IGNORECASE)
+_SECTION_ID = re.compile(r"^(SECTION\s+\d+|(\d+(\.\d+)*))", re.IGNORECASE)
+
+_NUMBER_DOT_TAIL = re.compile(r"(?<!\d)\b(\d{1,2})\.$")      # "... 2."  (then "2.1 ..." on the next line)
+_DIGIT_DOT_TAIL = re.compile(r"(?<!\w)\d\.$")               # "... 1."  (then "7.1" or "SCOPE" on the next line)
+_DIGIT = re.compile(r"\d")
+_UPPER_START = re.compile(r"[A-Z].")
+_NUMBER_ONLY = re.compile(r"\s*\.?\d+\s*")
+_NUMBER_LINE = re.compile(r"^\.?\d+$", re.MULTILINE)
+_INLINE_HEADING = re.compile(r"\d+(?:\.\d+)+(?=\s+[A-Z]|\s*$)")
+_WORD = re.compile(r"\w")
+_SECTION_NUMBER = re.compile(r"\d+:")
+_SECTION_LABEL_BEFORE = re.compile(r"(?<!\n)(Section\s+\d+:)")
+_SECTION_LABEL_AFTER = re.compile(r"(Section\s+\d+:)(?!\n)")
+_BULLET = re.compile(r"\n[\•‣\-\*]+\s*(?!\d+\.\d+)")
+_BULLETS_ONLY = re.compile(r"[\•‣\-\*]+\s*")
+_BULLET_CHARS = "•‣-*"
+_BULLET_LINE = re.compile(r"\n[\•‣\-\*]")
+
+
+class _Fallback(Exception):
+    """A chunk whose formatting depends on patterns spanning lines; cleaned the legacy way."""
+
+
+# ---------- LINE MERGING ----------
+def merge_numbered_lines(lines):
+    """
+    Streaming merge_broken_numbered_lines: yields stripped lines, joining a bare
+    '2.' with a following '2.1 Subheading' line.
+    """
+    pending = None
+    for line in lines:
+        current = line.strip()
+        if pending is None:
+            pending = current
+            continue
+        if pending[-1:] == "." and _BROKEN_NUMBER.fullmatch(pending) and _NUMBERED.match(current):
+            yield pending + current
+            pending = None
+        else:
+            yield pending
+            pending = current
+    if pending is not None:
+        yield pending
+
+
+# ---------- CHUNK FORMATTING ----------
+def _merge_boundaries(lines):
+    """Line-joining steps of clean_chunk_formatting (broken '1.' / '2.' endings), in the same order."""
+    # "2.\n2.1 Heading" -> "2.1 Heading"; a merged line cannot merge again with the next one
+    out, blocked = [lines[0]], False
+    for line in lines[1:]:
+        m = None if blocked else _NUMBER_DOT_TAIL.search(out[-1])
+        if m and line.startswith(m.group(1) + ".") and _DIGIT.match(line, len(m.group(1)) + 1):
+            out[-1] = out[-1][:m.start()] + line
+            blocked = True
+        else:
+            out.append(line)
+            blocked = False
+
+    # "1.\n7.1" -> "1.7.1", then "2.\n1.1.1" -> "2.1.1.1" (which only the first pass can
+    # produce: "- 2.\n2.\n1.2" -> "- 2.\n2.1.2" -> "- 2.2.1.2"). Merges chain.
+    for head in (_SUBNUMBER, _DEEP_SUBNUMBER):
+        lines, out = out, [out[0]]
+        for line in lines[1:]:
+            if _DIGIT_DOT_TAIL.search(out[-1]) and head.match(line):
+                out[-1] += line
+            else:
+                out.append(line)
+
+    # "2.\nSCOPE OF WORK" -> "2. SCOPE OF WORK"
+    lines, out, blocked = out, [out[0]], False
+    for line in lines[1:]:
+        if not blocked and _DIGIT_DOT_TAIL.search(out[-1]) and _UPPER_START.match(line):
+            out[-1] += " " + line
+            blocked = True
+        else:
+            out.append(line)
+            blocked = False
+    return out
+
+
+def _split_inline_headings(line, next_line):
+    """Breaks a line before every '1.4 Heading'-style number that does not start it."""
+    cuts = []
+    for m in _INLINE_HEADING.finditer(line):
+        if m.end() == len(line) or not line[m.end():].strip():
+            # Number ends the line: the heading word is the next non-empty line
+            if next_line is None or not ('A' <= next_line[0] <= 'Z'):
+                continue
+        # Every group start inside the number counts ("1.2.3 X" breaks before "1" and "2")
+        pos = m.start()
+        for group in m.group().split(".")[:-1]:
+            if pos > 0 and not _WORD.match(line, pos - 1):
+                cuts.append(pos)
+            pos += len(group) + 1
+    if not cuts:
+        return [line]
+    parts, prev = [], 0
+    for cut in cuts:
+        parts.append(line[prev:cut])
+        prev = cut
+    parts.append(line[prev:])
+    return parts
+
+
+def format_chunk(lines):
+    """
+    Single-pass equivalent of clean_chunk_formatting("\\n".join(lines)) for a chunk
+    of stripped, non-empty lines. The rare chunk with a "Section" label broken
+    across lines ("... Section\\n3: ...") goes through the original.
+    """
+    try:
+        return _format_chunk(lines)
+    except _Fallback:
+        return clean_chunk_formatting("\n".join(lines))
+
+
+def _format_chunk(lines):
+    # Most chunks need only some of the steps; check for their triggers once per chunk
+    text = "\n".join(lines)
+    if ".\n" in text:
+        lines = _merge_boundaries(lines)
+        text = "\n".join(lines)
+    if _NUMBER_LINE.search(text):
+        # Bare numbers (".1", "12") become blank lines
+        lines = ["" if _NUMBER_ONLY.fullmatch(line) else line for line in lines]
+
+    if not _SUBNUMBER.search(text) and "Section" not in text:
+        segments = lines
+    else:
+        # Inline headings and "Section N:" labels go on their own lines.
+        # Walk backwards so each line knows the next non-empty one.
+        segments = []
+        next_nonempty = None
+        for line in reversed(lines):
+            if not line:
+                segments.append(line)
+                continue
+            parts = _split_inline_headings(line, next_nonempty) if "." in line else [line]
+            if "Section" in line:
+                if line.endswith("Section") and next_nonempty and _SECTION_NUMBER.match(next_nonempty):
+                    raise _Fallback()
+                labelled = _SECTION_LABEL_BEFORE.sub(r"\n\1", "\n" + "\n".join(parts) + "\n")
+                parts = _SECTION_LABEL_AFTER.sub(r"\1\n", labelled)[1:-1].split("\n")
+            segments.extend(reversed(parts))
+            next_nonempty = line
+        segments.reverse()
+
+    if not _BULLET_LINE.search(text) and "Section" not in text:
+        # No line (even after splitting) starts with a bullet
+        return _collapse_blank_lines(segments)
+
+    # Bullets: every line but the chunk's first one
+    out = [segments[0]]
+    i, n = 1, len(segments)
+    while i < n:
+        segment = segments[i]
+        i += 1
+        if not segment or segment[0] not in _BULLET_CHARS:
+            out.append(segment)
+        elif not _BULLETS_ONLY.fullmatch(segment):
+            out.append(_BULLET.sub("\n• ", "\n" + segment)[1:])
+        else:
+            # A line of bare bullets swallows the blank lines after it and joins the next
+            # line, leaving one whitespace character before a "1.2"-style number
+            while i < n and not segments[i].strip():
+                i += 1
+            if i == n:
+                out.append("• ")
+                break
+            following = segments[i]
+            rest = following.lstrip()
+            if not _SUBNUMBER.match(rest):
+                out.append("• " + rest)
+                i += 1
+            elif len(rest) < len(following):
+                out.append("• " + following[len(following) - len(rest) - 1:])
+                i += 1
+            else:
+                out.append("• ")
+
+    return _collapse_blank_lines(out)
+
+
+def _collapse_blank_lines(lines):
+    """Collapses runs of blank lines to one and joins."""
+    if "" not in lines:
+        return "\n".join(lines).strip()
+    collapsed = []
+    for line in lines:
+        if not line and collapsed and not collapsed[-1]:
+            continue
+        collapsed.append(line)
+    return "\n".join(collapsed).strip()
+
+
+# ---------- SECTIONS ----------
+def _section(content):
+    first_line = content.splitlines()[0].strip()
+    match = _SECTION_ID.match(first_line)
+    return {
+        "section_id": match.group(0).strip() if match else "unknown",
+        "title": first_line,
+        "content": content
+    }
+
+
+def split_oversized(section, max_chars):
+    """Splits a section longer than max_chars at line (or, failing that, word) boundaries."""
+    content = section["content"]
+    if not max_chars or len(content) <= max_chars:
+        return [section]
+    parts, current, size = [], [], 0
+    for line in content.split("\n"):
+        while len(line) > max_chars:
+            cut = line.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces = line[:cut], line[cut:].lstrip()
+            if current:
+                parts.append("\n".join(current))
+                current, size = [], 0
+            parts.append(pieces[0])
+            line = pieces[1]
+        if current and size + len(line) + 1 > max_chars:
+            parts.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        parts.append("\n".join(current))
+
+    sections = []
+    for k, part in enumerate(p for p in parts if p.strip()):
+        title = section["title"] if k == 0 else f"{section['title']} (cont. {k + 1})"
+        sections.append({"section_id": section["section_id"], "title": title, "content": part.strip()})
+    return sections
+
+
+def segment_lines(lines, max_chars=None):
+    """
+    Yields {section_id, title, content} sections from merged lines (see
+    merge_numbered_lines) as soon as each one ends: the output of
+    convert_chunks_to_json([clean_chunk_formatting(c) for c in chunk_text(text)]),
+    with sections over `max_chars` (SECTION_MAX_CHARS; 0 disables) split so
+    they still fit a prompt.
+    """
+    max_chars = SECTION_MAX_CHARS if max_chars is None else max_chars
+    chunk = []
+
+    def flush():
+        content = format_chunk(chunk)
+        if content:
+            yield from split_oversized(_section(content), max_chars)
+
+    for line in lines:
+        for piece in line.splitlines():
+            piece = piece.strip()
+            if not piece:
+                continue
+            if chunk and _HEADER.match(piece):
+                yield from flush()
+                chunk = []
+            chunk.append(piece)
+    if chunk:
+        yield from flush()
+
+
+def segment_text(text, max_chars=None):
+    """Whole-document form: text (after header/footer removal) -> list of sections."""
+    return list(segment_lines(merge_numbered_lines(text.split("\n")), max_chars))
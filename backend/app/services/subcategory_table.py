@@ -0,0 +1,97 @@
+import os
+import json
+import hashlib
+import threading
+
+SUBCATEGORIES_FILE = os.path.join(os.getcwd(), 'shared', 'Dubai Book', 'dubai_dbc_subcategories.json')
+
+PART_MAP = {
+    "A": "General & Compliance",
+    "B": "Architecture & Space Planning",
+    "C": "Accessibility",
+    "D": "Vertical Transportation",
+    "E": "Building Envelope",
+    "F": "Structure",
+    "G": "MEP & Utilities",
+    "H": "Indoor Environment",
+    "J": "Security",
+    "K": "Villas & Special Buildings"
+}
+
+_lock = threading.Lock()
+_tables = {}   # abs path -> (size, mtime_ns, SubcategoryTable)
+
+
+def _auto_keywords(sub):
+    """Keywords derived from the subcategory name and ID when the JSON has none."""
+    name_parts = sub.get("name", "").lower().replace("&", " ").replace("/", " ").split()
+    id_parts = sub.get("id", "").lower().split(".")
+    return list(set(name_parts + id_parts))
+
+
+class SubcategoryTable:
+    """
+    Compiled form of dubai_dbc_subcategories.json: subcategory ID -> prefixes and
+    normalized keywords, plus the pre-serialized /api/dubai/categories body.
+    """
+
+    def __init__(self, sub_map):
+        self.entries = {}
+        categories = {}
+        for part_letter, cat_data in sub_map.items():
+            main_cat = PART_MAP.get(part_letter, part_letter)
+            categories[main_cat] = []
+            for sub in cat_data.get("subcategories", []):
+                keywords = sub.get("keywords") or _auto_keywords(sub)
+                self.entries[sub["id"]] = {
+                    "part": part_letter,
+                    "name": sub.get("name", ""),
+                    "prefixes": [p.strip() for p in sub.get("prefixes", []) if p.strip()],
+                    "keywords": [k.strip().lower() for k in keywords if k.strip()]
+                }
+                categories[main_cat].append({
+                    "subcategory_id": sub["id"],
+                    "subcategory_name": sub["name"],
+                    "prefixes": sub.get("prefixes", [])
+                })
+
+        self.categories_body = json.dumps(categories, sort_keys=True).encode("utf-8")
+        self.etag = hashlib.sha256(self.categories_body).hexdigest()[:32]
+        self._resolved = {}
+
+    def resolve(self, selected_ids):
+        """Returns (sorted prefixes, sorted keywords) for the selected subcategory IDs."""
+        key = tuple(sorted(set(selected_ids or [])))
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            prefixes, keywords = set(), set()
+            for sub_id in key:
+                entry = self.entries.get(sub_id)
+                if entry:
+                    prefixes.update(entry["prefixes"])
+                    keywords.update(entry["keywords"])
+            resolved = (sorted(prefixes), sorted(keywords))
+            if len(self._resolved) < 1024:
+                self._resolved[key] = resolved
+        return resolved
+
+
+def get_subcategory_table(mapping_file=None):
+    """Returns the compiled table for the mapping file, rebuilding it when the file changes."""
+    path = os.path.abspath(mapping_file or SUBCATEGORIES_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Subcategory mapping file not found at {path}")
+
+    st = os.stat(path)
+    cached = _tables.get(path)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+
+    with _lock:
+        cached = _tables.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        with open(path, 'r', encoding='utf-8') as f:
+            table = SubcategoryTable(json.load(f))
+        _tables[path] = (st.st_size, st.st_mtime_ns, table)
+        return table
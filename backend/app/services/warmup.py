@@ -0,0 +1,111 @@
+import os
+import time
+import threading
+
+_lock = threading.Lock()
+_state = {
+    'ready': False,
+    'started_at': None,
+    'finished_at': None,
+    'steps': {}     # step name -> {status, seconds, detail/error}
+}
+_process_started = time.time()
+_ready = threading.Event()
+
+
+def _run_step(name, fn):
+    start = time.perf_counter()
+    try:
+        detail = fn()
+        step = {'status': 'done', 'detail': detail}
+    except FileNotFoundError as e:
+        step = {'status': 'skipped', 'error': str(e)}
+        print(f"Warning: {e}")
+    except Exception as e:
+        step = {'status': 'failed', 'error': str(e)}
+        print(f"[warmup] {name} failed: {e}")
+    step['seconds'] = round(time.perf_counter() - start, 3)
+    with _lock:
+        _state['steps'][name] = step
+
+
+def _warm_codebook(codebook_id, path):
+    from . import bm25_index
+    from . import clause_store
+    from . import codebook_cache
+    from .matching_engine import load_vector_index, index_name_for
+
+    store = clause_store.load_clause_store(codebook_id)
+    if store is not None:
+        text, clauses, source = store.text(), store, 'clause_store'
+    else:
+        text, clauses, source = codebook_cache.get_codebook_text(path), None, 'pdf'
+    index = bm25_index.get_index(text, clauses)
+    vectors = load_vector_index(index_name_for(codebook_id))
+    return {'source': source, 'clauses': len(index), 'vector_index': vectors is not None}
+
+
+def warm_up(codebooks=True):
+    """
+    Loads what requests would otherwise build on first use: the Dubai section
+    index and subcategory table and, with `codebooks`, every codebook's text or
+    clause store, its BM25 index and its vector index. Run before the server
+    forks its workers, so they all start warm and share these pages.
+    A missing input is skipped; the process is ready once warm-up has finished.
+    """
+    from .section_index import get_section_index
+    from .subcategory_table import get_subcategory_table
+    from . import codebook_cache
+    from .clause_store import codebook_id_for
+
+    with _lock:
+        _state['ready'] = False
+        _state['started_at'] = time.time()
+        _ready.clear()
+
+    _run_step('dubai_section_index', lambda: {'sections': len(get_section_index())})
+    _run_step('subcategory_table', lambda: {'loaded': get_subcategory_table() is not None})
+    if codebooks and os.path.isdir(codebook_cache.CODEBOOK_DIR):
+        for fname in sorted(os.listdir(codebook_cache.CODEBOOK_DIR)):
+            if fname.lower().endswith('.pdf'):
+                codebook_id = codebook_id_for(fname)
+                path = os.path.join(codebook_cache.CODEBOOK_DIR, fname)
+                _run_step(f'codebook:{codebook_id}', lambda: _warm_codebook(codebook_id, path))
+
+    with _lock:
+        _state['ready'] = True
+        _state['finished_at'] = time.time()
+        seconds = _state['finished_at'] - _state['started_at']
+    print(f"[warmup] Ready after {seconds:.1f}s")
+    _ready.set()
+
+
+def start_background(codebooks=False):
+    """
+    Runs warm_up in a daemon thread, so the server starts answering at once and
+    /api/ready reports 503 until the thread has finished.
+    """
+    with _lock:
+        _state['ready'] = False
+        _ready.clear()
+    thread = threading.Thread(target=warm_up, kwargs={'codebooks': codebooks}, name='warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def wait(timeout=None):
+    """Blocks until warm-up has finished (or `timeout` seconds have passed); returns whether it is ready."""
+    return _ready.wait(timeout)
+
+
+def warmup_state():
+    with _lock:
+        state = dict(_state, steps={name: dict(step) for name, step in _state['steps'].items()})
+    state['pid'] = os.getpid()
+    state['uptime_seconds'] = round(time.time() - _process_started, 1)
+    return state
+
+
+def is_ready():
+    with _lock:
+        return _state['ready']
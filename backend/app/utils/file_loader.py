@@ -0,0 +1,15 @@
+import os
+from ..services import codebook_cache
+
+
+def load_codebook_text(filename):
+    """
+    Loads the text of a codebook PDF from shared/codebooks (through the codebook text cache).
+    `filename` may be a full file name ("SBC-302_Construction_Code.pdf") or a codebook ID ("SBC-302").
+    """
+    path = os.path.join(codebook_cache.CODEBOOK_DIR, filename)
+    if not os.path.exists(path):
+        path = codebook_cache.find_codebook_path(filename)
+    if not path:
+        raise FileNotFoundError(f"Codebook {filename} not found in {codebook_cache.CODEBOOK_DIR}")
+    return codebook_cache.get_codebook_text(path)
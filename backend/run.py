@@ -1,7 +1,11 @@
+import os
 from app import create_app
 
 
-app = create_app()
+# The debug reloader runs this file in a watcher process, which never serves
+# requests, and again in the child it restarts (WERKZEUG_RUN_MAIN set); only
+# the child warms up
+app = create_app(warm=__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
 # register the Dubai blueprint
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
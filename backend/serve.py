@@ -0,0 +1,69 @@
+"""
+Production entry point (run.py is the development server).
+
+Linux/macOS: gunicorn with WEB_WORKERS worker processes of WEB_THREADS threads
+each. The app is created and warmed up (Dubai index, subcategory table,
+codebook texts / clause stores and their indexes) once in the master before
+it forks, so every worker starts warm and shares those pages copy-on-write.
+Windows: waitress, one process with WEB_THREADS threads, warmed up before it
+starts listening.
+
+Match jobs (/api/match/jobs) live in the worker that accepted them; with
+several workers, poll them through a sticky load balancer or use
+/api/match/stream.
+
+Usage: python serve.py
+"""
+import os
+import gc
+import sys
+import multiprocessing
+from app import create_app
+
+BIND = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', str(min(4, multiprocessing.cpu_count()))))
+WEB_THREADS = int(os.getenv('WEB_THREADS', '8'))
+# Matches hold a request open for as long as the LLM calls take
+WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', '600'))
+
+
+def load_app():
+    app = create_app(preload=True)
+    # Keep the garbage collector from touching (and so un-sharing) everything loaded so far
+    gc.freeze()
+    return app
+
+
+def serve_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', BIND)
+            self.cfg.set('workers', WEB_WORKERS)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', WEB_THREADS)
+            self.cfg.set('timeout', WEB_TIMEOUT)
+            self.cfg.set('graceful_timeout', 30)
+            self.cfg.set('preload_app', True)
+
+        def load(self):
+            return load_app()
+
+    Server().run()
+
+
+def serve_waitress():
+    from waitress import serve
+
+    host, port = BIND.rsplit(':', 1)
+    app = load_app()
+    print(f"Serving on {BIND} with {WEB_THREADS} threads")
+    serve(app, host=host, port=int(port), threads=WEB_THREADS, channel_timeout=WEB_TIMEOUT)
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        serve_waitress()
+    else:
+        serve_gunicorn()
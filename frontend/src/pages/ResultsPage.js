@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
 import {
   Container,
@@ -9,6 +9,7 @@ import {
   Divider,
   Alert,
   CircularProgress,
+  LinearProgress,
   Paper,
   Tabs,
   Tab
@@ -17,6 +18,26 @@ import ArrowBackIcon from '@mui/icons-material/ArrowBack';
 import MatchedResults from '../components/MatchedResults';
 import SpecSummary from '../components/SpecSummary';
 import ChecklistTable from '../components/ChecklistTable';
+import { streamMatch, cancelMatchJob } from '../services/api';
+
+const STAGE_LABELS = {
+  extracting: 'Extracting document sections',
+  matching: 'Matching sections with reference material',
+  generating_checklist: 'Generating checklist'
+};
+
+const buildMatchForm = (matchRequest) => {
+  const formData = new FormData();
+  formData.append('document_id', matchRequest.document_id);
+  formData.append('region', matchRequest.region);
+  if (matchRequest.region === 'dubai') {
+    formData.append('selected_chapters', JSON.stringify(matchRequest.selected_chapters || []));
+    formData.append('selected_subcategories', JSON.stringify(matchRequest.selected_subcategories || []));
+  } else {
+    (matchRequest.codebook_ids || []).forEach((id) => formData.append('codebook_ids[]', id));
+  }
+  return formData;
+};
 
 const ResultsPage = () => {
   const location = useLocation();
@@ -25,8 +46,61 @@ const ResultsPage = () => {
   const [error, setError] = useState('');
   const [data, setData] = useState(null);
   const [activeTab, setActiveTab] = useState(0);
+  const [streaming, setStreaming] = useState(false);
+  const [progress, setProgress] = useState(null);
+  const [cancelling, setCancelling] = useState(false);
+  const jobIdRef = useRef(null);
+  const controllerRef = useRef(null);
 
   useEffect(() => {
+    // Match not run yet: stream it and show results as each batch arrives
+    if (location.state?.uploadData && location.state?.matchRequest) {
+      const controller = new AbortController();
+      controllerRef.current = controller;
+      jobIdRef.current = null;
+      setData({
+        uploadData: location.state.uploadData,
+        matchedClauses: [],
+        checklist: [],
+        selectedCodebooks: [],
+        selectedRegion: location.state.selectedRegion || 'saudi',
+        referenceIds: location.state.referenceIds || []
+      });
+      setLoading(false);
+      setStreaming(true);
+
+      const onEvent = (event, payload) => {
+        if (event === 'job') {
+          jobIdRef.current = payload.job_id;
+        } else if (event === 'progress') {
+          setProgress(payload);
+        } else if (event === 'matches') {
+          setData((prev) => ({ ...prev, matchedClauses: [...prev.matchedClauses, ...(payload.matches || [])] }));
+        } else if (event === 'checklist') {
+          setData((prev) => ({ ...prev, checklist: payload.checklist || [] }));
+        } else if (event === 'result') {
+          // Final, de-duplicated results replace the per-batch ones
+          setData((prev) => ({
+            ...prev,
+            matchedClauses: payload.matched_clauses || [],
+            checklist: payload.checklist || []
+          }));
+        } else if (event === 'error') {
+          setError(payload.message || 'An error occurred during processing.');
+        }
+      };
+
+      streamMatch(buildMatchForm(location.state.matchRequest), onEvent, controller.signal)
+        .catch((err) => {
+          if (err?.name !== 'AbortError') {
+            console.error('Processing error:', err);
+            setError(typeof err === 'string' ? err : 'An error occurred during processing. Please try again.');
+          }
+        })
+        .finally(() => setStreaming(false));
+      return () => controller.abort();
+    }
+
     // Check if we have data from the navigation state
     if (location.state?.uploadData && (location.state?.matchedClauses || location.state?.checklist)) {
       setData({
@@ -51,6 +125,18 @@ const ResultsPage = () => {
     setActiveTab(newValue);
   };
 
+  const handleCancel = async () => {
+    setCancelling(true);
+    try {
+      // The stream then ends with a "Match cancelled" error event
+      await cancelMatchJob(jobIdRef.current);
+    } catch (err) {
+      // Job already finished or unknown: closing the stream cancels it server-side
+      controllerRef.current?.abort();
+      setError('Match cancelled');
+    }
+  };
+
   const handleBackToUpload = () => {
     navigate('/upload');
   };
@@ -100,10 +186,33 @@ const ResultsPage = () => {
             Document Analysis Results
           </Typography>
 
-          <Typography variant="body1" paragraph>
-            Document processed successfully. Below are the matches between your specifications
-            and the selected reference materials.
-          </Typography>
+          {streaming ? (
+            <Box sx={{ mb: 2 }}>
+              <Typography variant="body1" paragraph>
+                {STAGE_LABELS[progress?.stage] || 'Processing document'}
+                {progress?.stage === 'matching' && progress?.total > 1
+                  ? ` (${progress.completed}/${progress.total})`
+                  : ''}
+                ... Results appear below as they arrive.
+              </Typography>
+              <LinearProgress />
+              <Button
+                variant="outlined"
+                color="error"
+                size="small"
+                onClick={handleCancel}
+                disabled={cancelling}
+                sx={{ mt: 2 }}
+              >
+                {cancelling ? 'Cancelling...' : 'Cancel'}
+              </Button>
+            </Box>
+          ) : (
+            <Typography variant="body1" paragraph>
+              Document processed successfully. Below are the matches between your specifications
+              and the selected reference materials.
+            </Typography>
+          )}
 
           {data?.uploadData?.metadata?.project_name && (
             <Box sx={{ mb: 2 }}>
@@ -170,7 +279,11 @@ const ResultsPage = () => {
           {/* Tab Content */}
           <Box sx={{ py: 2 }}>
             {activeTab === 0 && (
-              <ChecklistTable checklistItems={checklists} isLoading={loading} error={error} />
+              <ChecklistTable
+                checklistItems={checklists}
+                isLoading={loading || (streaming && checklists.length === 0)}
+                error={error}
+              />
             )}
 
             {activeTab === 1 && (
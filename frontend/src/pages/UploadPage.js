@@ -58,6 +58,27 @@ const handleNext = async () => {
         });
       }
 
+      const referenceIds = selectedRegion === 'dubai' ? selectedChapters : selectedCodebooks;
+
+      // Already processed by /api/upload: let the results page stream the match by document_id
+      if (uploadData?.document_id) {
+        navigate('/results', {
+          state: {
+            uploadData,
+            matchRequest: {
+              document_id: uploadData.document_id,
+              region: selectedRegion,
+              codebook_ids: formData.getAll('codebook_ids[]'),
+              selected_chapters: selectedChapters,
+              selected_subcategories: selectedSubcategories
+            },
+            selectedRegion,
+            referenceIds
+          }
+        });
+        return;
+      }
+
       if (uploadData?.file) {
         formData.append('file', uploadData.file);
       } else if (uploadData?.originalFile) {
@@ -75,7 +96,7 @@ const handleNext = async () => {
           matchedClauses: results.matched_clauses || [],
           checklist: results.checklist || [],
           selectedRegion,
-          referenceIds: selectedRegion === 'dubai' ? selectedChapters : selectedCodebooks
+          referenceIds
         }
       });
     } catch (err) {
@@ -26,7 +26,7 @@ export const uploadDocument = async (formData, region = 'saudi') => {
 };
 
 
-// New backend call: expects a FormData object with file, region, and codebook_ids[]
+// New backend call: expects a FormData object with file (or document_id from uploadDocument), region, and codebook_ids[]
 export const matchSectionsWithCodebooks = async (formData) => {
   try {
     const response = await api.post('/api/match', formData, {
@@ -40,4 +40,48 @@ export const matchSectionsWithCodebooks = async (formData) => {
   }
 };
 
+// Cancels a queued or running match (the job_id comes from the stream's first event)
+export const cancelMatchJob = async (jobId) => {
+  try {
+    const response = await api.post(`/api/match/jobs/${jobId}/cancel`);
+    return response.data;
+  } catch (error) {
+    throw error.response?.data || error.message;
+  }
+};
+
+// Streaming variant of /api/match: calls onEvent(event, data) for every NDJSON line
+// (job, progress, sections, matches, checklist, then result or error) as it arrives.
+export const streamMatch = async (formData, onEvent, signal) => {
+  const response = await fetch(`${API_URL}/api/match/stream`, {
+    method: 'POST',
+    body: formData,
+    signal,
+  });
+  if (!response.ok) {
+    let message = response.statusText;
+    try {
+      message = (await response.json()).message || message;
+    } catch (e) {
+      // Non-JSON error body
+    }
+    throw message;
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    lines.filter((line) => line.trim()).forEach((line) => {
+      const { event, data } = JSON.parse(line);
+      onEvent(event, data);
+    });
+  }
+};
+
 export default api;
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Micro-benchmark for OCR page preprocessing.
+
+Renders pages of the sample PDFs in backend/shared/uploads at OCR resolution,
+applies a few synthetic skews, and times the legacy full-resolution
+preprocess_image against ImagePreprocessor. Prints one JSON document.
+
+Usage: python scripts/bench_preprocess.py [--pages N] [--dpi 200] [--repeat 3]
+"""
+import sys
+import os
+import json
+import time
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+import fitz
+import numpy as np
+from PIL import Image
+
+from backend.app.ocr.preprocess import ImagePreprocessor
+
+UPLOADS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend', 'shared', 'uploads'))
+SKEWS = [0.0, 2.0, -4.0]
+
+
+def legacy_preprocess_image(pil_image):
+    """The original implementation, kept here as the baseline."""
+    cv_img = np.array(pil_image)
+    gray = cv2.cvtColor(cv_img, cv2.COLOR_RGB2GRAY)
+    denoised = cv2.medianBlur(gray, 3)
+    _, thresh = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    coords = np.column_stack(np.where(thresh > 0))
+    angle = cv2.minAreaRect(coords)[-1]
+    if angle < -45:
+        angle = -(90 + angle)
+    else:
+        angle = -angle
+
+    (h, w) = thresh.shape
+    center = (w // 2, h // 2)
+    M = cv2.getRotationMatrix2D(center, angle, 1.0)
+    deskewed = cv2.warpAffine(thresh, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+    return Image.fromarray(deskewed)
+
+
+def sample_pages(max_pages, dpi):
+    pages = []
+    for fname in sorted(os.listdir(UPLOADS_DIR)):
+        if not fname.lower().endswith('.pdf'):
+            continue
+        with fitz.open(os.path.join(UPLOADS_DIR, fname)) as pdf:
+            for page in pdf:
+                if len(pages) >= max_pages:
+                    return pages
+                pix = page.get_pixmap(dpi=dpi)
+                img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)[:, :, :3]
+                pages.append(np.ascontiguousarray(img))
+    return pages
+
+
+def rotate(img, angle):
+    if not angle:
+        return img
+    h, w = img.shape[:2]
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    return cv2.warpAffine(img, M, (w, h), borderValue=(255, 255, 255))
+
+
+def time_it(fn, images, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for img in images:
+            fn(img)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=6)
+    parser.add_argument('--dpi', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = sample_pages(args.pages, args.dpi)
+    images = [Image.fromarray(rotate(p, skew)) for p in pages for skew in SKEWS]
+    preprocessor = ImagePreprocessor()
+
+    legacy = time_it(legacy_preprocess_image, images, args.repeat)
+    current = time_it(preprocessor.process, images, args.repeat)
+
+    # Skew estimation accuracy: the estimated correction should undo the synthetic rotation
+    errors = []
+    for p in pages:
+        for skew in SKEWS:
+            gray = cv2.cvtColor(rotate(p, skew), cv2.COLOR_RGB2GRAY)
+            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            errors.append(abs(preprocessor.estimate_skew(thresh) + skew))
+
+    print(json.dumps({
+        "benchmark": "ocr_preprocess",
+        "pages": len(images),
+        "page_shape": list(pages[0].shape) if pages else None,
+        "legacy_ms_per_page": round(1000 * legacy / max(1, len(images)), 2),
+        "engine_ms_per_page": round(1000 * current / max(1, len(images)), 2),
+        "speedup": round(legacy / current, 2) if current else None,
+        "max_skew_error_deg": round(max(errors), 2) if errors else None
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
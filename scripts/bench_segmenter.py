@@ -0,0 +1,179 @@
+"""
+Golden-output check and benchmark for section segmentation.
+
+Runs the sample documents in backend/shared/uploads (plus a seeded synthetic
+corpus of numbering, bullet and "Section N:" edge cases) through the legacy
+merge_broken_numbered_lines -> chunk_text -> clean_chunk_formatting ->
+convert_chunks_to_json pipeline and through segmenter.segment_text, and fails
+unless both produce identical sections. Then times both on the sample text
+repeated to --mb megabytes. Prints one JSON document; exit status 1 on any
+mismatch.
+
+Usage: python scripts/bench_segmenter.py [--mb 5] [--synthetic 2000] [--repeat 3]
+"""
+import sys
+import os
+import json
+import time
+import re
+import random
+import argparse
+from collections import Counter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import fitz
+from docx import Document
+
+from backend.app.services.section_splitter import (
+    chunk_text,
+    clean_chunk_formatting,
+    merge_broken_numbered_lines,
+    convert_chunks_to_json
+)
+from backend.app.services.segmenter import segment_text
+
+UPLOADS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend', 'shared', 'uploads'))
+
+# Fragments that exercise every rule of clean_chunk_formatting, including the cross-line ones
+FRAGMENTS = [
+    "1.", "2.", "12.", "2.1", "1.2.3", "3.4", "4.1", "Section", "Section 3:", "Section 12:", "SECTION 2",
+    "3:", "-", "--", "•", "‣", "*", "-1.2", ".1", "5", "7", "SCOPE", "Walls", "Foo", "A", "and", "see",
+    "item", "a1.2", "(1.2", "1.2.", "ab.1.2", ":", ".", "١.٢", " ", "\t", "\r", "\x0c"
+]
+
+
+def clean_ocr_text(text: str) -> str:
+    """The original whole-document cleaner, kept here as the baseline (see text_pipeline.clean_lines)."""
+    # Fix cases like "1.\n7.3" → "1.7.3"
+    text = re.sub(r'(?<=\b\d)\.\s*\n\s*(\d+\.\d+)', r'.\1', text)
+
+    # Fix cases like "1.\n7" → "1.7"
+    text = re.sub(r'(?<=\b\d)\.\s*\n\s*(\d+)', r'.\1', text)
+
+    # Fix multiple broken line number cases like "1.\n7.\n3" → "1.7.3"
+    text = re.sub(r'(?<=\b\d)\.\s*\n\s*(\d+)\.\s*\n\s*(\d+)', r'.\1.\2', text)
+
+    # Remove multiple newlines and normalize spacing
+    text = re.sub(r'\n{2,}', '\n', text)
+
+    return text
+
+
+def remove_headers_footers(text: str, max_line_len=80):
+    """
+    The original header/footer removal, kept here as the baseline (see
+    text_pipeline.strip_headers_footers). Removes common page headers and
+    footers by detecting repeating patterns and page markers (like 'Page 1 of X').
+    """
+    lines = text.splitlines()
+    cleaned_lines = []
+
+    page_header_candidates = []
+    page_footer_candidates = []
+
+    # Heuristic: headers are usually in top 5 lines of a page
+    # footers are usually in last 5 lines before a page break
+    page_breaks = [i for i, l in enumerate(lines) if re.match(r'^\f$', l.strip())]  # '\f' = page break
+
+    page_start = 0
+    for pb in page_breaks + [len(lines)]:
+        page = lines[page_start:pb]
+        if len(page) >= 5:
+            page_header_candidates.append(page[:5])
+            page_footer_candidates.append(page[-5:])
+        page_start = pb + 1
+
+    # Flatten header/footer candidates and count
+    flat_headers = Counter(line for grp in page_header_candidates for line in grp)
+    flat_footers = Counter(line for grp in page_footer_candidates for line in grp)
+
+    # Get top 3 repeated lines that look like headers/footers
+    common_headers = {line for line, count in flat_headers.items() if count >= 2 and len(line) <= max_line_len}
+    common_footers = {line for line, count in flat_footers.items() if count >= 2 and len(line) <= max_line_len}
+
+    for line in lines:
+        if line.strip() in common_headers or line.strip() in common_footers:
+            continue
+        if re.match(r'Page\s+\d+(\s+of\s+\d+)?', line, re.IGNORECASE):
+            continue
+        cleaned_lines.append(line)
+
+    return '\n'.join(cleaned_lines)
+
+
+def legacy_segment(text):
+    text = merge_broken_numbered_lines(text)
+    return convert_chunks_to_json([clean_chunk_formatting(chunk) for chunk in chunk_text(text)])
+
+
+def document_texts():
+    texts = {}
+    for fname in sorted(os.listdir(UPLOADS_DIR)):
+        path = os.path.join(UPLOADS_DIR, fname)
+        if fname.lower().endswith('.pdf'):
+            with fitz.open(path) as pdf:
+                text = "".join(page.get_text() for page in pdf)
+        elif fname.lower().endswith('.docx'):
+            text = "\n".join(p.text.strip() for p in Document(path).paragraphs if p.text.strip())
+        else:
+            continue
+        texts[fname] = remove_headers_footers(clean_ocr_text(text))
+    return texts
+
+
+def synthetic_texts(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        lines = []
+        for _ in range(rng.randint(1, 30)):
+            lines.append("".join(rng.choice(["", " "]) + rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 6))))
+        yield "\n".join(lines)
+
+
+def time_it(fn, text, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mb', type=float, default=5)
+    parser.add_argument('--synthetic', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    documents = document_texts()
+    mismatches = []
+    for name, text in documents.items():
+        if legacy_segment(text) != segment_text(text, max_chars=0):
+            mismatches.append(name)
+    for i, text in enumerate(synthetic_texts(args.synthetic)):
+        if legacy_segment(text) != segment_text(text, max_chars=0):
+            mismatches.append(f"synthetic[{i}]")
+
+    sample = "\n".join(documents.values())
+    corpus = "\n".join([sample] * max(1, int(args.mb * 1024 * 1024 / max(1, len(sample)))))
+    legacy = time_it(legacy_segment, corpus, args.repeat)
+    current = time_it(lambda text: segment_text(text, max_chars=0), corpus, args.repeat)
+
+    print(json.dumps({
+        "benchmark": "section_segmentation",
+        "documents": sorted(documents),
+        "synthetic_cases": args.synthetic,
+        "golden_mismatches": mismatches[:20],
+        "corpus_mb": round(len(corpus) / (1024 * 1024), 2),
+        "sections": len(segment_text(corpus, max_chars=0)),
+        "legacy_s": round(legacy, 3),
+        "engine_s": round(current, 3),
+        "speedup": round(legacy / current, 2) if current else None
+    }, indent=2))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""
+End-to-end benchmark suite for the backend pipeline.
+
+Runs, on the sample specs in backend/shared/uploads plus synthetic large specs
+(generated as .txt, .docx and .pdf in a temporary directory):
+  - extract_text_from_file, per file format
+  - the section_splitter functions, and segmenter.segment_text for comparison
+  - filter_matches_by_subcategory and load_dubai_code_sections
+  - full /api/match requests for Saudi and Dubai through the Flask test client
+The OpenAI client is replaced by the deterministic stub in stub_model.py
+(--model-latency-ms of simulated API time per call), and uploads, the
+document registry, the LLM cache and the codebook text cache go to the
+temporary directory, so runs are repeatable and leave backend/shared untouched.
+
+Prints one JSON document: run metadata and a flat "metrics" map where names
+ending in "_s" are durations (lower is better) and names ending in "_per_s"
+are throughputs (higher is better). With --compare BASELINE.json, metrics that
+are worse than the baseline by more than --tolerance are listed under
+"regressions" and the exit status is 1.
+
+Usage: python scripts/bench_suite.py [--synthetic-sections 2000] [--requests 5]
+           [--model-latency-ms 0] [--output run.json] [--compare baseline.json] [--tolerance 0.25]
+"""
+import sys
+import os
+import io
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BACKEND_DIR = os.path.join(REPO_DIR, 'backend')
+sys.path.append(REPO_DIR)
+os.chdir(BACKEND_DIR)  # shared/ paths are resolved relative to the backend directory
+
+UPLOADS_DIR = os.path.join(BACKEND_DIR, 'shared', 'uploads')
+
+TOPICS = ["Concrete Works", "Masonry", "Structural Steel", "Fire Protection", "Plumbing", "Electrical Conduits",
+          "Waterproofing", "Thermal Insulation", "Doors and Hardware", "Ventilation", "Stairs and Ramps", "Glazing"]
+REQUIREMENTS = [
+    "Minimum compressive strength shall be {n} MPa at 28 days, tested per ASTM C39.",
+    "Mortar joints shall be {n} mm thick with a tolerance of plus or minus 3 mm.",
+    "Clear width of corridors shall not be less than {n}00 mm.",
+    "Sprinkler heads shall be spaced at not more than {n}.6 m on centre.",
+    "Conduits shall be supported at intervals not exceeding {n}.5 m.",
+    "Insulation shall have a thermal resistance of at least R-{n}.",
+    "Handrails shall be provided on both sides at a height of 8{n}0 mm to 9{n}0 mm."
+]
+
+
+# ---------- FIXTURES ----------
+def synthetic_spec(sections, seed=0):
+    """Numbered specification text with `sections` subsections, as pages of ~60 lines."""
+    rng = random.Random(seed)
+    lines = ["PROJECT NAME: Synthetic Benchmark Tower", "Location: Benchmark District", ""]
+    for i in range(sections):
+        chapter, sub = i // 8 + 1, i % 8 + 1
+        if sub == 1:
+            lines.append(f"{chapter}. {rng.choice(TOPICS).upper()}")
+        lines.append(f"{chapter}.{sub} {rng.choice(TOPICS)}")
+        for _ in range(rng.randint(2, 5)):
+            lines.append(f"• {rng.choice(REQUIREMENTS).format(n=rng.randint(1, 9))}")
+    return [lines[i:i + 60] for i in range(0, len(lines), 60)]
+
+
+def write_fixtures(directory, sections):
+    """Writes the synthetic spec as .txt (form feed per page), .docx and .pdf; returns their paths."""
+    import fitz
+    from docx import Document
+
+    pages = synthetic_spec(sections)
+    paths = {}
+    paths['txt'] = os.path.join(directory, 'synthetic_spec.txt')
+    with open(paths['txt'], 'w', encoding='utf-8') as f:
+        f.write("\f".join("\n".join(page) for page in pages))
+
+    paths['docx'] = os.path.join(directory, 'synthetic_spec.docx')
+    doc = Document()
+    for page in pages:
+        for line in page:
+            doc.add_paragraph(line)
+    doc.save(paths['docx'])
+
+    paths['pdf'] = os.path.join(directory, 'synthetic_spec.pdf')
+    with fitz.open() as pdf:
+        for number, page_lines in enumerate(pages, start=1):
+            page = pdf.new_page()
+            page.insert_text((40, 30), "Synthetic Benchmark Tower - Specifications", fontsize=8)
+            page.insert_text((40, 60), "\n".join(page_lines), fontsize=8)
+            page.insert_text((40, 820), f"Page {number} of {len(pages)}", fontsize=8)
+        pdf.save(paths['pdf'])
+    return paths
+
+
+def sample_files():
+    return [os.path.join(UPLOADS_DIR, f) for f in sorted(os.listdir(UPLOADS_DIR))
+            if os.path.splitext(f)[1].lower() in ('.pdf', '.docx', '.txt')]
+
+
+# ---------- HELPERS ----------
+def timed(fn, repeat=1):
+    """(best seconds, last result) over `repeat` runs, with the pipeline's prints silenced."""
+    best, result = None, None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# ---------- BENCHMARKS ----------
+def bench_extraction(metrics, files, repeat):
+    from backend.app.ocr.ocr_processor import extract_text_from_file
+
+    by_format = {}
+    for path in files:
+        by_format.setdefault(os.path.splitext(path)[1].lower().lstrip('.'), []).append(path)
+    for fmt, paths in sorted(by_format.items()):
+        seconds, sections, size = 0.0, 0, 0
+        for path in paths:
+            elapsed, result = timed(lambda: extract_text_from_file(path), repeat)
+            seconds += elapsed
+            sections += len(result.get('sections') or [])
+            size += os.path.getsize(path)
+        metrics[f"extract.{fmt}.files"] = len(paths)
+        metrics[f"extract.{fmt}.sections"] = sections
+        metrics[f"extract.{fmt}_s"] = round(seconds, 4)
+        metrics[f"extract.{fmt}.mb_per_s"] = round(size / (1024 * 1024) / seconds, 3) if seconds else None
+
+
+def bench_splitter(metrics, text, repeat):
+    from backend.app.services import section_splitter
+    from backend.app.services.segmenter import segment_text
+
+    mb = len(text) / (1024 * 1024)
+    seconds, merged = timed(lambda: section_splitter.merge_broken_numbered_lines(text), repeat)
+    metrics["splitter.merge_broken_numbered_lines_s"] = round(seconds, 4)
+    seconds, chunks = timed(lambda: section_splitter.chunk_text(merged), repeat)
+    metrics["splitter.chunk_text_s"] = round(seconds, 4)
+    seconds, cleaned = timed(lambda: [section_splitter.clean_chunk_formatting(c) for c in chunks], repeat)
+    metrics["splitter.clean_chunk_formatting_s"] = round(seconds, 4)
+    seconds, sections = timed(lambda: section_splitter.convert_chunks_to_json(cleaned), repeat)
+    metrics["splitter.convert_chunks_to_json_s"] = round(seconds, 4)
+    legacy = sum(metrics[f"splitter.{name}_s"] for name in (
+        "merge_broken_numbered_lines", "chunk_text", "clean_chunk_formatting", "convert_chunks_to_json"))
+    metrics["splitter.sections"] = len(sections)
+    metrics["splitter.legacy_pipeline.mb_per_s"] = round(mb / legacy, 3) if legacy else None
+    seconds, _ = timed(lambda: segment_text(text, max_chars=0), repeat)
+    metrics["splitter.segment_text_s"] = round(seconds, 4)
+    metrics["splitter.segment_text.mb_per_s"] = round(mb / seconds, 3) if seconds else None
+
+
+def bench_dubai(metrics, repeat, matches_count=5000):
+    from backend.app.services import filter_utils
+    from backend.app.services.openai_matcher import load_dubai_code_sections
+    from backend.app.services.section_index import get_section_index
+    from backend.app.services.subcategory_table import get_subcategory_table
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        table = get_subcategory_table()
+        index = get_section_index()
+    all_prefixes = sorted({p for entry in table.entries.values() for p in entry["prefixes"]})
+    seconds, sections = timed(lambda: [load_dubai_code_sections([p]) for p in all_prefixes], repeat)
+    metrics["dubai.load_sections.queries"] = len(all_prefixes)
+    metrics["dubai.load_sections_s"] = round(seconds, 4)
+    metrics["dubai.load_sections.queries_per_s"] = round(len(all_prefixes) / seconds) if seconds else None
+
+    rng = random.Random(0)
+    pool = [sec for sec in index.sections if sec.get("section_id")]
+    selected = sorted(table.entries)[:6]
+    prefixes, keywords = table.resolve(selected)
+
+    def matches():
+        return [{
+            "user_section": {"section_id": f"{i}", "title": "t", "content": ""},
+            "matched_clause": {"section_id": sec["section_id"], "title": sec.get("section_title", ""),
+                               "content": sec.get("content", "")},
+            "similarity_score": 0.9
+        } for i, sec in enumerate(rng.choice(pool) for _ in range(matches_count))]
+
+    batches = [matches() for _ in range(repeat)]
+    seconds, kept = timed(lambda: filter_utils.filter_matches_by_subcategory(
+        batches.pop(), selected, table, None, keywords), repeat)
+    metrics["dubai.filter.matches"] = matches_count
+    metrics["dubai.filter.kept"] = len(kept)
+    metrics["dubai.filter_s"] = round(seconds, 4)
+    metrics["dubai.filter.matches_per_s"] = round(matches_count / seconds) if seconds else None
+
+
+def bench_api_match(metrics, documents, requests_per_case, stub):
+    from backend.app import create_app
+    from backend.app.services import codebook_cache, warmup
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        client = create_app().test_client()
+        warmup.wait()
+    codebook_ids = [f.split('_')[0] for f in sorted(os.listdir(codebook_cache.CODEBOOK_DIR))
+                    if f.lower().endswith('.pdf')]
+    cases = {
+        'saudi': {'region': 'saudi', 'codebook_ids[]': codebook_ids},
+        'dubai': {'region': 'dubai', 'selected_subcategories': json.dumps(['B.space', 'B.circulation'])}
+    }
+    for region, fields in cases.items():
+        for name, path in documents.items():
+            latencies, cold, failures = [], None, 0
+            calls_before = stub.calls
+            for i in range(requests_per_case):
+                with open(path, 'rb') as f:
+                    data = dict(fields, llm_cache='bypass', file=(f, os.path.basename(path)))
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        start = time.perf_counter()
+                        response = client.post('/api/match', data=data, content_type='multipart/form-data')
+                        elapsed = time.perf_counter() - start
+                if response.status_code != 200:
+                    failures += 1
+                if i == 0:
+                    cold = elapsed      # includes extraction; later requests reuse the registered document
+                else:
+                    latencies.append(elapsed)
+            key = f"api_match.{region}.{name}"
+            metrics[f"{key}.cold_s"] = round(cold, 4)
+            if latencies:
+                metrics[f"{key}.p50_s"] = round(percentile(latencies, 0.5), 4)
+                metrics[f"{key}.p95_s"] = round(percentile(latencies, 0.95), 4)
+                metrics[f"{key}.mean_s"] = round(statistics.mean(latencies), 4)
+            metrics[f"{key}.model_calls"] = stub.calls - calls_before
+            metrics[f"{key}.failures"] = failures
+
+
+# ---------- COMPARISON ----------
+def regressions(metrics, baseline, tolerance):
+    found = []
+    for name, old in baseline.items():
+        new = metrics.get(name)
+        if not isinstance(new, (int, float)) or not isinstance(old, (int, float)) or not old:
+            continue
+        if name.endswith('_per_s') and new < old * (1 - tolerance):
+            found.append({"metric": name, "baseline": old, "current": new})
+        elif name.endswith('_s') and not name.endswith('_per_s') and new > old * (1 + tolerance):
+            found.append({"metric": name, "baseline": old, "current": new})
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--synthetic-sections', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--model-latency-ms', type=float, default=0)
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-suite-')
+    try:
+        from backend.app.services import codebook_cache, document_registry, llm_cache, openai_matcher
+        from stub_model import StubClient
+
+        # Keep uploads, extracted-document records, cached completions and codebook texts out of backend/shared
+        document_registry.UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+        document_registry.REGISTRY_DIR = os.path.join(workdir, 'documents')
+        llm_cache.LLM_CACHE_PATH = os.path.join(workdir, 'llm_responses.sqlite3')
+        codebook_cache.CACHE_DIR = os.path.join(workdir, 'codebook_text')
+        stub = StubClient(latency_s=args.model_latency_ms / 1000)
+        openai_matcher.client = stub
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            fixtures = write_fixtures(workdir, args.synthetic_sections)
+        samples = sample_files()
+        metrics = {}
+        started = time.perf_counter()
+
+        bench_extraction(metrics, samples + list(fixtures.values()), args.repeat)
+        with open(fixtures['txt'], 'r', encoding='utf-8') as f:
+            synthetic_text = f.read().replace("\f", "\n")
+        bench_splitter(metrics, synthetic_text, args.repeat)
+        bench_dubai(metrics, args.repeat)
+        sample_docx = next((p for p in samples if p.endswith('.docx')), None)
+        documents = {'synthetic_pdf': fixtures['pdf']}
+        if sample_docx:
+            documents['sample_docx'] = sample_docx
+        bench_api_match(metrics, documents, args.requests, stub)
+
+        report = {
+            "benchmark": "suite",
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "started_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            "settings": {"synthetic_sections": args.synthetic_sections, "requests": args.requests,
+                         "repeat": args.repeat, "model_latency_ms": args.model_latency_ms,
+                         "sample_files": [os.path.basename(p) for p in samples]},
+            "total_s": round(time.perf_counter() - started, 2),
+            "metrics": metrics
+        }
+        status = 0
+        if args.compare:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                baseline = json.load(f).get('metrics', {})
+            report["regressions"] = regressions(metrics, baseline, args.tolerance)
+            status = 1 if report["regressions"] else 0
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    print(output)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
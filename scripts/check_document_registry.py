@@ -0,0 +1,136 @@
+"""
+Checks document_registry.get_document on known, unknown and vanished document IDs.
+
+Registers a small text upload in a temporary registry and checks that:
+  - a registered document is extracted once and then served from the record;
+  - unknown and malformed IDs return None (and /api/match answers 404);
+  - an ID whose record disappears while another request holds its extraction
+    lock, or whose uploaded file is gone, returns None instead of raising;
+  - requests that arrive while a document is being extracted share that one
+    extraction, even when it finds no sections, and an empty result is
+    extracted again by the next request rather than served from memory.
+Prints one JSON document and exits 1 on any failed check.
+
+Usage: python scripts/check_document_registry.py
+"""
+import sys
+import os
+import io
+import json
+import time
+import shutil
+import argparse
+import threading
+import tempfile
+import contextlib
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BACKEND_DIR = os.path.join(REPO_DIR, 'backend')
+sys.path.append(REPO_DIR)
+os.chdir(BACKEND_DIR)  # shared/ paths are resolved relative to the backend directory
+
+
+class Upload:
+    """The slice of werkzeug's FileStorage that register_upload reads."""
+
+    def __init__(self, filename, data):
+        self.filename = filename
+        self.stream = io.BytesIO(data)
+
+
+def run_checks(registry, client):
+    checks = {}
+    extractions = []
+
+    def extract(path):
+        extractions.append(path)
+        return {"project_name": "Check", "sections": [{"section_id": "1.1", "title": "Scope", "content": "Text"}]}
+
+    document_id = registry.register_upload(Upload('spec.txt', b"1.1 Scope\nText\n"))
+    first = registry.get_document(document_id, extract=extract)
+    second = registry.get_document(document_id, extract=extract)
+    checks["registered_document_extracted_once"] = (
+        first is not None and second is not None and first["sections"] == second["sections"] and len(extractions) == 1)
+
+    checks["unknown_id_returns_none"] = registry.get_document("0" * 64, extract=extract) is None
+    checks["malformed_id_returns_none"] = registry.get_document("../etc/passwd", extract=extract) is None
+
+    # The record is there on the first read but gone once the extraction lock is held
+    vanished_id = registry.register_upload(Upload('other.txt', b"2.1 Other\nText\n"))
+    read_record = registry._read_record
+    reads = []
+
+    def vanishing_read(doc_id):
+        reads.append(doc_id)
+        return read_record(doc_id) if len(reads) == 1 else None
+
+    registry._read_record = vanishing_read
+    try:
+        checks["record_removed_while_waiting_returns_none"] = registry.get_document(vanished_id, extract=extract) is None
+    finally:
+        registry._read_record = read_record
+    checks["extraction_lock_released"] = vanished_id not in registry._extractions
+
+    # Concurrent requests for a document whose extraction finds no sections
+    empty_id = registry.register_upload(Upload('scan.txt', b"no numbered sections\n"))
+    started, release, empty_extractions = threading.Event(), threading.Event(), []
+
+    def extract_nothing(path):
+        empty_extractions.append(path)
+        started.set()
+        release.wait(10)
+        return {"project_name": None, "sections": []}
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(registry.get_document(empty_id, extract=extract_nothing)))
+    first.start()
+    started.wait(10)
+    waiters = [threading.Thread(target=lambda: results.append(registry.get_document(empty_id, extract=extract_nothing)))
+               for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+    while registry._extractions.get(empty_id, {}).get("users", 0) < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in [first] + waiters:
+        thread.join(10)
+    checks["waiters_share_one_extraction"] = (
+        len(empty_extractions) == 1 and len(results) == 4 and all(r and r["sections"] == [] for r in results))
+    checks["concurrent_extraction_lock_released"] = empty_id not in registry._extractions
+    registry.get_document(empty_id, extract=extract_nothing)
+    checks["empty_result_not_cached"] = len(empty_extractions) == 2
+
+    missing_id = registry.register_upload(Upload('gone.txt', b"3.1 Gone\nText\n"))
+    os.remove(read_record(missing_id)["path"])
+    checks["missing_upload_returns_none"] = registry.get_document(missing_id, extract=extract) is None
+
+    response = client.post('/api/match', data={'region': 'saudi', 'codebook_ids[]': ['SBC-302'],
+                                               'document_id': "0" * 64})
+    checks["api_match_unknown_id_is_404"] = response.status_code == 404
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='check-registry-')
+    try:
+        from backend.app import create_app
+        from backend.app.services import document_registry, warmup
+
+        document_registry.UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+        document_registry.REGISTRY_DIR = os.path.join(workdir, 'documents')
+        with contextlib.redirect_stdout(io.StringIO()):
+            client = create_app().test_client()
+            warmup.wait()
+            checks = run_checks(document_registry, client)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failures = [name for name, passed in checks.items() if not passed]
+    print(json.dumps({"check": "document_registry", "checks": checks, "failures": failures}, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
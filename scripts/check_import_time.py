@@ -0,0 +1,95 @@
+"""
+Import-time budget for backend startup.
+
+Starts fresh interpreters that run `from app import create_app; create_app()`
+and wait for its background warm-up, under `python -X importtime`, and fails
+(exit status 1) when:
+  - the median cumulative time of the app's imports (including those made
+    by create_app and warm-up) is over --budget-ms, or
+  - any of the heavy OCR / PDF / OpenAI backends was imported at startup
+    (they are meant to load on first use, per file type and stage).
+Prints one JSON document with the timings and the slowest imports.
+
+Usage: python scripts/check_import_time.py [--budget-ms 400] [--runs 5]
+"""
+import sys
+import os
+import json
+import statistics
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+# Must not be imported by create_app()
+HEAVY_MODULES = ('cv2', 'pandas', 'pytesseract', 'pdf2image', 'docx', 'docx2txt', 'fitz', 'PyPDF2', 'openai',
+                 'numpy', 'PIL')
+IMPORT_TIME_BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', '400'))
+
+CHILD = """
+import sys, json
+from app import create_app
+from app.services import warmup
+create_app()
+warmup.wait()
+print("HEAVY_MODULES=" + json.dumps([m for m in %r if m in sys.modules]))
+""" % (HEAVY_MODULES,)
+
+
+def run_once():
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD], cwd=BACKEND_DIR,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"create_app() failed:\n{proc.stderr[-2000:]}")
+    heavy = []
+    for line in proc.stdout.splitlines():
+        if line.startswith('HEAVY_MODULES='):
+            heavy = json.loads(line[len('HEAVY_MODULES='):])
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.rstrip()[1:], int(self_us), int(cumulative_us)))
+    # Top-level rows are not indented: `app` itself, then the route modules create_app() imports
+    app_us = sum(cum for name, _, cum in modules if name == 'app' or name.startswith('app.'))
+    return app_us, heavy, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_TIME_BUDGET_MS)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    timings, heavy, modules = [], set(), []
+    for _ in range(max(1, args.runs)):
+        app_us, run_heavy, modules = run_once()
+        timings.append(app_us / 1000)
+        heavy.update(run_heavy)
+
+    median_ms = statistics.median(timings)
+    slowest = sorted(modules, key=lambda m: -m[1])[:15]
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"app imports: {median_ms:.1f} ms > budget {args.budget_ms:.0f} ms")
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {sorted(heavy)}")
+
+    print(json.dumps({
+        "benchmark": "import_time",
+        "runs": len(timings),
+        "app_imports_ms": {"median": round(median_ms, 1), "min": round(min(timings), 1),
+                          "max": round(max(timings), 1)},
+        "budget_ms": args.budget_ms,
+        "heavy_modules_loaded": sorted(heavy),
+        "slowest_self_ms": [{"module": name.strip(), "self_ms": round(self_us / 1000, 1)}
+                            for name, self_us, _ in slowest],
+        "failures": failures
+    }, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Checks that /api/match's max_concurrency caps the LLM calls in flight.
+
+Runs Saudi matches against every codebook, with --sections synthetic
+sections (so each codebook needs several batches), through the Flask test
+client. The OpenAI client is replaced by the stub in stub_model.py, with
+--model-latency-ms per call so calls overlap. The run repeats for each
+max_concurrency in --limits and records the most calls the stub saw open at
+once. It fails (exit status 1) when that peak is above the limit, or when a
+match does not succeed.
+Uploads, the document registry, the LLM cache and the codebook text cache go to
+a temporary directory.
+
+Usage: python scripts/check_match_concurrency.py [--limits 1 2 4] [--sections 200] [--model-latency-ms 40]
+"""
+import sys
+import os
+import io
+import json
+import shutil
+import argparse
+import tempfile
+import contextlib
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BACKEND_DIR = os.path.join(REPO_DIR, 'backend')
+sys.path.append(REPO_DIR)
+os.chdir(BACKEND_DIR)  # shared/ paths are resolved relative to the backend directory
+
+from bench_suite import synthetic_spec
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--limits', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--sections', type=int, default=200)
+    parser.add_argument('--model-latency-ms', type=float, default=40)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='check-concurrency-')
+    try:
+        from backend.app import create_app
+        from backend.app.services import codebook_cache, document_registry, llm_cache, openai_matcher, warmup
+        from stub_model import StubClient
+
+        document_registry.UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+        document_registry.REGISTRY_DIR = os.path.join(workdir, 'documents')
+        llm_cache.LLM_CACHE_PATH = os.path.join(workdir, 'llm_responses.sqlite3')
+        codebook_cache.CACHE_DIR = os.path.join(workdir, 'codebook_text')
+
+        spec_path = os.path.join(workdir, 'spec.txt')
+        with open(spec_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join("\n".join(page) for page in synthetic_spec(args.sections)))
+        codebook_ids = [f.split('_')[0] for f in sorted(os.listdir(codebook_cache.CODEBOOK_DIR))
+                        if f.lower().endswith('.pdf')]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            client = create_app().test_client()
+            warmup.wait()
+        runs, failures = [], []
+        for limit in args.limits:
+            stub = StubClient(latency_s=args.model_latency_ms / 1000)
+            openai_matcher.client = stub
+            with open(spec_path, 'rb') as f:
+                data = {'region': 'saudi', 'codebook_ids[]': codebook_ids, 'max_concurrency': str(limit),
+                        'llm_cache': 'bypass', 'file': (f, 'spec.txt')}
+                with contextlib.redirect_stdout(io.StringIO()):
+                    response = client.post('/api/match', data=data, content_type='multipart/form-data')
+            body = response.get_json() or {}
+            batches = sum(c.get('batches', 0) for c in (body.get('coverage') or {}).values())
+            runs.append({"max_concurrency": limit, "status": response.status_code, "codebooks": len(codebook_ids),
+                         "batches": batches, "model_calls": stub.calls, "peak_in_flight": stub.peak_in_flight})
+            if response.status_code != 200 or body.get('status') != 'success':
+                failures.append(f"max_concurrency={limit}: match failed ({response.status_code})")
+            elif stub.peak_in_flight > limit:
+                failures.append(f"max_concurrency={limit}: {stub.peak_in_flight} calls in flight")
+            elif batches <= limit:
+                failures.append(f"max_concurrency={limit}: only {batches} batches, the cap was not exercised")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps({"check": "match_concurrency", "runs": runs, "failures": failures}, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
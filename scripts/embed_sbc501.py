@@ -1,17 +1,24 @@
 import sys
 import os
 import json
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.chdir(BACKEND_DIR)  # shared/ paths are resolved relative to the backend directory
 
 from backend.app.utils.file_loader import load_codebook_text
-from backend.app.services.matching_engine import split_codebook_by_clause, embed_and_store_clauses
+from backend.app.services.matching_engine import split_codebook_by_clause, embed_and_store_clauses, get_embedder
+
+# Usage: python scripts/embed_sbc501.py [codebook file or ID] [index name] [embedder: hashing|openai]
+codebook_file = sys.argv[1] if len(sys.argv) > 1 else "SBC-501_Mechanical.pdf"
+index_name = sys.argv[2] if len(sys.argv) > 2 else "sbc501"
+embedder = get_embedder(sys.argv[3]) if len(sys.argv) > 3 else get_embedder()
 
 # Load the full codebook text (SBC 501)
-text = load_codebook_text("SBC-501_Mechanical.pdf")  # in shared/codebooks/
+text = load_codebook_text(codebook_file)  # in shared/codebooks/
 
 # ✅ Split by logical clauses (not tokens!)
 clauses = split_codebook_by_clause(text)
 
-# ✅ Embed and store in FAISS
-clauses = split_codebook_by_clause(text)
-embed_and_store_clauses(clauses, index_name="sbc501")
+# ✅ Embed and store as a memory-mapped float32 matrix in shared/vector_index/
+count = embed_and_store_clauses(clauses, index_name=index_name, embedder=embedder)
+print(json.dumps({"codebook": codebook_file, "index": index_name, "clauses": count, "embedder": embedder.name}))
@@ -0,0 +1,71 @@
+"""
+Compiles Saudi codebook PDFs into clause stores.
+
+Each PDF in backend/shared/codebooks is segmented into clause records
+{key, clause_id, title, content} and written to
+backend/shared/clause_store/<codebook ID>.clauses: an offsets table plus a
+UTF-8 blob that workers memory-map, stamped with the store format version and
+the PDF's size, mtime and SHA-256. The Saudi matcher uses a store instead of
+re-reading the PDF for as long as the stamp matches the PDF.
+
+With --embed, the clause vector index (as built by embed_sbc501.py) is written
+from the same records. Prints one JSON line per codebook.
+
+Usage: python scripts/ingest_codebooks.py [codebook IDs or file names ...]
+                                          [--max-chars 4000] [--embed hashing|openai]
+"""
+import sys
+import os
+import json
+import time
+import argparse
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.chdir(BACKEND_DIR)  # shared/ paths are resolved relative to the backend directory
+
+from backend.app.services import codebook_cache
+from backend.app.services import clause_store
+from backend.app.services.matching_engine import embed_and_store_clauses, get_embedder, index_name_for
+
+
+def codebook_ids(names):
+    if not names:
+        names = sorted(f for f in os.listdir(codebook_cache.CODEBOOK_DIR) if f.lower().endswith('.pdf'))
+    return [clause_store.codebook_id_for(name) for name in names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('codebooks', nargs='*')
+    parser.add_argument('--max-chars', type=int, default=4000)
+    parser.add_argument('--embed', choices=('hashing', 'openai'))
+    args = parser.parse_args()
+
+    failed = 0
+    for codebook_id in codebook_ids(args.codebooks):
+        start = time.perf_counter()
+        try:
+            path, records = clause_store.build_store(codebook_id, max_chars=args.max_chars)
+        except (FileNotFoundError, ValueError) as e:
+            print(json.dumps({"codebook": codebook_id, "error": str(e)}))
+            failed += 1
+            continue
+        report = {
+            "codebook": codebook_id,
+            "store": os.path.relpath(path, BACKEND_DIR),
+            "clauses": len(records),
+            "clause_ids": len({r["clause_id"] for r in records}),
+            "bytes": os.path.getsize(path),
+            "format_version": clause_store.STORE_VERSION
+        }
+        if args.embed:
+            embedder = get_embedder(args.embed)
+            report["index"] = index_name_for(codebook_id)
+            embed_and_store_clauses(records, index_name=report["index"], embedder=embedder)
+        report["seconds"] = round(time.perf_counter() - start, 2)
+        print(json.dumps(report))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Concurrency load driver for a running backend (run.py or serve.py).
+
+Fires --requests iterations from --concurrency parallel clients; each
+iteration uploads --file to /api/upload and then matches the returned
+document_id through /api/match (--region saudi with --codebooks, or dubai
+with --subcategories). Start the backend with OPENAI_BASE_URL pointing at
+scripts/openai_standin.py to load-test without spending API quota; with
+--standin its call counters are included in the report.
+
+Prints one JSON document with latency percentiles (p50/p95/p99), error counts
+by status and throughput per operation. Exits 1 when any request failed.
+
+Usage: python scripts/load_driver.py [--base-url http://127.0.0.1:5000] [--concurrency 8] [--requests 40]
+           [--file backend/shared/uploads/DubaiTest.docx] [--region saudi --codebooks SBC-302 SBC-305]
+           [--region dubai --subcategories B.space B.circulation] [--standin http://127.0.0.1:8089]
+"""
+import sys
+import os
+import json
+import time
+import uuid
+import argparse
+import threading
+import mimetypes
+import statistics
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_FILE = os.path.join(REPO_DIR, 'backend', 'shared', 'uploads', 'DubaiTest.docx')
+
+
+def encode_multipart(fields, file_path=None):
+    """(body, content type) for form `fields` (name -> str or list of str) and an optional `file`."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, values in fields.items():
+        for value in values if isinstance(values, list) else [values]:
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+                         .encode('utf-8'))
+    if file_path:
+        filename = os.path.basename(file_path)
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                     f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8') + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def post_form(url, fields, file_path=None, timeout=600):
+    """(HTTP status, parsed JSON body or None)."""
+    body, content_type = encode_multipart(fields, file_path)
+    request = urllib.request.Request(url, data=body, method='POST', headers={'Content-Type': content_type})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b'null')
+    except urllib.error.HTTPError as e:
+        try:
+            return e.code, json.loads(e.read() or b'null')
+        except ValueError:
+            return e.code, None
+    except (urllib.error.URLError, OSError) as e:
+        return f"connection error: {getattr(e, 'reason', e)}", None
+
+
+def get_json(url, timeout=10):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return json.loads(response.read())
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        return {"error": str(e)}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Recorder:
+    """Latencies and status counts per operation, shared by the client threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ops = {}
+
+    def add(self, op, seconds, status):
+        with self.lock:
+            entry = self.ops.setdefault(op, {"latencies": [], "statuses": {}})
+            entry["statuses"][str(status)] = entry["statuses"].get(str(status), 0) + 1
+            if status == 200:
+                entry["latencies"].append(seconds)
+
+    def summary(self, wall_seconds):
+        report = {}
+        for op, entry in self.ops.items():
+            latencies = entry["latencies"]
+            total = sum(entry["statuses"].values())
+            report[op] = {
+                "requests": total,
+                "ok": len(latencies),
+                "errors": total - len(latencies),
+                "statuses": entry["statuses"],
+                "throughput_per_s": round(len(latencies) / wall_seconds, 3) if wall_seconds else None
+            }
+            if latencies:
+                report[op].update({
+                    "p50_s": round(percentile(latencies, 0.50), 4),
+                    "p95_s": round(percentile(latencies, 0.95), 4),
+                    "p99_s": round(percentile(latencies, 0.99), 4),
+                    "mean_s": round(statistics.mean(latencies), 4),
+                    "max_s": round(max(latencies), 4)
+                })
+        return report
+
+
+def iteration(args, recorder):
+    """One upload followed by a match of the uploaded document."""
+    start = time.perf_counter()
+    status, body = post_form(f"{args.base_url}/api/upload", {}, args.file, args.timeout)
+    recorder.add('upload', time.perf_counter() - start, status)
+    if status != 200 or not body or not body.get('document_id'):
+        return False
+
+    fields = {'document_id': body['document_id'], 'region': args.region, 'llm_cache': args.llm_cache}
+    if args.region == 'saudi':
+        fields['codebook_ids[]'] = args.codebooks
+    else:
+        fields['selected_subcategories'] = json.dumps(args.subcategories)
+    start = time.perf_counter()
+    status, body = post_form(f"{args.base_url}/api/match", fields, timeout=args.timeout)
+    recorder.add('match', time.perf_counter() - start, status)
+    return status == 200 and bool(body) and body.get('status') == 'success'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--file', default=DEFAULT_FILE)
+    parser.add_argument('--region', choices=['saudi', 'dubai'], default='saudi')
+    parser.add_argument('--codebooks', nargs='+', default=['SBC-302', 'SBC-305'])
+    parser.add_argument('--subcategories', nargs='+', default=['B.space', 'B.circulation'])
+    parser.add_argument('--llm-cache', choices=['use', 'refresh', 'bypass'], default='bypass')
+    parser.add_argument('--standin')
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    args.base_url = args.base_url.rstrip('/')
+
+    ready = get_json(f"{args.base_url}/api/ready")
+    if ready.get('status') != 'success':
+        print(json.dumps({"error": f"Backend at {args.base_url} is not ready", "ready": ready}, indent=2))
+        return 1
+    standin_before = get_json(f"{args.standin.rstrip('/')}/stats") if args.standin else None
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(lambda _: iteration(args, recorder), range(args.requests)))
+    wall = time.perf_counter() - started
+
+    report = {
+        "benchmark": "load",
+        "base_url": args.base_url,
+        "file": os.path.basename(args.file),
+        "region": args.region,
+        "concurrency": args.concurrency,
+        "iterations": args.requests,
+        "succeeded": sum(outcomes),
+        "wall_s": round(wall, 3),
+        "iterations_per_s": round(sum(outcomes) / wall, 3) if wall else None,
+        "operations": recorder.summary(wall)
+    }
+    if args.standin:
+        after = get_json(f"{args.standin.rstrip('/')}/stats")
+        report["standin"] = {name: value - standin_before.get(name, 0) if isinstance(value, int) else value
+                             for name, value in after.items()}
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    print(output)
+    return 0 if report["succeeded"] == args.requests else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""
+Local OpenAI-compatible stand-in for /v1/chat/completions, with two modes.
+
+record: forwards every call to --upstream (the real API, with the caller's
+        Authorization header), relays the answer as it arrives (streamed or
+        not) and appends it to --tape, keyed by model, messages and sampling
+        parameters, with the finish_reason it ended with.
+replay: answers from --tape without network access. Prompts that are not on
+        the tape are answered by the deterministic stub in stub_model.py
+        (--fallback stub) or get a 404 (--fallback error).
+
+Both modes can add --latency-ms (+/- --jitter-ms, uniform) before the first
+byte, and replay can fail a --rate-429 fraction of calls with a 429 and a
+Retry-After header, like the API's rate limiter. Streamed answers are sent as
+server-sent events in --stream-chunks pieces, --chunk-ms apart, with a final
+usage chunk when stream_options.include_usage is set.
+GET /stats returns the call counters as JSON.
+
+Point the backend at it with OPENAI_BASE_URL=http://HOST:PORT/v1.
+
+Usage: python scripts/openai_standin.py record --upstream https://api.openai.com/v1 --tape tape.jsonl
+       python scripts/openai_standin.py replay --tape tape.jsonl [--latency-ms 800] [--jitter-ms 300] [--rate-429 0.05]
+"""
+import sys
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BACKEND_DIR = os.path.join(REPO_DIR, 'backend')
+START_DIR = os.getcwd()
+sys.path.append(REPO_DIR)
+os.chdir(BACKEND_DIR)  # shared/ paths are resolved relative to the backend directory
+
+from backend.app.services.llm_cache import fingerprint
+from backend.app.services.prompt_budget import count_message_tokens, count_tokens
+from stub_model import stub_content
+
+# Request fields that change how the answer is delivered, not what it is
+TRANSPORT_FIELDS = ('model', 'messages', 'stream', 'stream_options', 'user')
+
+_lock = threading.Lock()
+_stats = {"calls": 0, "replayed": 0, "fallback": 0, "missing": 0, "recorded": 0, "rate_limited": 0,
+          "upstream_errors": 0, "streamed": 0}
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def tape_key(body):
+    params = {k: v for k, v in body.items() if k not in TRANSPORT_FIELDS}
+    return fingerprint(body.get('model'), body.get('messages'), params)
+
+
+class Tape:
+    """Recorded answers (JSON lines: key, model, content, finish_reason, usage), appended to as they are recorded."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry['key']] = entry
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def add(self, key, model, content, finish_reason, usage):
+        entry = {"key": key, "model": model, "content": content, "finish_reason": finish_reason, "usage": usage,
+                 "recorded_at": time.time()}
+        with _lock:
+            self.entries[key] = entry
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+# ---------- RESPONSE BODIES ----------
+def _usage(model, messages, content, usage=None):
+    if usage:
+        return usage
+    prompt_tokens = count_message_tokens(messages, model)
+    completion_tokens = count_tokens(content, model)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def completion_body(completion_id, model, content, usage, finish_reason="stop"):
+    return {
+        "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                     "finish_reason": finish_reason}],
+        "usage": usage
+    }
+
+
+def chunk_body(completion_id, model, delta=None, finish_reason=None, usage=None):
+    choices = [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    body = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": model, "choices": choices}
+    if usage is not None:
+        body["usage"] = usage
+    return body
+
+
+def error_body(message, error_type, code=None):
+    return {"error": {"message": message, "type": error_type, "param": None, "code": code}}
+
+
+# ---------- SERVER ----------
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    options = None      # argparse namespace, set by main()
+    tape = None
+
+    def log_message(self, fmt, *args):
+        if self.options.verbose:
+            super().log_message(fmt, *args)
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_events(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+    def _send_event(self, payload):
+        self.wfile.write(f"data: {payload}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            with _lock:
+                stats = dict(_stats)
+            stats["mode"] = self.options.mode
+            stats["tape_entries"] = len(self.tape.entries)
+            return self._send_json(200, stats)
+        self._send_json(404, error_body(f"Unknown path {self.path}", "invalid_request_error"))
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self._send_json(404, error_body(f"Unknown path {self.path}", "invalid_request_error"))
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length)
+        try:
+            body = json.loads(raw or b'{}')
+        except ValueError:
+            return self._send_json(400, error_body("Request body is not valid JSON", "invalid_request_error"))
+        _count("calls")
+
+        options = self.options
+        if options.mode == 'replay' and options.rate_429 and random.random() < options.rate_429:
+            _count("rate_limited")
+            return self._send_json(429, error_body("Rate limit reached (injected by the stand-in)",
+                                                   "requests", "rate_limit_exceeded"),
+                                   {'Retry-After': str(options.retry_after)})
+
+        delay = options.latency_ms + random.uniform(-options.jitter_ms, options.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000)
+        if options.mode == 'record':
+            return self._record(body, raw)
+        return self._replay(body)
+
+    def _replay(self, body):
+        key = tape_key(body)
+        model = body.get('model') or ''
+        messages = body.get('messages') or []
+        entry = self.tape.get(key)
+        if entry is not None:
+            _count("replayed")
+            # A recorded answer replays as it ended, so one cut off at max_tokens stays cut off
+            content, usage = entry['content'], entry.get('usage')
+            finish_reason = entry.get('finish_reason') or "stop"
+        elif self.options.fallback == 'stub':
+            _count("fallback")
+            content, usage, finish_reason = stub_content(messages), None, "stop"
+        else:
+            _count("missing")
+            return self._send_json(404, error_body(f"No recorded answer for this prompt (key {key[:12]})",
+                                                   "invalid_request_error", "not_recorded"))
+        usage = _usage(model, messages, content, usage)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        if not body.get('stream'):
+            return self._send_json(200, completion_body(completion_id, model, content, usage, finish_reason))
+
+        _count("streamed")
+        self._start_events()
+        self._send_event(json.dumps(chunk_body(completion_id, model, {"role": "assistant", "content": ""})))
+        step = max(1, -(-len(content) // self.options.stream_chunks))
+        for start in range(0, len(content), step):
+            if self.options.chunk_ms:
+                time.sleep(self.options.chunk_ms / 1000)
+            piece = content[start:start + step]
+            self._send_event(json.dumps(chunk_body(completion_id, model, {"content": piece}), ensure_ascii=False))
+        self._send_event(json.dumps(chunk_body(completion_id, model, {}, finish_reason=finish_reason)))
+        if (body.get('stream_options') or {}).get('include_usage'):
+            self._send_event(json.dumps(chunk_body(completion_id, model, usage=usage)))
+        self._send_event("[DONE]")
+
+    def _record(self, body, raw):
+        request = urllib.request.Request(self.options.upstream.rstrip('/') + '/chat/completions', data=raw,
+                                         method='POST', headers={'Content-Type': 'application/json'})
+        if self.headers.get('Authorization'):
+            request.add_header('Authorization', self.headers['Authorization'])
+        try:
+            upstream = urllib.request.urlopen(request, timeout=self.options.upstream_timeout)
+        except urllib.error.HTTPError as e:
+            # Errors (rate limits included) are relayed as they are and not recorded
+            _count("upstream_errors")
+            headers = {'Retry-After': e.headers['Retry-After']} if e.headers.get('Retry-After') else None
+            try:
+                error = json.loads(e.read() or b'{}')
+            except ValueError:
+                error = error_body(str(e), "upstream_error")
+            return self._send_json(e.code, error, headers)
+        except (urllib.error.URLError, OSError) as e:
+            _count("upstream_errors")
+            return self._send_json(502, error_body(f"Upstream unreachable: {e}", "upstream_error"))
+
+        model = body.get('model') or ''
+        with upstream:
+            if not body.get('stream'):
+                response = json.loads(upstream.read())
+                content = response['choices'][0]['message'].get('content') or ''
+                finish_reason = response['choices'][0].get('finish_reason')
+                usage = response.get('usage')
+                self._send_json(200, response)
+            else:
+                _count("streamed")
+                self._start_events()
+                parts, usage, finish_reason = [], None, None
+                for line in upstream:
+                    self.wfile.write(line)
+                    self.wfile.flush()
+                    line = line.decode('utf-8').strip()
+                    if not line.startswith('data:') or line == 'data: [DONE]':
+                        continue
+                    chunk = json.loads(line[len('data:'):])
+                    usage = chunk.get('usage') or usage
+                    for choice in chunk.get('choices') or []:
+                        parts.append((choice.get('delta') or {}).get('content') or '')
+                        finish_reason = choice.get('finish_reason') or finish_reason
+                content = "".join(parts)
+        self.tape.add(tape_key(body), model, content, finish_reason, usage)
+        _count("recorded")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('--tape', required=True)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--upstream', default='https://api.openai.com/v1')
+    parser.add_argument('--upstream-timeout', type=float, default=600)
+    parser.add_argument('--fallback', choices=['stub', 'error'], default='stub')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--rate-429', type=float, default=0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--stream-chunks', type=int, default=16)
+    parser.add_argument('--chunk-ms', type=float, default=0)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    Handler.options = args
+    Handler.tape = Tape(os.path.join(START_DIR, args.tape))
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    print(f"[standin] {args.mode} on http://{args.host}:{args.port}/v1 "
+          f"({len(Handler.tape.entries)} recorded answers in {Handler.tape.path})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Deterministic local stand-in for the OpenAI chat completions API.
+
+StubClient mirrors the slice of the openai>=1 client the backend uses
+(client.chat.completions.create, plain or streamed, with usage). Answers are
+computed from the prompt alone, so equal prompts always get equal answers:
+  - match prompts: one match per user section, paired with a clause heading
+    from the code-book context chosen by a hash of the section ID;
+  - checklist prompts: one entry, with two items, per matched section.
+Like the API, an answer longer than max_tokens is cut off there and ends
+with finish_reason "length" (else "stop").
+`latency_s` is spread over the streamed chunks (or slept once when not
+streaming), to model time spent in the API. `peak_in_flight` is the most
+calls that were open at once.
+"""
+import json
+import time
+import hashlib
+import threading
+from types import SimpleNamespace
+
+from backend.app.services.clause_splitter import CLAUSE_HEADER_PATTERN
+from backend.app.services.prompt_budget import count_message_tokens, count_tokens, truncate_to_tokens
+
+STREAM_CHUNKS = 16
+
+
+def _json_after(text, marker, end_marker=None):
+    start = text.find(marker)
+    if start < 0:
+        return []
+    body = text[start + len(marker):]
+    if end_marker and end_marker in body:
+        body = body[:body.index(end_marker)]
+    try:
+        value = json.loads(body.strip())
+    except ValueError:
+        return []
+    return value if isinstance(value, list) else []
+
+
+def _stable_pick(items, key):
+    digest = hashlib.sha256(key.encode('utf-8')).digest()
+    return items[int.from_bytes(digest[:4], 'big') % len(items)]
+
+
+def _context_clauses(prompt):
+    marker = prompt.rfind('CODE TEXT:')
+    if marker < 0:
+        marker = prompt.rfind('Codebook Text:')
+    clauses = []
+    for line in prompt[marker:].splitlines()[1:] if marker >= 0 else []:
+        m = CLAUSE_HEADER_PATTERN.match(line.strip())
+        if m:
+            clauses.append({"section_id": m.group(1), "title": m.group(2).strip()[:80], "content": line.strip()})
+    return clauses
+
+
+def match_answer(prompt, codebook):
+    sections = (_json_after(prompt, 'USER PROJECT SPEC SECTIONS:', 'RELEVANT ')
+                or _json_after(prompt, 'Document Sections (JSON):', 'Relevant Codebook Text:'))
+    clauses = _context_clauses(prompt) or [{"section_id": "1.1", "title": "General", "content": "General"}]
+    matches = []
+    for section in sections:
+        section_id = str(section.get('section_id', ''))
+        clause = _stable_pick(clauses, section_id + section.get('title', ''))
+        score = 0.7 + (int(hashlib.sha256(section_id.encode('utf-8')).hexdigest()[:2], 16) % 30) / 100
+        matches.append({
+            "user_section": {"section_id": section_id, "title": section.get('title', ''),
+                             "content": (section.get('content') or '')[:200]},
+            "matched_clause": dict(clause, codebook=codebook),
+            "similarity_score": round(score, 2)
+        })
+    return matches
+
+
+def checklist_answer(prompt):
+    entries = []
+    for match in _json_after(prompt, 'Matched Data:'):
+        user_section = match.get('user_section') or {}
+        clause = match.get('matched_clause') or {}
+        entries.append({
+            "section_id": user_section.get('section_id', ''),
+            "title": user_section.get('title', ''),
+            "status": "Not Specified",
+            "checklist": [
+                {"item": "1", "requirement": f"Comply with clause {clause.get('section_id', '')}",
+                 "status": "Compliant", "comments": ""},
+                {"item": "2", "requirement": f"Verify {clause.get('title', '')[:40]} on site",
+                 "status": "Not Specified", "comments": ""}
+            ]
+        })
+    return entries
+
+
+def stub_content(messages):
+    """The stub's answer (JSON text) for a chat prompt."""
+    prompt = messages[-1].get('content') or ''
+    if 'Matched Data:' in prompt:
+        return json.dumps(checklist_answer(prompt), ensure_ascii=False)
+    codebook = ''
+    for line in prompt.splitlines():
+        if 'codebook=' in line:
+            codebook = line.split('codebook="', 1)[-1].split('"', 1)[0]
+            break
+    return json.dumps(match_answer(prompt, codebook), ensure_ascii=False)
+
+
+def _chunk(content=None, usage=None, finish_reason=None):
+    choices = [] if content is None else [SimpleNamespace(delta=SimpleNamespace(content=content),
+                                                          finish_reason=finish_reason)]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class _Completions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, model, messages, stream=False, **params):
+        owner = self.owner
+        with owner.lock:
+            owner.calls += 1
+        content = stub_content(messages)
+        finish_reason = "stop"
+        max_tokens = params.get('max_tokens')
+        if max_tokens and count_tokens(content, model) > max_tokens:
+            content, finish_reason = truncate_to_tokens(content, max_tokens, model), "length"
+        usage = SimpleNamespace(prompt_tokens=count_message_tokens(messages, model),
+                                completion_tokens=count_tokens(content, model))
+        if not stream:
+            owner.opened()
+            try:
+                time.sleep(owner.latency_s)
+            finally:
+                owner.closed()
+            message = SimpleNamespace(content=content)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)],
+                                   usage=usage)
+        return self._stream(content, usage, finish_reason, params.get('stream_options') or {})
+
+    def _stream(self, content, usage, finish_reason, stream_options):
+        self.owner.opened()
+        try:
+            step = max(1, -(-len(content) // STREAM_CHUNKS))
+            for start in range(0, len(content), step):
+                time.sleep(self.owner.latency_s / STREAM_CHUNKS)
+                last = start + step >= len(content)
+                yield _chunk(content[start:start + step], finish_reason=finish_reason if last else None)
+            if stream_options.get('include_usage'):
+                yield _chunk(usage=usage)
+        finally:
+            self.owner.closed()
+
+
+class StubClient:
+    """Drop-in for openai.OpenAI() in openai_matcher (assign to openai_matcher.client)."""
+
+    def __init__(self, latency_s=0.0):
+        self.latency_s = latency_s
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def opened(self):
+        with self.lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def closed(self):
+        with self.lock:
+            self.in_flight -= 1